@@ -14,6 +14,27 @@ from datetime import datetime, timedelta
 from backend.packager import Packager
 from backend.extensions_db import ExtensionsDB
 from backend.git_service import GitService
+from backend.project_tree import ProjectTreeService, list_directory_page
+from backend.tree_snapshot import TreeSnapshotStore
+from backend.file_reader import FileReader, classify_file, classify_sample
+from backend.content_cache import ContentCache
+from backend import file_jobs
+from backend.file_jobs import FileJobManager
+from backend.file_ops import plan_ops, run_op
+from backend.trash import TrashBin
+from backend.search_engine import SearchService
+from backend.trigram_index import TrigramIndexStore
+from backend.quick_open import QuickOpenIndex
+from backend.project_replace import ProjectReplacer
+from backend.symbol_index import SymbolIndex
+from backend.fingerprints import FingerprintStore, export_files
+from backend import run_output
+from backend.run_output import StreamingRun
+from backend.process_registry import ProcessRegistry
+from backend.command_jobs import CommandJobs
+from backend.pty_sessions import PtySessionManager
+from backend.copy_engine import fast_copy
+from backend.file_writer import atomic_write, apply_text_edits, content_hash, universal_newlines
 
 class API:
     def __init__(self):
@@ -26,7 +47,21 @@ class API:
         os.makedirs(self.projects_root, exist_ok=True)
         self.ext_db = ExtensionsDB()
         self.git_service = GitService()
-        self._running_process = None
+        self.tree_service = ProjectTreeService(push=self._push_tree_deltas, snapshots=TreeSnapshotStore())
+        self.file_reader = FileReader()
+        self.content_cache = ContentCache()
+        self.file_jobs = FileJobManager()
+        self.trash = TrashBin()
+        self.trash.resume()
+        self.fingerprints = FingerprintStore()
+        self.search_index = TrigramIndexStore(fingerprints=self.fingerprints)
+        self.search_service = SearchService(index=self.search_index)
+        self.quick_open_index = QuickOpenIndex()
+        self.project_replacer = ProjectReplacer()
+        self.symbol_index = SymbolIndex()
+        self.runs = ProcessRegistry()
+        self.command_jobs = CommandJobs()
+        self.terminals = PtySessionManager()
         self._migrate_modules_to_extensions()
 
     def _migrate_modules_to_extensions(self):
@@ -50,6 +85,15 @@ class API:
     def set_gtk_window(self, gtk_window):
         self._gtk_window = gtk_window
 
+    def shutdown(self):
+        """Stop what outlives the window: runs and queued commands (own process groups), terminals, the tree watcher."""
+        for stop in (self.runs.kill_all, self.command_jobs.cancel_all,
+                     self.terminals.close_all, self.tree_service.stop):
+            try:
+                stop()
+            except Exception as e:
+                print(f'[API] Error al cerrar: {e}')
+
     def toggle_devtools(self):
         if self._window:
             return {'success': True, 'message': 'Usa CTRL+SHIFT+I para inspeccionar (Modo Debug Activo)'}
@@ -126,8 +170,19 @@ class API:
         except Exception as e:
             return {'success': False, 'error': str(e)}
 
-    def get_project_tree(self, path, max_depth=8, max_nodes=20000):
-        """Build a project tree in one backend call to avoid N directory scans from UI."""
+    def get_project_tree(self, path, max_depth=8, max_nodes=20000, lazy=False, page_size=500, format='nested'):
+        """Build a project tree in one backend call to avoid N directory scans from UI.
+
+        The tree stays in memory and is kept current by a filesystem watcher;
+        while ``watching`` is true the UI receives deltas through
+        ``app.applyTreeDeltas`` and does not need to call this again.
+        When ``cached`` is true the tree comes from the on-disk snapshot and the
+        changed directories are revalidated in the background.
+        With ``lazy`` only the first page of the top level is returned (folders
+        carry ``child_count``); use ``expand_directory`` for the rest.
+        ``format='compact'`` sends the tree as parallel ``names``/``parents``/``flags``
+        arrays (paths are rebuilt client-side from ``root``), see encode_compact.
+        """
         try:
             root = os.path.realpath(os.path.expanduser(path))
             if not os.path.isdir(root):
@@ -141,85 +196,195 @@ class API:
                 node_limit = max(500, min(int(max_nodes), 100000))
             except Exception:
                 node_limit = 20000
+            try:
+                page_limit = max(1, min(int(page_size), 5000))
+            except Exception:
+                page_limit = 500
 
-            counter = {'count': 0}
-            truncated = {'value': False}
-
-            def build_node(dir_path, depth):
-                if depth > depth_limit or truncated['value']:
-                    return []
-                entries = []
-                try:
-                    with os.scandir(dir_path) as it:
-                        for entry in it:
-                            name = entry.name
-                            if name.startswith('.'):
-                                continue
-                            try:
-                                is_dir = entry.is_dir(follow_symlinks=False)
-                            except Exception:
-                                continue
-                            entries.append({
-                                'name': name,
-                                'path': os.path.realpath(entry.path),
-                                'is_dir': is_dir
-                            })
-                except Exception:
-                    return []
-
-                entries.sort(key=lambda i: (0 if i['is_dir'] else 1, i['name'].lower()))
-
-                out = []
-                for item in entries:
-                    counter['count'] += 1
-                    if counter['count'] > node_limit:
-                        truncated['value'] = True
-                        break
-                    node = {
-                        'name': item['name'],
-                        'path': item['path'],
-                        'is_dir': item['is_dir']
-                    }
-                    if item['is_dir']:
-                        node['children'] = build_node(item['path'], depth + 1)
-                    out.append(node)
-                return out
-
-            tree = {
-                'name': os.path.basename(root),
-                'path': root,
-                'is_dir': True,
-                'children': build_node(root, 0)
-            }
-            return {
+            compact = format == 'compact'
+            result = self.tree_service.get_tree(root, depth_limit, node_limit, bool(lazy), page_limit, compact)
+            self.quick_open_index.prepare(root)
+            self.symbol_index.prepare(root)
+            response = {
                 'success': True,
-                'tree': tree,
-                'truncated': truncated['value'],
+                'tree': result['tree'],
+                'truncated': result['truncated'],
+                'watching': result['watching'],
+                'cached': result['cached'],
+                'lazy': bool(lazy),
+                'format': 'compact' if compact else 'nested',
                 'max_depth': depth_limit,
                 'max_nodes': node_limit
             }
+            if lazy:
+                response['next_cursor'] = result['next_cursor']
+            return response
         except Exception as e:
             return {'success': False, 'error': str(e)}
 
+    def expand_directory(self, path, cursor=None, limit=200):
+        """Return one sorted page of a folder's children plus a continuation cursor."""
+        try:
+            dir_path = os.path.realpath(os.path.expanduser(path))
+            if not os.path.isdir(dir_path):
+                return {'success': False, 'error': 'Directorio no existe'}
+            try:
+                page_limit = max(1, min(int(limit), 5000))
+            except Exception:
+                page_limit = 200
+            page = self.tree_service.expand(dir_path, cursor, page_limit)
+            if page is None:
+                page = list_directory_page(dir_path, cursor, page_limit)
+            if page is None:
+                return {'success': False, 'error': 'No se pudo leer el directorio'}
+            return {'success': True, 'path': dir_path, **page}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    def _push_tree_deltas(self, root, deltas):
+        """Send explorer deltas to the UI (called from the watcher thread)."""
+        added = []
+        removed = []
+        for delta in deltas:
+            if delta['op'] == 'add':
+                added.append(delta['node']['path'])
+            elif delta['op'] in ('remove', 'rename'):
+                removed.append(delta['path'])
+                if delta.get('new_path'):
+                    added.append(delta['new_path'])
+        written = [delta['path'] for delta in deltas if delta['op'] == 'write']
+        if any(delta['op'] == 'reset' for delta in deltas):
+            self.quick_open_index.refresh()
+        elif added or removed:
+            self.quick_open_index.apply_changes(added, removed)
+        if added or removed or written:
+            self.search_index.note_changed(added + removed + written)
+            self.symbol_index.note_changed(added + removed + written)
+        deltas = [delta for delta in deltas if delta['op'] != 'write']
+        if not self._window or not deltas:
+            return
+        try:
+            payload = json.dumps({'root': root, 'deltas': deltas})
+            self._window.evaluate_js(
+                f"typeof app !== 'undefined' && app.applyTreeDeltas && app.applyTreeDeltas({payload})"
+            )
+        except Exception:
+            pass
+
+    # Files above this size are not decoded whole; the editor pages them with read_lines.
+    MAX_OPEN_BYTES = 8 * 1024 * 1024
+
     def read_file(self, path):
+        """Read a text file, classifying it from its first KB before any full decode.
+
+        Binaries fail with ``binary`` and oversized files with ``too_large``
+        (use read_lines); otherwise ``encoding`` is the detected encoding and
+        ``hash`` the sha256 of the bytes on disk (base for save_file_patch).
+        """
         try:
-            with open(path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            return {'success': True, 'content': content}
+            self.quick_open_index.note_opened(path)
+            if os.path.getsize(path) > self.MAX_OPEN_BYTES:
+                raw = None
+                info = classify_file(path)
+            else:
+                raw = self.content_cache.read_bytes(path)
+                info = classify_sample(raw[:8192], len(raw))
+            if info['binary']:
+                return {'success': False, 'binary': True, 'size': info['size'],
+                        'error': 'Archivo binario: no se puede abrir como texto'}
+            if raw is None:
+                return {'success': False, 'too_large': True, 'size': info['size'], 'encoding': info['encoding'],
+                        'error': f'Archivo demasiado grande ({info["size"] // (1024 * 1024)} MB)'}
+            encoding = info['encoding']
+            try:
+                content = raw.decode(encoding)
+            except UnicodeDecodeError:
+                # The sample looked like UTF-8 but the rest is not.
+                encoding = 'latin-1'
+                content = raw.decode(encoding)
+            return {'success': True, 'content': universal_newlines(content), 'encoding': encoding,
+                    'hash': content_hash(raw)}
         except Exception as e:
             return {'success': False, 'error': str(e)}
 
-    def save_file(self, path, content):
+    def read_file_range(self, path, offset=0, length=65536):
+        """Read a byte window of a file (mmap) without loading the rest of it."""
         try:
-            with open(path, 'w', encoding='utf-8') as f:
-                f.write(content)
-            return {'success': True}
+            if not os.path.isfile(path):
+                return {'success': False, 'error': 'Archivo no existe'}
+            try:
+                length = max(1, min(int(length), 16 * 1024 * 1024))
+            except Exception:
+                length = 65536
+            return {'success': True, **self.file_reader.read_range(path, offset, length)}
         except Exception as e:
             return {'success': False, 'error': str(e)}
 
-    def write_file(self, path, content):
+    def read_lines(self, path, start_line=0, count=1000):
+        """Read a page of lines (0-based start_line); includes the total line_count and size."""
+        try:
+            if not os.path.isfile(path):
+                return {'success': False, 'error': 'Archivo no existe'}
+            try:
+                count = max(1, min(int(count), 200000))
+            except Exception:
+                count = 1000
+            info = classify_file(path)
+            if info['binary']:
+                return {'success': False, 'binary': True, 'error': 'Archivo binario: no se puede abrir como texto'}
+            if info['encoding'] in ('utf-16', 'utf-32'):
+                return {'success': False, 'error': f'Paginado no soportado para {info["encoding"]}'}
+            page = self.file_reader.read_lines(path, start_line, count, info['encoding'])
+            return {'success': True, 'encoding': info['encoding'], **page}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    def _file_changed(self, path):
+        """Drop cached contents of path and queue it for search and symbol re-indexing."""
+        self.content_cache.invalidate(path)
+        self.search_index.note_changed([path])
+        self.symbol_index.note_changed([path])
+
+    def save_file(self, path, content, encoding=None):
+        try:
+            data = content.encode(encoding or 'utf-8')
+            atomic_write(path, data)
+            self._file_changed(path)
+            return {'success': True, 'hash': content_hash(data)}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    def get_content_cache_stats(self):
+        """Hit/miss counters and size of the shared file content cache."""
+        try:
+            return {'success': True, **self.content_cache.stats()}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    def save_file_patch(self, path, base_hash, edits, encoding=None):
+        """Apply range edits to the file on disk instead of resending the whole buffer.
+
+        ``edits`` is a list of ``{'start', 'end', 'text'}`` against the content
+        read_file returned (JavaScript string offsets). When the file no longer
+        matches ``base_hash`` nothing is written and ``conflict`` is set.
+        """
+        try:
+            with open(path, 'rb') as f:
+                raw = f.read()
+            if content_hash(raw) != base_hash:
+                return {'success': False, 'conflict': True, 'error': 'El archivo cambió en disco desde que se abrió'}
+            encoding = encoding or 'utf-8'
+            content = apply_text_edits(universal_newlines(raw.decode(encoding)), edits or [])
+            data = content.encode(encoding)
+            atomic_write(path, data)
+            self._file_changed(path)
+            return {'success': True, 'hash': content_hash(data)}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    def write_file(self, path, content, encoding=None):
         """Alias para save_file"""
-        return self.save_file(path, content)
+        return self.save_file(path, content, encoding)
 
     def select_folder(self):
         """Retorna la carpeta de proyectos actual"""
@@ -232,6 +397,7 @@ class API:
         try:
             with open(path, 'w') as f:
                 f.write('')
+            self._file_changed(path)
             return {'success': True}
         except Exception as e:
             return {'success': False, 'error': str(e)}
@@ -243,12 +409,34 @@ class API:
         except Exception as e:
             return {'success': False, 'error': str(e)}
 
+    def _delete_path(self, path):
+        """Move path to the trash (instant, restorable for a while); returns the trash id."""
+        trash_id = self.trash.delete(path)
+        self._file_changed(path)
+        return trash_id
+
     def delete_item(self, path):
         try:
-            if os.path.isdir(path):
-                shutil.rmtree(path)
-            else:
-                os.remove(path)
+            return {'success': True, 'trash_id': self._delete_path(path)}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    def restore_deleted_item(self, trash_id):
+        """Undo a delete_item while the item is still in the trash."""
+        try:
+            return {'success': True, 'path': self.trash.restore(trash_id)}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    def list_trash(self):
+        try:
+            return {'success': True, 'items': self.trash.list(), 'restore_window': self.trash.restore_window}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    def empty_trash(self):
+        try:
+            self.trash.empty()
             return {'success': True}
         except Exception as e:
             return {'success': False, 'error': str(e)}
@@ -256,6 +444,8 @@ class API:
     def rename_item(self, old_path, new_path):
         try:
             os.rename(old_path, new_path)
+            self._file_changed(old_path)
+            self._file_changed(new_path)
             return {'success': True}
         except Exception as e:
             return {'success': False, 'error': str(e)}
@@ -310,10 +500,10 @@ class API:
                     default_icon = os.path.join(os.path.dirname(os.path.dirname(__file__)),
                                                'frontend', 'assets', 'default-app-icon.png')
                     if os.path.exists(default_icon):
-                        shutil.copy(default_icon, os.path.join(base_path, 'icons', 'app-icon.png'))
+                        fast_copy(default_icon, os.path.join(base_path, 'icons', 'app-icon.png'), copy_stat=False)
                         metadata['icon'] = 'icons/app-icon.png'
                 else:
-                    shutil.copy(metadata['icon'], os.path.join(base_path, 'icons', 'app-icon.png'))
+                    fast_copy(metadata['icon'], os.path.join(base_path, 'icons', 'app-icon.png'), copy_stat=False)
                     metadata['icon'] = 'icons/app-icon.png'
 
                 # Metadata & Config Files
@@ -387,7 +577,7 @@ class API:
                             with open(dst_file, 'w', encoding='utf-8') as f:
                                 f.write(content)
                         except (UnicodeDecodeError, Exception):
-                            shutil.copy2(src_file, dst_file)
+                            fast_copy(src_file, dst_file)
 
             metadata.pop('ext_icon_data', None)
             metadata.pop('ext_icon_filename', None)
@@ -450,50 +640,254 @@ class API:
         except Exception as e:
             return {'success': False, 'error': str(e)}
 
+    def _output_capture(self):
+        """RunOutput options for commands: memory limits from the settings, spill folder.
+
+        ``runOutputHeadKB`` / ``runOutputTailKB`` in editor-config.json set how
+        much output stays in memory; the full log of longer output goes to
+        the project's ``build/logs`` (``~/.dex-studio/logs`` without a project).
+        """
+        settings = self.load_settings().get('settings') or {}
+        head_kb = settings.get('runOutputHeadKB', run_output.HEAD_CHARS // 1024)
+        tail_kb = settings.get('runOutputTailKB', run_output.TAIL_CHARS // 1024)
+        if self.current_project_path:
+            log_dir = os.path.join(self.current_project_path, 'build', 'logs')
+        else:
+            log_dir = os.path.join(os.path.expanduser("~"), '.dex-studio', 'logs')
+        return {'head_chars': max(0, int(head_kb)) * 1024, 'tail_chars': max(64, int(tail_kb)) * 1024,
+                'log_dir': log_dir}
+
     def run_command(self, command):
         try:
             cwd = self.current_project_path or os.getcwd()
-            result = subprocess.run(command, shell=True, capture_output=True, text=True, cwd=cwd)
-            return {'success': True, 'stdout': result.stdout, 'stderr': result.stderr, 'code': result.returncode}
+            run = StreamingRun(command, cwd, capture=self._output_capture(), detach=False)
+            run.output.wait()
+            # Universal newlines, as subprocess text mode gave callers before.
+            result = {'success': True, 'stdout': universal_newlines(run.output.text('stdout')),
+                      'stderr': universal_newlines(run.output.text('stderr')), 'code': run.output.code}
+            if run.output.log_path:
+                result['log_path'] = run.output.log_path
+            return result
         except Exception as e:
             return {'success': False, 'error': str(e)}
 
-    def start_project_run(self, command, timeout=0):
-        """Run a project command as a subprocess that can be cancelled."""
+    def run_command_async(self, command, timeout=0, cwd=None, detach=True):
+        """Queue a shell command on the command pool and return its ``job_id`` at once.
+
+        Poll command_result(job_id) for the outcome (same stdout/stderr/code
+        as run_command); cancel_command stops it. ``timeout`` seconds (0 = no
+        limit) kills it with code 124.
+
+        By default the command runs in its own session with no stdin, so a
+        cancel or timeout takes down everything it started. Unlike
+        run_command it then has no terminal: pass ``detach=False`` for
+        commands that may need one (sudo asking for a password); those keep
+        the app's session and stdin, and cancel only signals their shell.
+        """
+        try:
+            cwd = os.path.expanduser(cwd or self.current_project_path or os.getcwd())
+            timeout_val = float(timeout) if timeout and float(timeout) > 0 else None
+            job = self.command_jobs.submit(command, cwd, timeout_val, self._output_capture(), bool(detach))
+            return {'success': True, 'job_id': job.id, 'state': job.state}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    def command_status(self, job_id):
+        try:
+            job = self.command_jobs.get(job_id)
+            if job is None:
+                return {'success': False, 'error': 'Comando no encontrado'}
+            return {'success': True, **job.info(), 'done': job.finished.is_set()}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    def command_result(self, job_id, wait=0.5):
+        """Outcome of a queued command, waiting up to ``wait`` seconds (at most 2) for it to end."""
+        try:
+            job = self.command_jobs.get(job_id)
+            if job is None:
+                return {'success': False, 'error': 'Comando no encontrado'}
+            result = self.command_jobs.result(job, max(0.0, min(float(wait), 2.0)))
+            # Same text as run_command returns: \r\n and progress-bar \r become \n.
+            for stream in ('stdout', 'stderr'):
+                if stream in result:
+                    result[stream] = universal_newlines(result[stream])
+            if result.get('error'):
+                return {'success': False, **result}
+            return {'success': True, **result}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    def cancel_command(self, job_id):
+        try:
+            job = self.command_jobs.get(job_id)
+            if job is None:
+                return {'success': False, 'error': 'Comando no encontrado'}
+            if not self.command_jobs.cancel(job):
+                return {'success': True, 'message': 'El comando ya terminó'}
+            return {'success': True, 'message': 'Comando cancelado'}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    def read_command_log(self, job_id, offset=0, limit=run_output.LOG_PAGE_BYTES):
+        """A page of a queued command's whole output from byte offset on (see read_run_log)."""
+        try:
+            job = self.command_jobs.get(job_id)
+            if job is None:
+                return {'success': False, 'error': 'Comando no encontrado'}
+            if job.run is None:
+                return {'success': False, 'error': 'El comando aún no empezó'}
+            limit = max(1, min(int(limit), 4 * run_output.LOG_PAGE_BYTES))
+            return {'success': True, 'job_id': job_id, **job.run.output.read_log(offset, limit)}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    def list_commands(self):
+        try:
+            return {'success': True, 'commands': self.command_jobs.list()}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    def start_project_run(self, command, timeout=0, stream=False):
+        """Run a project command as a subprocess that can be cancelled.
+
+        Each run gets a ``run_id`` in the process registry (see list_runs,
+        kill_run, wait_run), so several can run side by side. With ``stream``
+        the call returns right away and the output is fetched while the
+        process runs with read_run_output; otherwise it waits for the end.
+        """
         try:
             cwd = self.current_project_path or os.getcwd()
-            self._running_process = subprocess.Popen(
-                command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
-                text=True, cwd=cwd, preexec_fn=os.setsid
-            )
-            try:
-                timeout_val = float(timeout) if timeout and float(timeout) > 0 else None
-                stdout, stderr = self._running_process.communicate(timeout=timeout_val)
-                code = self._running_process.returncode
-                self._running_process = None
-                return {'success': True, 'stdout': stdout, 'stderr': stderr, 'code': code}
-            except subprocess.TimeoutExpired:
-                try:
-                    os.killpg(os.getpgid(self._running_process.pid), signal.SIGTERM)
-                    self._running_process.wait(timeout=5)
-                except Exception:
-                    pass
-                self._running_process = None
-                return {'success': True, 'stdout': '', 'stderr': '', 'code': 124, 'timeout': True}
+            timeout_val = float(timeout) if timeout and float(timeout) > 0 else None
+            run = self.runs.start(command, cwd, timeout_val, self._output_capture())
+            if stream:
+                return {'success': True, 'run_id': run.id, 'pid': run.process.pid}
+            run.output.wait()
+            # Universal newlines and code 124 on timeout, as the text-mode Popen gave before.
+            result = {'success': True, 'run_id': run.id, 'stdout': universal_newlines(run.output.text('stdout')),
+                      'stderr': universal_newlines(run.output.text('stderr')), 'code': run.output.code}
+            if run.output.timeout:
+                result['timeout'] = True
+            if run.output.log_path:
+                result['log_path'] = run.output.log_path
+            return result
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    def read_run_output(self, run_id, since_seq=0, wait=0.5):
+        """Output chunks of a streaming run from since_seq on.
+
+        Waits up to ``wait`` seconds (at most 2) for new output, so a polling
+        loop sees it with that much latency at worst. ``done`` turns true once
+        the process exited and every chunk was returned.
+        """
+        try:
+            run = self.runs.get(run_id)
+            if run is None:
+                return {'success': False, 'error': 'Ejecución no encontrada'}
+            wait = max(0.0, min(float(wait), 2.0))
+            return {'success': True, 'run_id': run_id, **run.output.read(int(since_seq), wait)}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    def read_run_log(self, run_id, offset=0, limit=run_output.LOG_PAGE_BYTES):
+        """A page of a run's whole output (stdout and stderr as printed) from byte offset on.
+
+        Long output is only partly kept in memory (see read_run_output's
+        ``skipped``); this pages through the full log spilled to build/logs.
+        """
+        try:
+            run = self.runs.get(run_id)
+            if run is None:
+                return {'success': False, 'error': 'Ejecución no encontrada'}
+            limit = max(1, min(int(limit), 4 * run_output.LOG_PAGE_BYTES))
+            return {'success': True, 'run_id': run_id, **run.output.read_log(offset, limit)}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    def open_terminal(self, cwd=None, cols=80, rows=24):
+        """Start a persistent shell on a pseudo-terminal (one per terminal tab)."""
+        try:
+            cwd = os.path.expanduser(cwd or self.current_project_path or '~')
+            session = self.terminals.open(cwd, cols, rows)
+            return {'success': True, 'session_id': session.id, 'pid': session.pid, 'shell': session.shell}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    def terminal_write(self, session_id, data):
+        """Send keyboard input (a command line, Ctrl+C as \x03...) to a terminal."""
+        try:
+            self.terminals.get(session_id).write(data)
+            return {'success': True}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    def read_terminal(self, session_id, since_seq=0, wait=0.5):
+        """Terminal output from since_seq on, as read_run_output; ``done`` once the shell exited."""
+        try:
+            session = self.terminals.get(session_id)
+            wait = max(0.0, min(float(wait), 2.0))
+            return {'success': True, 'session_id': session_id, **session.output.read(int(since_seq), wait)}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    def resize_terminal(self, session_id, cols, rows):
+        try:
+            self.terminals.get(session_id).resize(cols, rows)
+            return {'success': True}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    def close_terminal(self, session_id):
+        try:
+            if not self.terminals.close(session_id):
+                return {'success': False, 'error': 'Terminal no encontrada'}
+            return {'success': True}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    def list_terminals(self):
+        try:
+            return {'success': True, 'sessions': self.terminals.list()}
         except Exception as e:
-            self._running_process = None
             return {'success': False, 'error': str(e)}
 
     def kill_running_process(self):
-        """Kill the currently running project process."""
+        """Kill the most recently started project run that is still running."""
         try:
-            if self._running_process and self._running_process.poll() is None:
-                os.killpg(os.getpgid(self._running_process.pid), signal.SIGTERM)
-                return {'success': True, 'message': 'Proceso cancelado'}
-            return {'success': False, 'error': 'No hay proceso en ejecución'}
-        except ProcessLookupError:
-            self._running_process = None
-            return {'success': True, 'message': 'Proceso ya terminado'}
+            run = self.runs.latest_running()
+            if run is None:
+                return {'success': False, 'error': 'No hay proceso en ejecución'}
+            return self.kill_run(run.id)
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    def list_runs(self):
+        """Project runs, running and recently finished: command, cwd, pid/pgid, times and state."""
+        try:
+            return {'success': True, 'runs': self.runs.list()}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    def kill_run(self, run_id, force=False):
+        """Terminate one run and its child processes (SIGKILL with ``force``)."""
+        try:
+            killed = self.runs.kill(run_id, signal.SIGKILL if force else signal.SIGTERM)
+            if killed is None:
+                return {'success': False, 'error': 'Ejecución no encontrada'}
+            if not killed:
+                return {'success': True, 'message': 'Proceso ya terminado'}
+            return {'success': True, 'message': 'Proceso cancelado'}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    def wait_run(self, run_id, timeout=10):
+        """Wait (at most 60 s) for a run to finish; ``run.state`` is still 'running' on timeout."""
+        try:
+            info = self.runs.wait(run_id, max(0.0, min(float(timeout), 60.0)))
+            if info is None:
+                return {'success': False, 'error': 'Ejecución no encontrada'}
+            return {'success': True, 'run': info}
         except Exception as e:
             return {'success': False, 'error': str(e)}
 
@@ -677,7 +1071,7 @@ class API:
     def compile_project(self):
         if not self.current_project_path:
             return {'success': False, 'error': 'No hay un proyecto abierto para compilar.'}
-        return Packager.create_deb(self.current_project_path)
+        return Packager.create_deb(self.current_project_path, self.fingerprints)
 
     def _resolve_git_repo_path(self, repo_path=None):
         candidate = repo_path or self.current_project_path
@@ -850,8 +1244,7 @@ class API:
                 js_path = main_js
             else:
                 return {'success': False, 'error': f'Módulo "{name}" no encontrado'}
-            with open(js_path, 'r', encoding='utf-8') as f:
-                code = f.read()
+            code = self.content_cache.read_text(js_path)
             valid = code.strip().endswith('// Dex code successful')
             return {'success': True, 'code': code, 'valid': valid}
         except Exception as e:
@@ -865,8 +1258,7 @@ class API:
                 return {'success': False, 'error': 'Acceso denegado: ruta fuera del directorio de módulos'}
             if not os.path.exists(full_path):
                 return {'success': False, 'error': f'Archivo no encontrado: {file_path}'}
-            with open(full_path, 'r', encoding='utf-8') as f:
-                content = f.read()
+            content = self.content_cache.read_text(full_path)
             return {'success': True, 'content': content}
         except Exception as e:
             return {'success': False, 'error': str(e)}
@@ -1037,8 +1429,7 @@ class API:
                                     'extensions', theme_id, 'theme.css')
             if not os.path.exists(css_path):
                 return {'success': False, 'error': f'theme.css no encontrado para "{theme_id}"'}
-            with open(css_path, 'r', encoding='utf-8') as f:
-                css = f.read()
+            css = self.content_cache.read_text(css_path)
             return {'success': True, 'css': css}
         except Exception as e:
             return {'success': False, 'error': str(e)}
@@ -1050,8 +1441,7 @@ class API:
                                     'extensions', theme_id, 'theme.css')
             if not os.path.exists(css_path):
                 return {'success': False, 'error': f'theme.css no encontrado para "{theme_id}"'}
-            with open(css_path, 'r', encoding='utf-8') as f:
-                css = f.read()
+            css = self.content_cache.read_text(css_path)
             return {'success': True, 'css': css}
         except Exception as e:
             return {'success': False, 'error': str(e)}
@@ -1307,6 +1697,7 @@ class API:
             if not os.path.exists(ext_dir):
                 return {'success': False, 'error': 'Extensión no encontrada'}
             shutil.rmtree(ext_dir)
+            self._file_changed(ext_dir)
             self.ext_db.mark_uninstalled(ext_id)
             return {'success': True, 'message': f'Extensión "{ext_id}" desinstalada'}
         except Exception as e:
@@ -1406,16 +1797,14 @@ class API:
             build_dir = os.path.join(self.current_project_path, 'build')
             os.makedirs(build_dir, exist_ok=True)
             zip_path = os.path.join(build_dir, project_name + '.zip')
+            files = list(export_files(self.current_project_path))
+            prints = self.fingerprints.fingerprint_tree(self.current_project_path, files)
+            if os.path.exists(zip_path) and self.fingerprints.load_snapshot(self.current_project_path, 'zip') == prints:
+                return {'success': True, 'message': f'ZIP sin cambios: {zip_path}', 'path': zip_path, 'reused': True}
             with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zf:
-                for root, dirs, files in os.walk(self.current_project_path):
-                    # Skip build dir and hidden dirs
-                    dirs[:] = [d for d in dirs if d != 'build' and not d.startswith('.')]
-                    for file in files:
-                        if file.startswith('.'):
-                            continue
-                        full_path = os.path.join(root, file)
-                        arc_name = os.path.relpath(full_path, self.current_project_path)
-                        zf.write(full_path, os.path.join(project_name, arc_name))
+                for full_path, rel in files:
+                    zf.write(full_path, os.path.join(project_name, rel))
+            self.fingerprints.save_snapshot(self.current_project_path, 'zip', prints)
             return {'success': True, 'message': f'ZIP creado: {zip_path}', 'path': zip_path}
         except Exception as e:
             return {'success': False, 'error': str(e)}
@@ -1430,15 +1819,14 @@ class API:
             build_dir = os.path.join(self.current_project_path, 'build')
             os.makedirs(build_dir, exist_ok=True)
             tar_path = os.path.join(build_dir, project_name + '.tar.gz')
+            files = list(export_files(self.current_project_path))
+            prints = self.fingerprints.fingerprint_tree(self.current_project_path, files)
+            if os.path.exists(tar_path) and self.fingerprints.load_snapshot(self.current_project_path, 'tar') == prints:
+                return {'success': True, 'message': f'Sin cambios: {tar_path}', 'path': tar_path, 'reused': True}
             with tarfile.open(tar_path, 'w:gz') as tf:
-                for root, dirs, files in os.walk(self.current_project_path):
-                    dirs[:] = [d for d in dirs if d != 'build' and not d.startswith('.')]
-                    for file in files:
-                        if file.startswith('.'):
-                            continue
-                        full_path = os.path.join(root, file)
-                        arc_name = os.path.join(project_name, os.path.relpath(full_path, self.current_project_path))
-                        tf.add(full_path, arcname=arc_name)
+                for full_path, rel in files:
+                    tf.add(full_path, arcname=os.path.join(project_name, rel))
+            self.fingerprints.save_snapshot(self.current_project_path, 'tar', prints)
             return {'success': True, 'message': f'Exportado: {tar_path}', 'path': tar_path}
         except Exception as e:
             return {'success': False, 'error': str(e)}
@@ -1705,6 +2093,25 @@ class API:
         except Exception as e:
             return {'success': False, 'error': str(e)}
 
+    def _upload_project_files(self, repo, upload, fresh=False):
+        """Upload the project files changed since the last upload to repo (all of them when fresh)."""
+        root = self.current_project_path
+        snapshot = f'publish:{repo}'
+        files = list(export_files(root))
+        prints = self.fingerprints.fingerprint_tree(root, files)
+        uploaded = {} if fresh else dict(self.fingerprints.load_snapshot(root, snapshot) or {})
+        for full_path, rel in files:
+            if rel not in prints or uploaded.get(rel) == prints[rel]:
+                continue
+            try:
+                with open(full_path, 'rb') as f:
+                    file_content = f.read()
+                upload(rel, file_content)
+                uploaded[rel] = prints[rel]
+            except Exception:
+                pass
+        self.fingerprints.save_snapshot(root, snapshot, uploaded)
+
     def publish_extension_v2(self, token, repo_url=None, create_new=False, repo_name=None):
         """Publish extension to author's own GitHub repo and update central registry"""
         if not self.current_project_path:
@@ -1785,20 +2192,8 @@ class API:
                 with urllib.request.urlopen(req, timeout=15) as resp:
                     return json.loads(resp.read().decode('utf-8'))
 
-            # Upload ALL project files to author's repo
-            for root, dirs, files in os.walk(self.current_project_path):
-                dirs[:] = [d for d in dirs if d != 'build' and not d.startswith('.')]
-                for fname in files:
-                    if fname.startswith('.'):
-                        continue
-                    full_path = os.path.join(root, fname)
-                    rel_path = os.path.relpath(full_path, self.current_project_path)
-                    try:
-                        with open(full_path, 'rb') as f:
-                            file_content = f.read()
-                        upload_file_to_repo(rel_path, file_content)
-                    except Exception:
-                        pass
+            # Upload project files to author's repo (minus .gitignore/.dexignore matches)
+            self._upload_project_files(f'{owner}/{repo}', upload_file_to_repo, fresh=create_new)
 
             # Build entry for registry/DB
             new_entry = {
@@ -2133,20 +2528,8 @@ class API:
                 with urllib.request.urlopen(req, timeout=15) as resp:
                     return json.loads(resp.read().decode('utf-8'))
 
-            # Upload ALL project files to author's repo
-            for root, dirs, files in os.walk(self.current_project_path):
-                dirs[:] = [d for d in dirs if d != 'build' and not d.startswith('.')]
-                for fname in files:
-                    if fname.startswith('.'):
-                        continue
-                    full_path = os.path.join(root, fname)
-                    rel_path = os.path.relpath(full_path, self.current_project_path)
-                    try:
-                        with open(full_path, 'rb') as f:
-                            file_content = f.read()
-                        upload_file_to_repo(rel_path, file_content)
-                    except Exception:
-                        pass
+            # Upload project files to author's repo (minus .gitignore/.dexignore matches)
+            self._upload_project_files(f'{owner}/{repo}', upload_file_to_repo)
 
             # Build entry for registry/DB
             new_entry = {
@@ -2416,6 +2799,7 @@ class API:
             os.makedirs(os.path.dirname(full_path), exist_ok=True)
             with open(full_path, 'w', encoding='utf-8') as f:
                 f.write(content)
+            self._file_changed(full_path)
             return {'success': True}
         except Exception as e:
             return {'success': False, 'error': str(e)}
@@ -2433,8 +2817,15 @@ class API:
             dest_path = os.path.join(dest_dir, name)
             if os.path.exists(dest_path):
                 return {'success': False, 'error': f'Ya existe "{name}" en el destino'}
-            shutil.move(source_path, dest_path)
-            return {'success': True, 'new_path': dest_path}
+
+            def work(job):
+                file_jobs.move_item(job, source_path, dest_path)
+                self._file_changed(source_path)
+                self._file_changed(dest_path)
+
+            job = self.file_jobs.start('move', name, work,
+                                       cleanup=file_jobs.remove_created)
+            return {'success': True, 'new_path': dest_path, 'job_id': job.id}
         except Exception as e:
             return {'success': False, 'error': str(e)}
 
@@ -2540,11 +2931,14 @@ class API:
                 ts = datetime.now().strftime('%Y%m%d-%H%M%S')
                 dest = os.path.join(dst_dir, f'{name}-{ts}{ext}')
 
-            shutil.copy2(src, dest)
+            job = self.file_jobs.start('import', os.path.basename(dest),
+                                       lambda job: file_jobs.copy_item(job, src, dest),
+                                       cleanup=file_jobs.remove_created)
             return {
                 'success': True,
                 'imported_path': dest,
-                'file_name': os.path.basename(dest)
+                'file_name': os.path.basename(dest),
+                'job_id': job.id
             }
         except Exception as e:
             return {'success': False, 'error': str(e)}
@@ -2861,8 +3255,8 @@ class API:
                 ts = datetime.now().strftime('%Y%m%d-%H%M%S')
                 name, ext = os.path.splitext(base)
                 dest = os.path.join(downloads, f'{name}-{ts}{ext}')
-            shutil.copy2(src, dest)
-            return {'success': True, 'message': 'Archivo copiado a Downloads', 'path': dest}
+            strategy = fast_copy(src, dest)
+            return {'success': True, 'message': 'Archivo copiado a Downloads', 'path': dest, 'copy_strategy': strategy}
         except Exception as e:
             return {'success': False, 'error': str(e)}
 
@@ -2919,6 +3313,175 @@ class API:
             return {'success': False, 'error': 'No hay repositorio seleccionado'}
         return self.git_service.diff(repo, path)
 
+    def get_file_job(self, job_id):
+        """Progress of a background file job (bytes/files done and total, state)."""
+        try:
+            job = self.file_jobs.get(job_id)
+            if job is None:
+                return {'success': False, 'error': 'Tarea no encontrada'}
+            return {'success': True, 'job': job.to_dict()}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    def cancel_file_job(self, job_id):
+        """Cancel a background file job; its partial destination is removed."""
+        try:
+            if not self.file_jobs.cancel(job_id):
+                return {'success': False, 'error': 'Tarea no encontrada'}
+            return {'success': True}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    def list_file_jobs(self):
+        try:
+            return {'success': True, 'jobs': self.file_jobs.list()}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    def search_in_project(self, query, regex=False, case=False, globs=None, limit=2000, root=None, page_size=200):
+        """Search file contents of the project on a worker pool.
+
+        Returns the first page of results (file, line, column, text) as soon as
+        it is ready; fetch the rest with get_search_results(search_id, next_cursor)
+        until ``done``.
+        """
+        try:
+            root = os.path.expanduser(root or self.current_project_path or '')
+            if not root:
+                return {'success': False, 'error': 'No hay un proyecto abierto'}
+            job = self.search_service.start(root, query, regex, case, globs, int(limit))
+            return {'success': True, **self.search_service.page(job, 0, int(page_size), wait=0.05)}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    def quick_open(self, query, limit=50):
+        """Fuzzy file-name lookup in the open project (basename matches and recent files first)."""
+        try:
+            if not self.quick_open_index.root:
+                if not self.current_project_path:
+                    return {'success': False, 'error': 'No hay un proyecto abierto'}
+                self.quick_open_index.prepare(os.path.expanduser(self.current_project_path))
+            results, ready = self.quick_open_index.query(query or '', max(1, min(int(limit), 500)))
+            return {'success': True, 'results': results, 'ready': ready}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    def get_outline(self, path):
+        """Classes, functions, assignments and imports of a Python file, in source order."""
+        try:
+            if not path.endswith(('.py', '.pyw', '.pyi')):
+                return {'success': True, 'symbols': []}
+            return {'success': True, 'symbols': self.symbol_index.outline(path)}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    def find_symbol(self, name, limit=100):
+        """Definitions of a Python symbol across the open project (go to definition)."""
+        try:
+            if not self.symbol_index.root:
+                if not self.current_project_path:
+                    return {'success': False, 'error': 'No hay un proyecto abierto'}
+                self.symbol_index.prepare(os.path.expanduser(self.current_project_path))
+            results, ready = self.symbol_index.find(name or '', max(1, min(int(limit), 1000)))
+            return {'success': True, 'results': results, 'ready': ready}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    def get_search_results(self, search_id, cursor=0, page_size=200):
+        try:
+            job = self.search_service.get(search_id)
+            if job is None:
+                return {'success': False, 'error': 'Búsqueda no encontrada'}
+            return {'success': True, **self.search_service.page(job, int(cursor), int(page_size), wait=0.25)}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    def cancel_search(self, search_id):
+        try:
+            if not self.search_service.cancel(search_id):
+                return {'success': False, 'error': 'Búsqueda no encontrada'}
+            return {'success': True}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    def replace_in_project(self, query, replacement, regex=False, globs=None, dry_run=True, case=False,
+                           root=None, expected=None):
+        """Find and replace across the project in one call.
+
+        With ``dry_run`` nothing is written and each file comes back with its
+        replacement count, the changed lines and its content hash. Passing
+        those hashes back as ``expected`` ({path: hash}) applies only to those
+        files, and skips any that changed since the preview. An applied
+        replace returns an ``undo_id`` for undo_replace.
+        """
+        try:
+            root = root or self.current_project_path
+            if not root:
+                return {'success': False, 'error': 'No hay un proyecto abierto'}
+            root = os.path.realpath(os.path.expanduser(root))
+            if not os.path.isdir(root):
+                return {'success': False, 'error': 'El proyecto no existe'}
+            if dry_run:
+                files = self.project_replacer.preview(root, query, replacement, regex, case, globs)
+                return {'success': True, 'dry_run': True, 'files': files,
+                        'total': sum(f['count'] for f in files)}
+            undo_id, files, conflicts = self.project_replacer.apply(root, query, replacement, regex, case,
+                                                                    globs, expected)
+            with self.tree_service.batch():
+                for f in files:
+                    self._file_changed(f['path'])
+            return {'success': True, 'dry_run': False, 'undo_id': undo_id, 'files': files,
+                    'total': sum(f['count'] for f in files), 'conflicts': conflicts}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    def undo_replace(self, undo_id):
+        """Put back the files of a replace_in_project, except those edited since."""
+        try:
+            restored, conflicts = self.project_replacer.undo(undo_id)
+            with self.tree_service.batch():
+                for path in restored:
+                    self._file_changed(path)
+            return {'success': not conflicts, 'restored': restored, 'conflicts': conflicts,
+                    **({'error': f'{len(conflicts)} archivo(s) cambiaron después del reemplazo'} if conflicts else {})}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    def list_replace_undo(self):
+        try:
+            return {'success': True, 'entries': self.project_replacer.list_undo()}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    def apply_file_ops(self, ops):
+        """Run a batch of create/delete/move/rename/copy operations (multi-select actions).
+
+        The whole batch is validated first and nothing runs if any operation is
+        invalid. Then each one is executed in order with its own result, and the
+        explorer gets a single change notification for all of them.
+        """
+        try:
+            planned, errors = plan_ops(ops)
+            if errors:
+                return {'success': False, 'error': errors[0]['error'], 'errors': errors}
+            results = []
+            with self.tree_service.batch():
+                for index, op in enumerate(planned):
+                    try:
+                        paths = run_op(op, delete=self._delete_path)
+                        for changed in paths:
+                            self._file_changed(changed)
+                        results.append({'index': index, 'op': op['op'], 'success': True, 'paths': paths})
+                    except Exception as e:
+                        results.append({'index': index, 'op': op['op'], 'success': False, 'error': str(e)})
+            failed = [r for r in results if not r['success']]
+            response = {'success': not failed, 'results': results}
+            if failed:
+                response['error'] = f'{len(failed)} de {len(results)} operaciones fallaron'
+            return response
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
     def duplicate_item(self, path):
         """Duplicate a file or folder"""
         try:
@@ -2934,10 +3497,9 @@ class API:
                 counter += 1
                 new_name = f'{base} (copia {counter}){ext}'
                 new_path = os.path.join(parent, new_name)
-            if os.path.isdir(path):
-                shutil.copytree(path, new_path)
-            else:
-                shutil.copy2(path, new_path)
-            return {'success': True, 'new_path': new_path}
+            job = self.file_jobs.start('duplicate', new_name,
+                                       lambda job: file_jobs.copy_item(job, path, new_path),
+                                       cleanup=file_jobs.remove_created)
+            return {'success': True, 'new_path': new_path, 'job_id': job.id}
         except Exception as e:
             return {'success': False, 'error': str(e)}
@@ -0,0 +1,138 @@
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.run_output import StreamingRun
+
+
+class CommandJob:
+    def __init__(self, command, cwd, timeout, capture=None, detach=True):
+        self.id = uuid.uuid4().hex
+        self.command = command
+        self.cwd = cwd
+        self.timeout = timeout
+        self.capture = capture
+        self.detach = detach
+        self.submitted = time.time()
+        self.run = None
+        self.future = None
+        self.cancelled = False
+        self.error = None
+        self.finished = threading.Event()
+
+    @property
+    def state(self):
+        if self.run is not None:
+            state = self.run.state
+            return 'cancelled' if state == 'killed' else state
+        if self.cancelled:
+            return 'cancelled'
+        if self.error is not None:
+            return 'error'
+        return 'queued'
+
+    def info(self):
+        info = {
+            'job_id': self.id,
+            'command': self.command,
+            'state': self.state,
+            'submitted': self.submitted,
+            'started': self.run.started if self.run else None,
+            'ended': self.run.ended if self.run else None,
+            'pid': self.run.process.pid if self.run else None
+        }
+        if self.error is not None:
+            info['error'] = self.error
+        return info
+
+
+class CommandJobs:
+    """Shell commands run on a bounded pool instead of inside the bridge call.
+
+    ``submit`` returns a job at once; at most ``workers`` commands run at the
+    same time and at most ``max_queued`` wait for a slot, so slow commands
+    (apt, pip, network checks) cannot pile up threads. Each command is a
+    StreamingRun: own process group, optional timeout, killed on cancel.
+    Jobs submitted with ``detach=False`` keep the app's session and stdin
+    instead (see StreamingRun), so sudo can still prompt; cancelling those
+    only signals the shell.
+    """
+
+    KEEP_FINISHED = 50
+
+    def __init__(self, workers=4, max_queued=32):
+        self.max_queued = max_queued
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='dex-command')
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, command, cwd, timeout=None, capture=None, detach=True):
+        job = CommandJob(command, cwd, timeout, capture, detach)
+        with self._lock:
+            queued = sum(1 for j in self._jobs.values() if j.state == 'queued')
+            if queued >= self.max_queued:
+                raise RuntimeError('Demasiados comandos en cola')
+            self._jobs[job.id] = job
+            finished = [j for j in self._jobs.values() if j.finished.is_set()]
+            for old in finished[:max(0, len(finished) - self.KEEP_FINISHED)]:
+                self._jobs.pop(old.id, None)
+            job.future = self._pool.submit(self._execute, job)
+        return job
+
+    def _execute(self, job):
+        try:
+            with self._lock:
+                if job.cancelled:
+                    return
+                job.run = StreamingRun(job.command, job.cwd, job.timeout, job.capture, job.detach)
+            job.run.output.wait()
+        except Exception as e:
+            job.error = str(e)
+        finally:
+            job.finished.set()
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job):
+        """Drop a queued job or kill a running one; False when it had already finished."""
+        with self._lock:
+            if job.finished.is_set():
+                return False
+            job.cancelled = True
+            run = job.run
+            if run is None:
+                if job.future.cancel():
+                    job.finished.set()
+                return True
+        run.killed = True
+        run.terminate()
+        return True
+
+    def result(self, job, wait=0.0):
+        """Status of job; once finished, with stdout, stderr and code as run_command returns them."""
+        job.finished.wait(wait)
+        info = job.info()
+        if job.finished.is_set() and job.run is not None:
+            output = job.run.output
+            info.update({'stdout': output.text('stdout'), 'stderr': output.text('stderr'), 'code': output.code})
+            if output.log_path:
+                info['log_path'] = output.log_path
+            if output.timeout:
+                info['timeout'] = True
+        info['done'] = job.finished.is_set()
+        return info
+
+    def list(self):
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return [job.info() for job in jobs]
+
+    def cancel_all(self):
+        with self._lock:
+            jobs = [j for j in self._jobs.values() if not j.finished.is_set()]
+        for job in jobs:
+            self.cancel(job)
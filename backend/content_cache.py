@@ -0,0 +1,103 @@
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+from backend.file_writer import universal_newlines
+
+
+class ContentCache:
+    """LRU cache of file contents keyed by path, validated by (st_mtime_ns, st_size).
+
+    Entries are raw bytes or decoded text (one per encoding). The total size
+    is kept under ``max_bytes``; files bigger than ``max_entry_bytes`` are
+    read straight from disk. Writes done by the API call ``invalidate`` so a
+    change within the filesystem's timestamp granularity is not missed.
+    """
+
+    def __init__(self, max_bytes=32 * 1024 * 1024, max_entry_bytes=4 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _key(self, path, encoding):
+        return (os.path.abspath(path), encoding)
+
+    def _lookup(self, key, stamp):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == stamp:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return None
+
+    def _store(self, key, stamp, value):
+        cost = sys.getsizeof(value)
+        if cost > self.max_entry_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.total_bytes -= old[2]
+            self._entries[key] = (stamp, value, cost)
+            self.total_bytes += cost
+            while self.total_bytes > self.max_bytes and self._entries:
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                self.total_bytes -= evicted
+                self.evictions += 1
+
+    def read_bytes(self, path):
+        with open(path, 'rb') as f:
+            st = os.fstat(f.fileno())
+            stamp = (st.st_mtime_ns, st.st_size)
+            key = self._key(path, None)
+            data = self._lookup(key, stamp)
+            if data is None:
+                data = f.read()
+                self._store(key, stamp, data)
+            return data
+
+    def read_text(self, path, encoding='utf-8'):
+        """Decoded like open(path, 'r', encoding=encoding).read() (newlines translated)."""
+        with open(path, 'rb') as f:
+            st = os.fstat(f.fileno())
+            stamp = (st.st_mtime_ns, st.st_size)
+            key = self._key(path, encoding)
+            text = self._lookup(key, stamp)
+            if text is None:
+                text = universal_newlines(f.read().decode(encoding))
+                self._store(key, stamp, text)
+            return text
+
+    def invalidate(self, path):
+        """Drop every entry for path, or below it when path is a folder."""
+        path = os.path.abspath(path)
+        prefix = path.rstrip(os.sep) + os.sep
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == path or k[0].startswith(prefix)]:
+                self.total_bytes -= self._entries.pop(key)[2]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.total_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0
+            }
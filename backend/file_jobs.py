@@ -0,0 +1,231 @@
+import os
+import time
+import uuid
+import errno
+import shutil
+import threading
+from collections import OrderedDict
+
+from backend.copy_engine import fast_copy
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class FileJob:
+    """State of one background file operation, as polled by the UI."""
+
+    def __init__(self, kind, label):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.label = label
+        self.state = 'running'
+        self.error = None
+        self.bytes_done = 0
+        self.bytes_total = 0
+        self.files_done = 0
+        self.files_total = 0
+        # Copy strategy (see copy_engine) -> number of files copied with it.
+        self.strategies = {}
+        self.started = time.time()
+        self.finished = None
+        # Set once the destination is complete and the source is being changed:
+        # from then on a failure must not remove the destination.
+        self.committed = False
+        # Top-level paths this job created itself; the only ones cleanup may remove.
+        self.created = []
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def check(self):
+        """Raise JobCancelled once cancel() was requested; called between copy chunks."""
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'label': self.label,
+            'state': self.state,
+            'error': self.error,
+            'bytes_done': self.bytes_done,
+            'bytes_total': self.bytes_total,
+            'files_done': self.files_done,
+            'files_total': self.files_total,
+            'strategies': dict(self.strategies),
+            'elapsed': round((self.finished or time.time()) - self.started, 3)
+        }
+
+
+class FileJobManager:
+    """Runs file operations on worker threads and keeps their progress for polling.
+
+    ``work(job)`` does the operation and raises JobCancelled when the job is
+    cancelled; ``cleanup(job)`` then runs (also after an error) to remove the
+    partial result. Finished jobs are kept for a while so the UI can read the
+    final state.
+    """
+
+    KEEP_FINISHED = 50
+
+    def __init__(self):
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def start(self, kind, label, work, cleanup=None):
+        job = FileJob(kind, label)
+        with self._lock:
+            self._jobs[job.id] = job
+            finished = [j for j in self._jobs.values() if j.state != 'running']
+            for old in finished[:max(0, len(finished) - self.KEEP_FINISHED)]:
+                self._jobs.pop(old.id, None)
+        threading.Thread(target=self._run, args=(job, work, cleanup),
+                         name=f'dex-job-{kind}', daemon=True).start()
+        return job
+
+    def _run(self, job, work, cleanup):
+        try:
+            work(job)
+            job.state = 'done'
+        except JobCancelled:
+            job.state = 'cancelled'
+        except Exception as e:
+            job.state = 'error'
+            job.error = str(e)
+        if job.state != 'done' and cleanup and not job.committed:
+            try:
+                cleanup(job)
+            except Exception as e:
+                print(f'[FileJobManager] Error limpiando {job.kind}: {e}')
+        job.finished = time.time()
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job is None:
+            return False
+        job.cancel()
+        return True
+
+    def list(self):
+        with self._lock:
+            return [job.to_dict() for job in self._jobs.values()]
+
+
+# ── Operations ───────────────────────────────────────────────────────
+
+def measure(path):
+    """(bytes, files) below path, without following symlinks."""
+    if not os.path.isdir(path) or os.path.islink(path):
+        try:
+            return os.lstat(path).st_size, 1
+        except OSError:
+            return 0, 1
+    total = files = 0
+    for root, dirs, names in os.walk(path):
+        for name in names:
+            files += 1
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total, files
+
+
+def copy_file(job, src, dst, top=True):
+    """Copy one file or symlink to dst, which must not exist (checked atomically)."""
+    if os.path.islink(src):
+        os.symlink(os.readlink(src), dst)
+        if top:
+            job.created.append(dst)
+        job.bytes_done += os.lstat(src).st_size
+    else:
+        # O_EXCL: never truncate a file that appeared after the caller's check.
+        os.close(os.open(dst, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666))
+        if top:
+            job.created.append(dst)
+
+        def progress(n):
+            job.bytes_done += n
+        strategy = fast_copy(src, dst, progress, job.check)
+        job.strategies[strategy] = job.strategies.get(strategy, 0) + 1
+    job.files_done += 1
+
+
+def copy_tree(job, src, dst):
+    parent = os.path.dirname(dst)
+    if parent:
+        os.makedirs(parent, exist_ok=True)
+    # Fails if dst exists, so two jobs never share (and clean up) one folder.
+    os.mkdir(dst)
+    job.created.append(dst)
+    for root, dirs, names in os.walk(src):
+        target = os.path.join(dst, os.path.relpath(root, src))
+        for name in dirs:
+            path = os.path.join(root, name)
+            if os.path.islink(path):
+                # os.walk does not descend into links; copy them as links.
+                os.symlink(os.readlink(path), os.path.join(target, name))
+            else:
+                os.makedirs(os.path.join(target, name), exist_ok=True)
+        for name in names:
+            job.check()
+            copy_file(job, os.path.join(root, name), os.path.join(target, name), top=False)
+    for root, dirs, _names in os.walk(src, topdown=False):
+        target = os.path.join(dst, os.path.relpath(root, src))
+        if not os.path.islink(root):
+            shutil.copystat(root, target)
+
+
+def copy_item(job, src, dst):
+    """Copy a file or folder to dst (which must not exist yet)."""
+    job.bytes_total, job.files_total = measure(src)
+    if os.path.isdir(src) and not os.path.islink(src):
+        copy_tree(job, src, dst)
+    else:
+        copy_file(job, src, dst)
+
+
+def move_item(job, src, dst):
+    """Rename when possible; across filesystems copy then delete the source."""
+    try:
+        os.rename(src, dst)
+        job.files_done = job.files_total = 1
+        return
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+    job.bytes_total, job.files_total = measure(src)
+    if os.path.isdir(src) and not os.path.islink(src):
+        copy_tree(job, src, dst)
+    else:
+        copy_file(job, src, dst)
+    job.check()
+    # The copy is complete: the job finishes even if cancelled now.
+    job.committed = True
+    remove_path(src)
+
+
+def remove_created(job):
+    """Cleanup for cancelled or failed copies: remove what this job created, nothing else."""
+    for path in reversed(job.created):
+        remove_path(path)
+    job.created = []
+
+
+def remove_path(path):
+    """Cleanup policy for cancelled or failed copies: drop the partial destination."""
+    if os.path.islink(path) or not os.path.isdir(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+    else:
+        shutil.rmtree(path, ignore_errors=True)
@@ -0,0 +1,152 @@
+import os
+
+from backend import file_jobs
+from backend.file_jobs import FileJob
+
+
+OPS = ('create', 'delete', 'move', 'rename', 'copy')
+
+
+class _PlannedFs:
+    """Existence of paths as the batch goes: disk state plus the earlier operations."""
+
+    def __init__(self):
+        self.created = {}
+        self.removed = set()
+
+    def _removed(self, path):
+        while True:
+            if path in self.removed:
+                return True
+            parent = os.path.dirname(path)
+            if parent == path:
+                return False
+            path = parent
+
+    def exists(self, path):
+        if path in self.created:
+            return True
+        return os.path.lexists(path) and not self._removed(path)
+
+    def is_dir(self, path):
+        if path in self.created:
+            return self.created[path]
+        return os.path.isdir(path) and not self._removed(path)
+
+    def add(self, path, is_dir):
+        self.removed.discard(path)
+        self.created[path] = is_dir
+
+    def remove(self, path):
+        self.created.pop(path, None)
+        self.removed.add(path)
+
+
+def _normalize(op):
+    kind = op.get('op')
+    if kind not in OPS:
+        raise ValueError(f'Operación desconocida: {kind}')
+    path = op.get('path')
+    if not path:
+        raise ValueError('Falta la ruta')
+    out = {'op': kind, 'path': os.path.abspath(os.path.expanduser(path))}
+    if kind == 'create':
+        out['is_dir'] = bool(op.get('is_dir'))
+        out['content'] = op.get('content') or ''
+    elif kind == 'rename':
+        new_path = op.get('new_path')
+        if not new_path:
+            raise ValueError('Falta new_path')
+        out['target'] = os.path.abspath(os.path.expanduser(new_path))
+    elif kind in ('move', 'copy'):
+        dest_dir = op.get('dest_dir')
+        if not dest_dir:
+            raise ValueError('Falta dest_dir')
+        dest_dir = os.path.abspath(os.path.expanduser(dest_dir))
+        out['dest_dir'] = dest_dir
+        out['target'] = os.path.join(dest_dir, op.get('name') or os.path.basename(out['path']))
+    return out
+
+
+def plan_ops(ops):
+    """Validate a whole batch before touching the disk.
+
+    Each operation is checked against the state left by the previous ones
+    (a file created earlier in the batch can be moved later, and so on).
+    Returns ``(planned, errors)``; errors is a list of ``{'index', 'error'}``.
+    """
+    planned = []
+    errors = []
+    fs = _PlannedFs()
+    if not isinstance(ops, list):
+        return [], [{'index': None, 'error': 'Se esperaba una lista de operaciones'}]
+    for index, raw in enumerate(ops):
+        try:
+            if not isinstance(raw, dict):
+                raise ValueError('Operación inválida')
+            op = _normalize(raw)
+            path = op['path']
+            kind = op['op']
+            if kind == 'create':
+                if fs.exists(path):
+                    raise ValueError(f'Ya existe: {os.path.basename(path)}')
+                if not fs.is_dir(os.path.dirname(path)):
+                    raise ValueError('El directorio padre no existe')
+                fs.add(path, op['is_dir'])
+            else:
+                if not fs.exists(path):
+                    raise ValueError(f'No encontrado: {os.path.basename(path)}')
+                if kind == 'delete':
+                    fs.remove(path)
+                else:
+                    target = op['target']
+                    if kind in ('move', 'copy') and not fs.is_dir(op['dest_dir']):
+                        raise ValueError('Destino no es un directorio')
+                    if kind == 'rename' and not fs.is_dir(os.path.dirname(target)):
+                        raise ValueError('El directorio destino no existe')
+                    if fs.exists(target):
+                        raise ValueError(f'Ya existe "{os.path.basename(target)}" en el destino')
+                    if target.startswith(path.rstrip(os.sep) + os.sep):
+                        raise ValueError('No se puede mover una carpeta dentro de sí misma')
+                    is_dir = fs.is_dir(path)
+                    if kind != 'copy':
+                        fs.remove(path)
+                    fs.add(target, is_dir)
+            planned.append(op)
+        except ValueError as e:
+            errors.append({'index': index, 'error': str(e)})
+    return planned, errors
+
+
+def run_op(op, delete=None):
+    """Execute one planned operation; returns the paths it changed.
+
+    ``delete(path)`` overrides how deletions are done (the API moves them to the trash).
+    """
+    kind = op['op']
+    path = op['path']
+    if kind == 'create':
+        if op['is_dir']:
+            os.makedirs(path)
+        else:
+            with open(path, 'x', encoding='utf-8') as f:
+                f.write(op['content'])
+        return [path]
+    if kind == 'delete':
+        if delete:
+            delete(path)
+        else:
+            file_jobs.remove_path(path)
+        return [path]
+    target = op['target']
+    job = FileJob(kind, os.path.basename(target))
+    try:
+        if kind == 'copy':
+            file_jobs.copy_item(job, path, target)
+            return [target]
+        file_jobs.move_item(job, path, target)
+        return [path, target]
+    except Exception:
+        if not job.committed and os.path.lexists(path):
+            file_jobs.remove_created(job)
+        raise
@@ -0,0 +1,188 @@
+import os
+import mmap
+import codecs
+import threading
+from array import array
+from collections import OrderedDict
+
+
+def _open_map(path):
+    """(mmap or None for empty files, size, st) for path."""
+    with open(path, 'rb') as f:
+        st = os.fstat(f.fileno())
+        if st.st_size == 0:
+            return None, 0, st
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ), st.st_size, st
+
+
+def _char_start(mm, pos, size):
+    """Move pos forward past UTF-8 continuation bytes (at most 3)."""
+    for _ in range(3):
+        if pos >= size or (mm[pos] & 0xC0) != 0x80:
+            break
+        pos += 1
+    return pos
+
+
+_BOMS = (
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+# Control bytes that do show up in text files: \b \t \n \f \r ESC.
+_TEXT_CONTROLS = frozenset(b'\b\t\n\f\r\x1b')
+
+
+def classify_file(path, sample_size=8192):
+    """Look at the first sample_size bytes only: binary or text, BOM and likely encoding.
+
+    Returns ``{'size', 'binary', 'encoding', 'bom'}``; ``encoding`` is None for
+    binaries. Wide encodings are only recognised by their BOM.
+    """
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        sample = f.read(sample_size)
+    return classify_sample(sample, size)
+
+
+def classify_sample(sample, size):
+    """classify_file for a sample already in memory (the first bytes of a file of size bytes)."""
+    info = {'size': size, 'binary': False, 'encoding': 'utf-8', 'bom': False}
+    for bom, encoding in _BOMS:
+        if sample.startswith(bom):
+            info.update(encoding=encoding, bom=True)
+            return info
+    if b'\0' in sample:
+        info.update(binary=True, encoding=None)
+        return info
+    controls = sum(1 for b in sample if b < 32 and b not in _TEXT_CONTROLS)
+    if sample and controls * 10 > len(sample):
+        info.update(binary=True, encoding=None)
+        return info
+    try:
+        # A multi-byte character may be cut at the end of the sample.
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=len(sample) >= size)
+    except UnicodeDecodeError:
+        try:
+            sample.decode('cp1252')
+            info['encoding'] = 'cp1252'
+        except UnicodeDecodeError:
+            info['encoding'] = 'latin-1'
+    return info
+
+
+class LineIndex:
+    """Byte offset of every line start of a file, built in one pass over the mmap."""
+
+    def __init__(self, mm, size):
+        starts = array('Q', [0])
+        if mm is not None:
+            find = mm.find
+            pos = find(b'\n')
+            while pos != -1:
+                starts.append(pos + 1)
+                pos = find(b'\n', pos + 1)
+            # No phantom empty line after a trailing newline.
+            if starts[-1] == size and len(starts) > 1:
+                starts.pop()
+        self.starts = starts
+        self.size = size
+
+    @property
+    def line_count(self):
+        return len(self.starts) if self.size else 0
+
+    def span(self, start_line, count):
+        """Byte range [begin, end) covering count lines from start_line (0-based)."""
+        total = self.line_count
+        start_line = max(0, min(start_line, total))
+        stop = min(total, start_line + max(0, count))
+        if start_line >= stop:
+            begin = self.starts[start_line] if start_line < total else self.size
+            return begin, begin, start_line, stop
+        begin = self.starts[start_line]
+        end = self.starts[stop] if stop < total else self.size
+        return begin, end, start_line, stop
+
+
+class FileReader:
+    """Windowed reads of large files (byte ranges and line pages) through mmap.
+
+    Line indexes are built on first use and kept for a few files, keyed by
+    (mtime_ns, size) so an edited file is re-indexed.
+    """
+
+    MAX_INDEXES = 4
+
+    def __init__(self):
+        self._indexes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _line_index(self, path, mm, size, st):
+        key = (st.st_mtime_ns, size)
+        with self._lock:
+            cached = self._indexes.get(path)
+            if cached and cached[0] == key:
+                self._indexes.move_to_end(path)
+                return cached[1]
+        index = LineIndex(mm, size)
+        with self._lock:
+            self._indexes[path] = (key, index)
+            self._indexes.move_to_end(path)
+            while len(self._indexes) > self.MAX_INDEXES:
+                self._indexes.popitem(last=False)
+        return index
+
+    def forget(self, path):
+        with self._lock:
+            self._indexes.pop(path, None)
+
+    def read_range(self, path, offset=0, length=65536, encoding='utf-8'):
+        """Decode up to length bytes from offset, snapped to UTF-8 character boundaries."""
+        mm, size, st = _open_map(path)
+        try:
+            index = self._line_index(path, mm, size, st)
+            offset = max(0, min(int(offset), size))
+            end = max(offset, min(size, offset + int(length)))
+            if mm is None:
+                raw = b''
+            else:
+                if encoding == 'utf-8':
+                    offset = _char_start(mm, offset, size)
+                    end = max(offset, _char_start(mm, end, size)) if end < size else end
+                raw = mm[offset:end]
+            return {
+                'content': raw.decode(encoding, errors='replace'),
+                'offset': offset,
+                'length': len(raw),
+                'next_offset': offset + len(raw),
+                'size': size,
+                'line_count': index.line_count,
+                'eof': offset + len(raw) >= size
+            }
+        finally:
+            if mm is not None:
+                mm.close()
+
+    def read_lines(self, path, start_line=0, count=1000, encoding='utf-8'):
+        """Decode count lines from start_line (0-based) using the newline index."""
+        mm, size, st = _open_map(path)
+        try:
+            index = self._line_index(path, mm, size, st)
+            begin, end, first, stop = index.span(int(start_line), int(count))
+            raw = mm[begin:end] if mm is not None else b''
+            return {
+                'content': raw.decode(encoding, errors='replace'),
+                'start_line': first,
+                'count': stop - first,
+                'offset': begin,
+                'next_offset': end,
+                'size': size,
+                'line_count': index.line_count,
+                'eof': stop >= index.line_count
+            }
+        finally:
+            if mm is not None:
+                mm.close()
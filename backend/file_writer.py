@@ -0,0 +1,117 @@
+import os
+import hashlib
+import tempfile
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def universal_newlines(text):
+    """Same newline translation as open(..., 'r'): \\r\\n and \\r become \\n."""
+    if '\r' not in text:
+        return text
+    return text.replace('\r\n', '\n').replace('\r', '\n')
+
+
+def stage_write(path, data):
+    """First half of atomic_write: the new contents in a synced temp file next to path.
+
+    Returns ``(target, tmp)``; ``os.replace(tmp, target)`` publishes it.
+    """
+    path = os.path.realpath(path)
+    dir_path = os.path.dirname(path)
+    try:
+        mode = os.stat(path).st_mode & 0o7777
+    except FileNotFoundError:
+        mode = None
+    fd, tmp = tempfile.mkstemp(prefix='.' + os.path.basename(path) + '.', suffix='.tmp', dir=dir_path)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        if mode is not None:
+            os.chmod(tmp, mode)
+        else:
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(tmp, 0o666 & ~umask)
+    except BaseException:
+        discard_staged(tmp)
+        raise
+    return path, tmp
+
+
+def discard_staged(tmp):
+    try:
+        os.remove(tmp)
+    except OSError:
+        pass
+
+
+def fsync_dir(dir_path):
+    try:
+        dir_fd = os.open(dir_path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
+
+
+def atomic_write(path, data):
+    """Replace path with data: temp file in the same folder, fsync, rename.
+
+    Readers see either the old or the new file, never a partial one; the
+    permission bits of an existing file are kept, and a symlink is written
+    through rather than replaced.
+    """
+    path, tmp = stage_write(path, data)
+    try:
+        os.replace(tmp, path)
+    except BaseException:
+        discard_staged(tmp)
+        raise
+    fsync_dir(os.path.dirname(path))
+
+
+def apply_text_edits(text, edits):
+    """Apply ``[{'start', 'end', 'text'}]`` range edits to text.
+
+    Offsets refer to the original text and count UTF-16 code units, like
+    JavaScript string indexes. Edits must not overlap.
+    """
+    spans = []
+    for edit in edits:
+        start, end = int(edit['start']), int(edit['end'])
+        if start < 0 or end < start:
+            raise ValueError('Rango de edición inválido')
+        spans.append((start, end, edit.get('text') or ''))
+    spans.sort(key=lambda s: (s[0], s[1]))
+    for (_, prev_end, _), (start, _, _) in zip(spans, spans[1:]):
+        if start < prev_end:
+            raise ValueError('Ediciones solapadas')
+
+    if not text or max(text) <= '\uffff':
+        # No astral characters: code units and code points line up.
+        if spans and spans[-1][1] > len(text):
+            raise ValueError('Rango de edición fuera del archivo')
+        parts = []
+        pos = 0
+        for start, end, new in spans:
+            parts.append(text[pos:start])
+            parts.append(new)
+            pos = end
+        parts.append(text[pos:])
+        return ''.join(parts)
+
+    buf = bytearray(text.encode('utf-16-le'))
+    if spans and spans[-1][1] * 2 > len(buf):
+        raise ValueError('Rango de edición fuera del archivo')
+    for start, end, new in reversed(spans):
+        buf[start * 2:end * 2] = new.encode('utf-16-le')
+    return buf.decode('utf-16-le')
@@ -0,0 +1,204 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.ignore_rules import IgnoreMatcher
+
+
+HASH_WORKERS = min(8, os.cpu_count() or 2)
+READ_CHUNK = 1024 * 1024
+
+
+def digest_bytes(data):
+    """Digest of data, as hash_file computes it for a file holding those bytes."""
+    return hashlib.blake2b(data, digest_size=20).hexdigest()
+
+
+def hash_file(path):
+    """(blake2b hex digest, stat) of path; stat is None when the file changed while being read."""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as f:
+        before = os.fstat(f.fileno())
+        while True:
+            chunk = f.read(READ_CHUNK)
+            if not chunk:
+                break
+            digest.update(chunk)
+        after = os.fstat(f.fileno())
+    if (before.st_mtime_ns, before.st_size) != (after.st_mtime_ns, after.st_size):
+        return digest.hexdigest(), None
+    return digest.hexdigest(), after
+
+
+def export_files(root):
+    """(path, rel) of the files exports and publishing include.
+
+    Ignore files are honoured; ``build/``, hidden folders and dotfiles are
+    left out, as the archive exporters and GitHub uploads always did.
+    """
+    for dir_path, dirs, files in IgnoreMatcher(root).walk():
+        dirs[:] = [d for d in dirs if d != 'build' and not d.startswith('.')]
+        for name in files:
+            if name.startswith('.'):
+                continue
+            path = os.path.join(dir_path, name)
+            yield path, os.path.relpath(path, root).replace(os.sep, '/')
+
+
+class FingerprintStore:
+    """Content hashes of files, remembered by (path, mtime_ns, size, inode).
+
+    Kept in ``~/.dex-studio/fingerprints.sqlite`` so that exports,
+    publishing and the search index can tell which files changed without
+    re-reading the ones that did not. Only files whose stat changed are
+    hashed, on a thread pool (hashlib releases the GIL on big buffers).
+
+    Named snapshots ({rel: digest} of a tree at some point, e.g. the last
+    upload to a repository) are stored alongside, for ``changed_since``.
+    """
+
+    def __init__(self, db_path=None, workers=HASH_WORKERS):
+        self.db_path = db_path or os.path.join(os.path.expanduser("~"), '.dex-studio', 'fingerprints.sqlite')
+        self.workers = workers
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _db(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.executescript('''
+                PRAGMA journal_mode = WAL;
+                PRAGMA synchronous = NORMAL;
+                CREATE TABLE IF NOT EXISTS files (
+                    path TEXT PRIMARY KEY,
+                    mtime_ns INTEGER,
+                    size INTEGER,
+                    inode INTEGER,
+                    digest TEXT
+                );
+                CREATE TABLE IF NOT EXISTS snapshots (
+                    root TEXT,
+                    name TEXT,
+                    created REAL,
+                    data TEXT,
+                    PRIMARY KEY (root, name)
+                );
+            ''')
+        return self._conn
+
+    @staticmethod
+    def _stamp(st):
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def _hash_and_store(self, items):
+        """Hash [(path, key)] in parallel; returns {key: digest} of those still readable."""
+        def one(item):
+            try:
+                return item, hash_file(item[0])
+            except OSError:
+                return item, None
+
+        digests = {}
+        rows = []
+        if len(items) > 1:
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='dex-hash') as pool:
+                hashed = list(pool.map(one, items))
+        else:
+            hashed = [one(item) for item in items]
+        for (path, key), result in hashed:
+            if result is None:
+                continue
+            digest, st = result
+            digests[key] = digest
+            if st is not None:
+                rows.append((path, st.st_mtime_ns, st.st_size, st.st_ino, digest))
+        if rows:
+            with self._lock:
+                conn = self._db()
+                conn.executemany('INSERT OR REPLACE INTO files (path, mtime_ns, size, inode, digest) '
+                                 'VALUES (?, ?, ?, ?, ?)', rows)
+                conn.commit()
+        return digests
+
+    def remember(self, path, st, digest):
+        """Record a digest the caller computed from contents it read anyway."""
+        with self._lock:
+            conn = self._db()
+            conn.execute('INSERT OR REPLACE INTO files (path, mtime_ns, size, inode, digest) VALUES (?, ?, ?, ?, ?)',
+                         (os.path.abspath(path), st.st_mtime_ns, st.st_size, st.st_ino, digest))
+            conn.commit()
+
+    def fingerprint(self, path, st=None):
+        """Digest of one file, read only if its stat changed since it was last hashed."""
+        path = os.path.abspath(path)
+        st = st or os.stat(path)
+        with self._lock:
+            row = self._db().execute('SELECT mtime_ns, size, inode, digest FROM files WHERE path = ?',
+                                     (path,)).fetchone()
+        if row and tuple(row[:3]) == self._stamp(st):
+            return row[3]
+        return self._hash_and_store([(path, path)]).get(path)
+
+    def fingerprint_tree(self, root, files=None):
+        """{rel: digest} of the files below root (``export_files`` unless given as [(path, rel)])."""
+        root = os.path.abspath(root)
+        full_walk = files is None
+        files = list(export_files(root) if full_walk else files)
+        prefix = root + os.sep
+        with self._lock:
+            known = {path: (tuple(stamp), digest) for path, *stamp, digest in self._db().execute(
+                'SELECT path, mtime_ns, size, inode, digest FROM files WHERE path >= ? AND path < ?',
+                (prefix, root + chr(ord(os.sep) + 1)))}
+        prints = {}
+        misses = []
+        for path, rel in files:
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entry = known.get(path)
+            if entry and entry[0] == self._stamp(st):
+                prints[rel] = entry[1]
+            else:
+                misses.append((path, rel))
+        prints.update(self._hash_and_store(misses))
+        if full_walk:
+            listed = {path for path, _rel in files}
+            gone = [(path,) for path in known if path not in listed]
+            if gone:
+                with self._lock:
+                    conn = self._db()
+                    conn.executemany('DELETE FROM files WHERE path = ?', gone)
+                    conn.commit()
+        return prints
+
+    # ── Snapshots ────────────────────────────────────────────────────
+
+    def save_snapshot(self, root, name, prints):
+        with self._lock:
+            conn = self._db()
+            conn.execute('INSERT OR REPLACE INTO snapshots (root, name, created, data) VALUES (?, ?, ?, ?)',
+                         (os.path.abspath(root), name, time.time(), json.dumps(prints)))
+            conn.commit()
+
+    def load_snapshot(self, root, name):
+        with self._lock:
+            row = self._db().execute('SELECT data FROM snapshots WHERE root = ? AND name = ?',
+                                     (os.path.abspath(root), name)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def changed_since(self, root, name, prints=None):
+        """{'added', 'modified', 'removed'} rel paths against snapshot name (all added if there is none)."""
+        if prints is None:
+            prints = self.fingerprint_tree(root)
+        old = self.load_snapshot(root, name) or {}
+        return {
+            'added': sorted(rel for rel in prints if rel not in old),
+            'modified': sorted(rel for rel, digest in prints.items() if rel in old and old[rel] != digest),
+            'removed': sorted(rel for rel in old if rel not in prints)
+        }
@@ -0,0 +1,204 @@
+import os
+import errno
+import select
+import struct
+import threading
+import ctypes
+import ctypes.util
+
+
+# inotify(7) event masks
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_DONT_FOLLOW = 0x02000000
+IN_ISDIR = 0x40000000
+
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO |
+              IN_CLOSE_WRITE | IN_DELETE_SELF | IN_MOVE_SELF |
+              IN_ONLYDIR | IN_DONT_FOLLOW)
+
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+def _load_libc():
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+class InotifyWatcher:
+    """Thin inotify wrapper: one watch per directory, events batched to a callback.
+
+    The callback receives a list of ``(dir_path, name, mask, cookie)`` tuples.
+    Events are collected for ``debounce`` seconds so that rename pairs
+    (IN_MOVED_FROM/IN_MOVED_TO) usually arrive in the same batch.
+    """
+
+    _libc = None
+
+    def __init__(self, callback, debounce=0.08):
+        self._callback = callback
+        self._debounce = debounce
+        self._fd = None
+        self._wd_to_path = {}
+        self._path_to_wd = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self.exhausted = False
+
+    @classmethod
+    def available(cls):
+        if cls._libc is None:
+            cls._libc = _load_libc() or False
+        return bool(cls._libc) and hasattr(cls._libc, 'inotify_init1')
+
+    def start(self):
+        if not self.available():
+            return False
+        fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            return False
+        self._fd = fd
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name='dex-inotify', daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        """Ask the loop to finish; the loop thread owns and closes the descriptor."""
+        self._stop.set()
+        with self._lock:
+            self._wd_to_path.clear()
+            self._path_to_wd.clear()
+            if self._thread is None and self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+    @property
+    def running(self):
+        return self._fd is not None and not self._stop.is_set()
+
+    def add_watch(self, path):
+        with self._lock:
+            if self._fd is None or self._stop.is_set() or path in self._path_to_wd:
+                return path in self._path_to_wd
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), WATCH_MASK)
+            if wd < 0:
+                # ENOSPC means fs.inotify.max_user_watches was reached.
+                if ctypes.get_errno() == errno.ENOSPC:
+                    self.exhausted = True
+                return False
+            old = self._wd_to_path.get(wd)
+            if old is not None:
+                self._path_to_wd.pop(old, None)
+            self._wd_to_path[wd] = path
+            self._path_to_wd[path] = wd
+            return True
+
+    def remove_tree(self, path):
+        """Drop watches for path and everything below it."""
+        prefix = path.rstrip(os.sep) + os.sep
+        with self._lock:
+            for p in [p for p in self._path_to_wd if p == path or p.startswith(prefix)]:
+                wd = self._path_to_wd.pop(p)
+                self._wd_to_path.pop(wd, None)
+                if self._fd is not None and not self._stop.is_set():
+                    self._libc.inotify_rm_watch(self._fd, wd)
+
+    def move_tree(self, old_path, new_path):
+        """Rewrite watched paths after a directory rename (watch descriptors follow inodes)."""
+        prefix = old_path.rstrip(os.sep) + os.sep
+        with self._lock:
+            for p in [p for p in self._path_to_wd if p == old_path or p.startswith(prefix)]:
+                wd = self._path_to_wd.pop(p)
+                moved = new_path + p[len(old_path):]
+                self._wd_to_path[wd] = moved
+                self._path_to_wd[moved] = wd
+
+    def watch_count(self):
+        with self._lock:
+            return len(self._path_to_wd)
+
+    def _read_events(self):
+        fd = self._fd
+        if fd is None:
+            return []
+        try:
+            data = os.read(fd, 256 * 1024)
+        except BlockingIOError:
+            return []
+        except OSError:
+            return []
+        events = []
+        offset = 0
+        with self._lock:
+            while offset + _EVENT_HEADER.size <= len(data):
+                wd, mask, cookie, name_len = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                raw_name = data[offset:offset + name_len].rstrip(b'\0')
+                offset += name_len
+                if mask & IN_Q_OVERFLOW:
+                    events.append((None, '', mask, 0))
+                    continue
+                dir_path = self._wd_to_path.get(wd)
+                if dir_path is None:
+                    continue
+                if mask & IN_IGNORED:
+                    self._wd_to_path.pop(wd, None)
+                    if self._path_to_wd.get(dir_path) == wd:
+                        self._path_to_wd.pop(dir_path, None)
+                    continue
+                events.append((dir_path, os.fsdecode(raw_name), mask, cookie))
+        return events
+
+    def _loop(self):
+        poller = select.poll()
+        poller.register(self._fd, select.POLLIN)
+        try:
+            while not self._stop.is_set():
+                try:
+                    ready = poller.poll(500)
+                except (OSError, ValueError):
+                    break
+                if not ready:
+                    continue
+                batch = self._read_events()
+                # Give rename pairs and bursts (git checkout, unzip...) a moment to settle.
+                if self._debounce:
+                    self._stop.wait(self._debounce)
+                while not self._stop.is_set():
+                    more = self._read_events()
+                    if not more:
+                        break
+                    batch.extend(more)
+                if batch and not self._stop.is_set():
+                    try:
+                        self._callback(batch)
+                    except Exception as e:
+                        print(f'[InotifyWatcher] Error procesando eventos: {e}')
+        finally:
+            with self._lock:
+                try:
+                    os.close(self._fd)
+                except OSError:
+                    pass
+                self._fd = None
+                self._thread = None
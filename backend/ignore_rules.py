@@ -0,0 +1,180 @@
+import os
+import re
+import threading
+
+
+IGNORE_FILES = ('.gitignore', '.dexignore')
+
+
+def _translate(pattern):
+    """gitignore glob -> regex source (``*`` and ``?`` never cross ``/``)."""
+    i, n = 0, len(pattern)
+    out = []
+    while i < n:
+        c = pattern[i]
+        if c == '*':
+            if pattern.startswith('**/', i):
+                out.append('(?:.*/)?')
+                i += 3
+                continue
+            if pattern.startswith('**', i):
+                out.append('.*')
+                i += 2
+                continue
+            out.append('[^/]*')
+        elif c == '?':
+            out.append('[^/]')
+        elif c == '[':
+            j = i + 1
+            if j < n and pattern[j] in '!^':
+                j += 1
+            if j < n and pattern[j] == ']':
+                j += 1
+            while j < n and pattern[j] != ']':
+                j += 1
+            if j >= n:
+                out.append(re.escape(c))
+            else:
+                body = pattern[i + 1:j].replace('\\', '\\\\')
+                if body[0] in '!^':
+                    body = '^' + body[1:]
+                out.append('[' + body + ']')
+                i = j + 1
+                continue
+        elif c == '\\' and i + 1 < n:
+            out.append(re.escape(pattern[i + 1]))
+            i += 2
+            continue
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return ''.join(out)
+
+
+def parse_rule(line):
+    """Compile one ignore-file line to ``(regex, negate, dir_only)``, or None for blanks/comments."""
+    line = line.rstrip('\r\n')
+    if not line or line.startswith('#'):
+        return None
+    # Trailing spaces are ignored unless escaped with a backslash.
+    while line.endswith(' ') and not line.endswith('\\ '):
+        line = line[:-1]
+    negate = line.startswith('!')
+    if negate:
+        line = line[1:]
+    dir_only = line.endswith('/')
+    line = line.rstrip('/')
+    if not line:
+        return None
+    # A slash anywhere but at the end anchors the pattern to the ignore file's folder.
+    anchored = '/' in line
+    source = _translate(line.lstrip('/'))
+    if not anchored:
+        source = '(?:.*/)?' + source
+    return re.compile(source + r'\Z', re.DOTALL), negate, dir_only
+
+
+def parse_rules(text):
+    rules = []
+    for line in text.splitlines():
+        rule = parse_rule(line)
+        if rule is not None:
+            rules.append(rule)
+    return rules
+
+
+class IgnoreMatcher:
+    """``.gitignore`` / ``.dexignore`` matcher for one project root.
+
+    Ignore files are read lazily per folder and apply to everything below
+    that folder (nested files override their parents, the last matching line
+    wins, ``!`` re-includes). Walkers should prune ignored folders instead of
+    descending into them, so a re-included path inside an ignored folder is
+    not visited - the same as git.
+    """
+
+    def __init__(self, root, filenames=IGNORE_FILES):
+        self.root = os.path.abspath(root)
+        self.filenames = tuple(filenames)
+        self._rules = {}
+        self._chains = {}
+        self._lock = threading.Lock()
+        # Ignore file path -> st_mtime_ns, for every file that was read.
+        self.sources = {}
+
+    def _dir_rules(self, dir_path):
+        with self._lock:
+            if dir_path in self._rules:
+                return self._rules[dir_path]
+        rules = []
+        sources = {}
+        for name in self.filenames:
+            file_path = os.path.join(dir_path, name)
+            try:
+                with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
+                    sources[file_path] = os.fstat(f.fileno()).st_mtime_ns
+                    rules.extend(parse_rules(f.read()))
+            except OSError:
+                continue
+        with self._lock:
+            self._rules[dir_path] = rules
+            self.sources.update(sources)
+        return rules
+
+    def _chain(self, dir_path):
+        """(base folder, rules) for every folder from root down to dir_path that has rules."""
+        with self._lock:
+            chain = self._chains.get(dir_path)
+        if chain is not None:
+            return chain
+        if dir_path == self.root:
+            parent_chain = []
+        else:
+            parent = os.path.dirname(dir_path)
+            if parent == dir_path or not dir_path.startswith(self.root + os.sep):
+                return []
+            parent_chain = self._chain(parent)
+        rules = self._dir_rules(dir_path)
+        chain = parent_chain + [(dir_path, rules)] if rules else parent_chain
+        with self._lock:
+            self._chains[dir_path] = chain
+        return chain
+
+    def invalidate(self):
+        """Forget the parsed ignore files (call after one of them changed)."""
+        with self._lock:
+            self._rules.clear()
+            self._chains.clear()
+            self.sources.clear()
+
+    def is_ignored(self, path, is_dir=False):
+        path = os.path.abspath(path)
+        if path == self.root:
+            return False
+        ignored = False
+        for base, rules in self._chain(os.path.dirname(path)):
+            rel = path[len(base) + 1:]
+            if os.sep != '/':
+                rel = rel.replace(os.sep, '/')
+            for regex, negate, dir_only in rules:
+                if dir_only and not is_dir:
+                    continue
+                if regex.match(rel):
+                    ignored = not negate
+        return ignored
+
+    def walk(self, top=None, followlinks=False):
+        """os.walk that drops ignored files and prunes ignored folders before descending.
+
+        The yielded ``dirs`` list is the one os.walk uses, so callers can
+        prune it further in place.
+        """
+        for dir_path, dirs, files in os.walk(top or self.root, followlinks=followlinks):
+            dirs[:] = [d for d in dirs if not self.is_ignored(os.path.join(dir_path, d), True)]
+            files[:] = [f for f in files if not self.is_ignored(os.path.join(dir_path, f), False)]
+            yield dir_path, dirs, files
+
+    def copytree_ignore(self, dir_path, names):
+        """``ignore`` callback for shutil.copytree."""
+        return {name for name in names
+                if self.is_ignored(os.path.join(dir_path, name), os.path.isdir(os.path.join(dir_path, name)))}
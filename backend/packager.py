@@ -3,9 +3,34 @@ import shutil
 import subprocess
 import json
 
+from backend.ignore_rules import IgnoreMatcher
+
 class Packager:
+    # Never copied into the package, besides ignore-file matches.
+    SKIP_DIRS = {'build', '.git', '__pycache__'}
+    SKIP_FILES = {'.gitignore', '.dexignore'}
+    # Symlinks are copied as what they point to; deb_files walks them the same
+    # way so the reuse check fingerprints exactly what ends up in the package.
+    FOLLOW_SYMLINKS = True
+
+    @staticmethod
+    def deb_files(project_path):
+        """(path, rel) of the project files create_deb copies into the package."""
+        for dir_path, dirs, files in IgnoreMatcher(project_path).walk(followlinks=Packager.FOLLOW_SYMLINKS):
+            if dir_path == project_path:
+                dirs[:] = [d for d in dirs if d not in Packager.SKIP_DIRS]
+                files = [f for f in files if f not in Packager.SKIP_FILES]
+            for name in files:
+                path = os.path.join(dir_path, name)
+                yield path, os.path.relpath(path, project_path).replace(os.sep, '/')
+
     @staticmethod
-    def create_deb(project_path):
+    def create_deb(project_path, fingerprints=None):
+        """Build build/<name>_<version>.deb and try to install it.
+
+        With a FingerprintStore, a .deb built from the same project contents
+        is reused instead of rebuilt.
+        """
         try:
             # Load metadata
             meta_path = os.path.join(project_path, 'metadata.json')
@@ -22,6 +47,20 @@ class Packager:
             category = meta.get('category', 'Utility')
             description = meta.get('description', 'Aplicación creada con DEX STUDIO')
             app_type = meta.get('type', 'GUI')
+            output = os.path.join(project_path, 'build', f"{name}_{version}.deb")
+            install_script = os.path.join(project_path, 'build', f'install-{name}.sh')
+
+            # Same project contents as the last build: keep its .deb and only reinstall.
+            prints = fingerprints.fingerprint_tree(project_path, Packager.deb_files(project_path)) if fingerprints else None
+            if (prints is not None and os.path.exists(output) and os.path.exists(install_script)
+                    and fingerprints.load_snapshot(project_path, 'deb') == prints):
+                return {
+                    'success': True,
+                    'message': f'{name}_{version}.deb sin cambios{Packager._install(install_script, name)}',
+                    'deb_path': output,
+                    'reused': True,
+                    'install_script': install_script
+                }
             
             # Build structure
             build_root = os.path.join(project_path, 'build', f"{name}_{version}")
@@ -81,21 +120,24 @@ class Packager:
                 f.write(wrapper)
             os.chmod(wrapper_path, 0o755)
             
-            # Copy ALL project files (except build/ and metadata.json internals)
-            skip_dirs = {'build', '.git', '__pycache__'}
-            skip_files = {'.gitignore'}
+            # Copy ALL project files (except build/, metadata.json internals and
+            # anything matched by .gitignore/.dexignore)
+            ignore = IgnoreMatcher(project_path)
             
             for item in os.listdir(project_path):
-                if item in skip_dirs:
+                if item in Packager.SKIP_DIRS:
                     continue
-                if item in skip_files:
+                if item in Packager.SKIP_FILES:
                     continue
                 s = os.path.join(project_path, item)
                 d = os.path.join(app_dir, item)
+                if ignore.is_ignored(s, os.path.isdir(s)):
+                    continue
                 if os.path.isdir(s):
-                    shutil.copytree(s, d, dirs_exist_ok=True)
+                    shutil.copytree(s, d, symlinks=not Packager.FOLLOW_SYMLINKS,
+                                    ignore=ignore.copytree_ignore, dirs_exist_ok=True)
                 else:
-                    shutil.copy2(s, d)
+                    shutil.copy2(s, d, follow_symlinks=Packager.FOLLOW_SYMLINKS)
             
             # Copy icon if exists
             icon_candidates = [
@@ -128,7 +170,6 @@ class Packager:
                 f.write(desktop)
             
             # Build .deb
-            output = os.path.join(project_path, 'build', f"{name}_{version}.deb")
             result = subprocess.run(
                 ['dpkg-deb', '--build', build_root, output],
                 capture_output=True, text=True
@@ -137,7 +178,6 @@ class Packager:
                 return {'success': False, 'error': f'Error en dpkg-deb: {result.stderr}'}
             
             # Create install script
-            install_script = os.path.join(project_path, 'build', f'install-{name}.sh')
             with open(install_script, 'w') as f:
                 f.write(f'''#!/bin/bash
 # Instalador de {meta.get("name")} — Generado por DEX STUDIO
@@ -171,20 +211,10 @@ echo "  También disponible en el menú de aplicaciones"
 echo "══════════════════════════════════════════"
 ''')
             os.chmod(install_script, 0o755)
+            if prints is not None:
+                fingerprints.save_snapshot(project_path, 'deb', prints)
             
-            # Try auto-install
-            install_msg = ''
-            try:
-                install_result = subprocess.run(
-                    ['bash', install_script],
-                    capture_output=True, text=True, timeout=30
-                )
-                if install_result.returncode == 0:
-                    install_msg = ' e instalado en el sistema'
-                else:
-                    install_msg = ' (instalar manualmente: build/install-' + name + '.sh)'
-            except Exception:
-                install_msg = ' (instalar manualmente: build/install-' + name + '.sh)'
+            install_msg = Packager._install(install_script, name)
             
             # Clean build directory (remove extracted tree)
             if os.path.exists(build_root):
@@ -194,7 +224,22 @@ echo "════════════════════════
                 'success': True,
                 'message': f'{name}_{version}.deb generado{install_msg}',
                 'deb_path': output,
+                'reused': False,
                 'install_script': install_script
             }
         except Exception as e:
             return {'success': False, 'error': str(e)}
+
+    @staticmethod
+    def _install(install_script, name):
+        """Try auto-install; returns the note for the result message."""
+        try:
+            install_result = subprocess.run(
+                ['bash', install_script],
+                capture_output=True, text=True, timeout=30
+            )
+            if install_result.returncode == 0:
+                return ' e instalado en el sistema'
+        except Exception:
+            pass
+        return ' (instalar manualmente: build/install-' + name + '.sh)'
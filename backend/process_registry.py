@@ -0,0 +1,70 @@
+import signal
+import threading
+from collections import OrderedDict
+
+from backend.run_output import StreamingRun
+
+
+class ProcessRegistry:
+    """Project runs by run id, so several can be managed side by side.
+
+    Every run is a StreamingRun: its own process group, output collected
+    while it runs. Finished runs stay listed (and their output readable)
+    until more than ``KEEP_FINISHED`` have piled up.
+    """
+
+    KEEP_FINISHED = 20
+
+    def __init__(self):
+        self._runs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def start(self, command, cwd, timeout=None, capture=None):
+        run = StreamingRun(command, cwd, timeout, capture)
+        with self._lock:
+            self._runs[run.id] = run
+            finished = [r for r in self._runs.values() if r.output.done]
+            for old in finished[:max(0, len(finished) - self.KEEP_FINISHED)]:
+                self._runs.pop(old.id, None)
+        return run
+
+    def get(self, run_id):
+        with self._lock:
+            return self._runs.get(run_id)
+
+    def list(self):
+        with self._lock:
+            runs = list(self._runs.values())
+        return [run.info() for run in runs]
+
+    def latest_running(self):
+        with self._lock:
+            for run in reversed(self._runs.values()):
+                if not run.output.done:
+                    return run
+        return None
+
+    def kill(self, run_id, sig=signal.SIGTERM):
+        """Signal a run's process group; None if unknown, False if it had already exited."""
+        run = self.get(run_id)
+        if run is None:
+            return None
+        if run.output.done:
+            return False
+        run.killed = True
+        return run.terminate(sig)
+
+    def wait(self, run_id, timeout=None):
+        """Info of the run once it finished, or as it is when timeout expires; None if unknown."""
+        run = self.get(run_id)
+        if run is None:
+            return None
+        run.output.wait(timeout)
+        return run.info()
+
+    def kill_all(self):
+        with self._lock:
+            runs = [r for r in self._runs.values() if not r.output.done]
+        for run in runs:
+            run.killed = True
+            run.terminate()
@@ -0,0 +1,269 @@
+import os
+import re
+import json
+import time
+import uuid
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.search_engine import compile_query, glob_filter, iter_project_files, MAX_FILE_BYTES, SEARCH_WORKERS
+from backend.file_reader import classify_sample
+from backend.file_writer import content_hash, stage_write, discard_staged, fsync_dir, atomic_write
+
+
+MAX_HUNKS_PER_FILE = 50
+
+
+def _line_hunks(text, spans):
+    """Preview of the changed lines: [{line, column, before, after}] for spans of (start, end, new)."""
+    hunks = []
+    i = 0
+    line_no = 1
+    counted = 0
+    while i < len(spans) and len(hunks) < MAX_HUNKS_PER_FILE:
+        start = spans[i][0]
+        line_no += text.count('\n', counted, start)
+        line_start = text.rfind('\n', 0, start) + 1
+        counted = line_start
+        line_end = text.find('\n', start)
+        if line_end == -1:
+            line_end = len(text)
+        # Every match starting on this line goes into the same hunk.
+        parts = []
+        pos = line_start
+        j = i
+        while j < len(spans) and spans[j][0] < line_end:
+            s, e, new = spans[j]
+            parts.append(text[pos:s])
+            parts.append(new)
+            pos = e
+            j += 1
+        rest_end = text.find('\n', pos)
+        parts.append(text[pos:rest_end if rest_end != -1 else len(text)])
+        hunks.append({
+            'line': line_no,
+            'column': start - line_start + 1,
+            'before': text[line_start:line_end].rstrip('\r'),
+            'after': ''.join(parts).rstrip('\r')
+        })
+        i = j
+    return hunks
+
+
+class ProjectReplacer:
+    """Project-wide find and replace, computed on a worker pool and applied all at once.
+
+    ``preview`` returns, per file, the number of replacements and the
+    changed lines. ``apply`` stages every new file as a synced temp file
+    first and only then renames them over the originals, so a failure while
+    writing leaves the project untouched. Before the renames, the original
+    bytes are copied to ``~/.dex-studio/replace-undo/<id>/`` with a manifest
+    that ``undo`` uses to put them back.
+
+    Files are found with a full walk rather than the trigram index: a file
+    changed outside the app since the last index sweep must not be missed.
+    """
+
+    KEEP_UNDO = 20
+
+    def __init__(self, undo_dir=None, workers=SEARCH_WORKERS):
+        self.undo_dir = undo_dir or os.path.join(os.path.expanduser("~"), '.dex-studio', 'replace-undo')
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='dex-replace')
+
+    def _compute(self, root, query, replacement, regex, case, globs):
+        pattern = compile_query(query, regex, case)
+        # Literal mode: the replacement is not a template.
+        template = replacement if regex else replacement.replace('\\', '\\\\')
+
+        def one(path, rel):
+            try:
+                with open(path, 'rb') as f:
+                    st = os.fstat(f.fileno())
+                    if st.st_size > MAX_FILE_BYTES:
+                        return None
+                    raw = f.read()
+            except OSError:
+                return None
+            info = classify_sample(raw[:8192], len(raw))
+            if info['binary']:
+                return None
+            try:
+                text = raw.decode(info['encoding'])
+            except UnicodeDecodeError:
+                # Replacing in a file we cannot round-trip would corrupt it.
+                return None
+            spans = [(m.start(), m.end(), m.expand(template)) for m in pattern.finditer(text)]
+            spans = [span for span in spans if text[span[0]:span[1]] != span[2]]
+            if not spans:
+                return None
+            parts = []
+            pos = 0
+            for s, e, new in spans:
+                parts.append(text[pos:s])
+                parts.append(new)
+                pos = e
+            parts.append(text[pos:])
+            return {
+                'path': path,
+                'file': rel,
+                'count': len(spans),
+                'hunks': _line_hunks(text, spans),
+                'encoding': info['encoding'],
+                'hash': content_hash(raw),
+                'stamp': (st.st_mtime_ns, st.st_size, st.st_ino),
+                'data': ''.join(parts).encode(info['encoding'])
+            }
+
+        files = iter_project_files(root, glob_filter(globs))
+        try:
+            results = [r for r in self._pool.map(lambda item: one(*item), files) if r]
+        except (re.error, IndexError) as e:
+            raise ValueError(f'Reemplazo inválido: {e}')
+        results.sort(key=lambda r: r['file'])
+        return results
+
+    @staticmethod
+    def _public(result):
+        return {k: v for k, v in result.items() if k not in ('data', 'stamp')}
+
+    def preview(self, root, query, replacement, regex=False, case=False, globs=None):
+        results = self._compute(root, query, replacement, regex, case, globs)
+        return [self._public(r) for r in results]
+
+    def apply(self, root, query, replacement, regex=False, case=False, globs=None, expected=None):
+        """Write the replacements; ``expected`` ({path: hash} from a preview) limits and guards the files.
+
+        Returns ``(undo_id, changed, conflicts)``.
+        """
+        results = self._compute(root, query, replacement, regex, case, globs)
+        conflicts = []
+        if expected is not None:
+            chosen = []
+            for r in results:
+                if r['path'] not in expected:
+                    continue
+                if expected[r['path']] != r['hash']:
+                    conflicts.append({'path': r['path'], 'error': 'El archivo cambió desde la vista previa'})
+                    continue
+                chosen.append(r)
+            results = chosen
+        if not results:
+            return None, [], conflicts
+
+        undo_id = uuid.uuid4().hex
+        undo_path = os.path.join(self.undo_dir, undo_id)
+        os.makedirs(undo_path)
+        staged = []
+        try:
+            for n, r in enumerate(results):
+                target, tmp = stage_write(r['path'], r['data'])
+                staged.append((r, target, tmp))
+                shutil.copyfile(target, os.path.join(undo_path, f'{n}.orig'))
+            for r, target, _tmp in staged:
+                st = os.stat(target)
+                if (st.st_mtime_ns, st.st_size, st.st_ino) != r['stamp']:
+                    raise RuntimeError(f'{r["file"]} cambió durante el reemplazo; no se modificó nada')
+            manifest = {
+                'id': undo_id,
+                'root': root,
+                'query': query,
+                'replacement': replacement,
+                'created': time.time(),
+                'files': [{'path': target, 'backup': f'{n}.orig', 'before': r['hash'],
+                           'after': content_hash(r['data'])}
+                          for n, (r, target, _tmp) in enumerate(staged)]
+            }
+            with open(os.path.join(undo_path, 'manifest.json'), 'w', encoding='utf-8') as f:
+                json.dump(manifest, f)
+        except BaseException:
+            for _r, _target, tmp in staged:
+                discard_staged(tmp)
+            shutil.rmtree(undo_path, ignore_errors=True)
+            raise
+
+        done = []
+        try:
+            for r, target, tmp in staged:
+                os.replace(tmp, target)
+                done.append((r, target))
+        except BaseException:
+            # Roll back the files already replaced; the rest were never touched.
+            for n, (r, target) in enumerate(done):
+                try:
+                    with open(os.path.join(undo_path, f'{n}.orig'), 'rb') as f:
+                        atomic_write(target, f.read())
+                except OSError as e:
+                    print(f'[ProjectReplacer] No se pudo restaurar {target}: {e}')
+            for _r, _target, tmp in staged[len(done):]:
+                discard_staged(tmp)
+            shutil.rmtree(undo_path, ignore_errors=True)
+            raise
+        for dir_path in {os.path.dirname(target) for _r, target in done}:
+            fsync_dir(dir_path)
+        self._prune()
+        return undo_id, [self._public(r) for r in results], conflicts
+
+    def undo(self, undo_id):
+        """Restore the files of a replace; returns (restored paths, conflicts)."""
+        if not undo_id or os.sep in undo_id or undo_id.startswith('.'):
+            raise ValueError('Identificador inválido')
+        undo_path = os.path.join(self.undo_dir, undo_id)
+        try:
+            with open(os.path.join(undo_path, 'manifest.json'), 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            raise FileNotFoundError('No hay nada que deshacer para ese reemplazo')
+        restored = []
+        conflicts = []
+        # Restored files leave the manifest one by one, so a retry after
+        # conflicts only goes through the files still pending.
+        pending = list(manifest['files'])
+        for entry in manifest['files']:
+            path = entry['path']
+            try:
+                with open(path, 'rb') as f:
+                    current = content_hash(f.read())
+            except OSError:
+                current = None
+            if current == entry['before']:
+                # Restored by an earlier attempt that stopped before updating the manifest.
+                pass
+            elif current != entry['after']:
+                conflicts.append({'path': path, 'error': 'El archivo cambió después del reemplazo'})
+                continue
+            else:
+                with open(os.path.join(undo_path, entry['backup']), 'rb') as f:
+                    atomic_write(path, f.read())
+            restored.append(path)
+            pending.remove(entry)
+            atomic_write(os.path.join(undo_path, 'manifest.json'),
+                         json.dumps(dict(manifest, files=pending)).encode('utf-8'))
+            try:
+                os.remove(os.path.join(undo_path, entry['backup']))
+            except FileNotFoundError:
+                pass
+        if not pending:
+            shutil.rmtree(undo_path, ignore_errors=True)
+        return restored, conflicts
+
+    def list_undo(self):
+        entries = []
+        try:
+            names = os.listdir(self.undo_dir)
+        except FileNotFoundError:
+            return entries
+        for name in names:
+            try:
+                with open(os.path.join(self.undo_dir, name, 'manifest.json'), 'r', encoding='utf-8') as f:
+                    manifest = json.load(f)
+            except (OSError, ValueError):
+                continue
+            entries.append({'id': manifest['id'], 'root': manifest['root'], 'query': manifest['query'],
+                            'replacement': manifest['replacement'], 'created': manifest['created'],
+                            'files': len(manifest['files'])})
+        entries.sort(key=lambda e: e['created'], reverse=True)
+        return entries
+
+    def _prune(self):
+        for entry in self.list_undo()[self.KEEP_UNDO:]:
+            shutil.rmtree(os.path.join(self.undo_dir, entry['id']), ignore_errors=True)
@@ -0,0 +1,807 @@
+import os
+import json
+import stat
+import base64
+import bisect
+import threading
+from collections import OrderedDict
+from functools import partial
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.fs_watcher import (
+    InotifyWatcher, IN_CREATE, IN_DELETE, IN_MOVED_FROM, IN_MOVED_TO,
+    IN_DELETE_SELF, IN_MOVE_SELF, IN_Q_OVERFLOW, IN_CLOSE_WRITE
+)
+from backend.ignore_rules import IgnoreMatcher
+
+
+class TreeNode:
+    """Tree entry. ``children`` is None until the folder is listed (and always for files)."""
+
+    __slots__ = ('name', 'path', 'is_dir', 'children')
+
+    def __init__(self, name, path, is_dir, children=None):
+        self.name = name
+        self.path = path
+        self.is_dir = is_dir
+        self.children = children
+
+
+def _sort_key(node):
+    return (0 if node.is_dir else 1, node.name.lower(), node.name)
+
+
+def _is_hidden(name):
+    return name.startswith('.')
+
+
+class _ScanBudget:
+    """Shared node counter for a scan (and for incremental subtree scans)."""
+
+    def __init__(self, depth_limit, node_limit, count=0):
+        self.depth_limit = depth_limit
+        self.node_limit = node_limit
+        self.count = count
+        self.truncated = False
+
+
+def list_entries(dir_path, ignore=None):
+    """One sorted directory level (dirs first, case-insensitive), or None if unreadable.
+
+    Child paths are joined onto the canonical parent (one realpath per
+    listing, next to the scandir it pays for anyway); only symlinks need
+    their own realpath. Entries matched by the ``ignore``
+    IgnoreMatcher are left out.
+    """
+    entries = []
+    parent = os.path.realpath(dir_path)
+    try:
+        with os.scandir(dir_path) as it:
+            for entry in it:
+                name = entry.name
+                if _is_hidden(name):
+                    continue
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                    is_link = not is_dir and entry.is_symlink()
+                except Exception:
+                    continue
+                path = os.path.join(parent, name)
+                if ignore is not None and ignore.is_ignored(path, is_dir):
+                    continue
+                entries.append(TreeNode(name, os.path.realpath(path) if is_link else path, is_dir))
+    except Exception:
+        return None
+    entries.sort(key=_sort_key)
+    return entries
+
+
+def count_children(dir_path):
+    try:
+        with os.scandir(dir_path) as it:
+            return sum(1 for entry in it if not _is_hidden(entry.name))
+    except Exception:
+        return 0
+
+
+def _mtime_ns(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+_scan_pool = None
+_scan_pool_lock = threading.Lock()
+SCAN_WORKERS = min(16, (os.cpu_count() or 2) * 2)
+
+
+def _get_scan_pool():
+    global _scan_pool
+    with _scan_pool_lock:
+        if _scan_pool is None:
+            _scan_pool = ThreadPoolExecutor(max_workers=SCAN_WORKERS, thread_name_prefix='dex-scan')
+        return _scan_pool
+
+
+def _read_dir(dir_path, ignore=None):
+    """stat + listing of one directory; runs on the scan pool."""
+    try:
+        st = os.stat(dir_path)
+    except OSError:
+        st = None
+    return st, list_entries(dir_path, ignore)
+
+
+class TreeScanner:
+    """Recursive listing that fans scandir calls out over a bounded thread pool.
+
+    Listings of sibling directories are prefetched on the pool while the
+    tree is assembled depth-first on the calling thread, so ordering, the
+    depth/node limits and truncation are exactly those of a sequential walk.
+    Directories are keyed by (st_dev, st_ino) to stop on bind-mount loops.
+    """
+
+    def __init__(self, budget, mtimes=None, ignore=None, pool=None):
+        self.budget = budget
+        self.mtimes = mtimes
+        self.ignore = ignore
+        self.pool = pool or _get_scan_pool()
+        self._pending = {}
+        self._visited = set()
+
+    def scan(self, dir_path, depth):
+        try:
+            return self._build(dir_path, depth)
+        finally:
+            for future in self._pending.values():
+                future.cancel()
+            self._pending.clear()
+
+    def _prefetch(self, dir_path):
+        if dir_path not in self._pending:
+            self._pending[dir_path] = self.pool.submit(_read_dir, dir_path, self.ignore)
+
+    def _build(self, dir_path, depth):
+        budget = self.budget
+        if depth > budget.depth_limit or budget.truncated:
+            return []
+        future = self._pending.pop(dir_path, None)
+        st, entries = future.result() if future is not None else _read_dir(dir_path, self.ignore)
+        if st is not None:
+            key = (st.st_dev, st.st_ino)
+            if key in self._visited:
+                return []
+            self._visited.add(key)
+        if self.mtimes is not None:
+            # Taken before listing, so a concurrent change is caught later.
+            self.mtimes[dir_path] = st.st_mtime_ns if st is not None else None
+        if entries is None:
+            return []
+
+        if depth + 1 <= budget.depth_limit:
+            room = budget.node_limit - budget.count
+            for node in entries[:max(0, room)]:
+                if node.is_dir:
+                    self._prefetch(node.path)
+
+        out = []
+        for node in entries:
+            budget.count += 1
+            if budget.count > budget.node_limit:
+                budget.truncated = True
+                break
+            if node.is_dir:
+                node.children = self._build(node.path, depth + 1)
+            out.append(node)
+        return out
+
+
+def scan_children(dir_path, depth, budget, mtimes=None, ignore=None):
+    """List dir_path recursively with the explorer ordering (dirs first, case-insensitive).
+
+    When ``mtimes`` is given, the mtime of every listed directory is recorded
+    in it (taken before listing, so a concurrent change is caught later).
+    Folders matched by ``ignore`` are pruned without being listed.
+    """
+    return TreeScanner(budget, mtimes, ignore).scan(dir_path, depth)
+
+
+def encode_cursor(node):
+    raw = json.dumps(list(_sort_key(node)), ensure_ascii=False).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def decode_cursor(cursor):
+    try:
+        rank, lower, name = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+        return (int(rank), str(lower), str(name))
+    except Exception:
+        return None
+
+
+def page_nodes(nodes, cursor=None, limit=200):
+    """Slice a sorted child list after cursor. Cursors are sort keys, so they survive inserts."""
+    start = 0
+    key = decode_cursor(cursor) if cursor else None
+    if key is not None:
+        start = bisect.bisect_right([_sort_key(n) for n in nodes], key)
+    page = nodes[start:start + limit]
+    more = start + limit < len(nodes)
+    return page, (encode_cursor(page[-1]) if more and page else None)
+
+
+def lazy_node(node):
+    """Wire form of a node for lazy listings: no nested children, folders carry child_count."""
+    out = {'name': node.name, 'path': node.path, 'is_dir': node.is_dir}
+    if node.is_dir:
+        children = node.children
+        out['child_count'] = len(children) if children is not None else count_children(node.path)
+    return out
+
+
+_listing_cache = OrderedDict()
+_listing_lock = threading.Lock()
+
+
+def list_directory_page(dir_path, cursor=None, limit=200):
+    """Stateless paged listing; the sorted listing is reused while the directory mtime is unchanged."""
+    try:
+        mtime = os.stat(dir_path).st_mtime_ns
+    except OSError:
+        return None
+    with _listing_lock:
+        cached = _listing_cache.get(dir_path)
+        if cached and cached[0] == mtime:
+            _listing_cache.move_to_end(dir_path)
+            entries = cached[1]
+        else:
+            entries = None
+    if entries is None:
+        entries = list_entries(dir_path)
+        if entries is None:
+            return None
+        with _listing_lock:
+            _listing_cache[dir_path] = (mtime, entries)
+            while len(_listing_cache) > 32:
+                _listing_cache.popitem(last=False)
+    page, next_cursor = page_nodes(entries, cursor, limit)
+    return {'items': [lazy_node(n) for n in page], 'next_cursor': next_cursor, 'total': len(entries)}
+
+
+def scan_tree(root, depth_limit=8, node_limit=20000, mtimes=None, ignore=None):
+    budget = _ScanBudget(depth_limit, node_limit)
+    tree = TreeNode(os.path.basename(root), root, True, scan_children(root, 0, budget, mtimes, ignore))
+    return tree, budget
+
+
+def nested_node(node):
+    """Nested dict wire form of a node and everything listed below it."""
+    out = {'name': node.name, 'path': node.path, 'is_dir': node.is_dir}
+    if node.children is not None:
+        out['children'] = [nested_node(c) for c in node.children]
+    return out
+
+
+FLAG_DIR = 1
+FLAG_LISTED = 2
+
+
+def encode_compact(tree):
+    """Columnar form of a tree: parallel ``names``/``parents``/``flags`` arrays in pre-order.
+
+    Index 0 is the root. A node's path is its parent's path plus its name;
+    only symlinks (whose path is their target) are listed in ``links``.
+    """
+    names = []
+    parents = []
+    flags = []
+    links = {}
+    stack = [(tree, -1, None)]
+    while stack:
+        node, parent, parent_path = stack.pop()
+        index = len(names)
+        names.append(node.name)
+        parents.append(parent)
+        flag = FLAG_DIR if node.is_dir else 0
+        if node.children is not None:
+            flag |= FLAG_LISTED
+            for child in reversed(node.children):
+                stack.append((child, index, node.path))
+        flags.append(flag)
+        if parent_path is not None and node.path != os.path.join(parent_path, node.name):
+            links[str(index)] = node.path
+    out = {'format': 'compact', 'root': tree.path, 'names': names, 'parents': parents, 'flags': flags}
+    if links:
+        out['links'] = links
+    return out
+
+
+def decode_compact(data):
+    """Inverse of encode_compact; returns the root TreeNode."""
+    names = data['names']
+    parents = data['parents']
+    flags = data['flags']
+    links = data.get('links') or {}
+    nodes = []
+    for index, name in enumerate(names):
+        flag = flags[index]
+        parent = parents[index]
+        if parent < 0:
+            path = data['root']
+        else:
+            path = links.get(str(index)) or os.path.join(nodes[parent].path, name)
+        node = TreeNode(name, path, bool(flag & FLAG_DIR), [] if flag & FLAG_LISTED else None)
+        if parent >= 0:
+            nodes[parent].children.append(node)
+        nodes.append(node)
+    return nodes[0]
+
+
+class ProjectTreeService:
+    """In-memory project tree kept up to date by inotify.
+
+    After the first scan, filesystem changes are applied to the cached tree
+    and pushed to the UI as small deltas instead of forcing a full rebuild:
+
+    - ``{'op': 'add', 'parent': <dir path>, 'node': {...}}``
+    - ``{'op': 'remove', 'path': <path>}``
+    - ``{'op': 'rename', 'path': <old>, 'new_path': <new>, 'name': <new name>, 'parent': <new dir>}``
+    - ``{'op': 'reset'}`` when the kernel queue overflowed and the tree was rescanned.
+
+    Paths matched by the project's ``.gitignore`` / ``.dexignore`` files are
+    left out; editing one of those files rescans the tree (``reset``).
+
+    In lazy mode only the root and the folders opened through ``expand`` are
+    loaded (and watched); unloaded folders are sent with a ``child_count``.
+
+    With a snapshot store, the last tree of a root is served from disk right
+    away and only directories whose mtime changed are re-listed, in the
+    background; the differences reach the UI as regular deltas.
+    """
+
+    SAVE_DELAY = 3.0
+    # How long a batch keeps collecting watcher deltas after it finished (> watcher debounce).
+    BATCH_SETTLE = 0.3
+
+    def __init__(self, push=None, snapshots=None):
+        self._push = push
+        self._snapshots = snapshots
+        self._lock = threading.RLock()
+        self._watcher = None
+        self._save_timer = None
+        self._generation = 0
+        self._hold = 0
+        self._held = []
+        self.root = None
+        self.tree = None
+        self.budget = None
+        self.lazy = False
+        self.depth_limit = None
+        self.node_limit = None
+        self.from_snapshot = False
+        self._ignore = None
+        # Ignore files (path -> mtime) the snapshot was filtered with.
+        self._snapshot_ignore_files = {}
+        # Logical path (parent path + name) -> node. Differs from node.path only for symlinks.
+        self._index = {}
+        # Listed directory (logical path) -> st_mtime_ns when it was listed.
+        self._dir_mtimes = {}
+
+    @property
+    def watching(self):
+        return bool(self._watcher and self._watcher.running)
+
+    def get_tree(self, root, depth_limit, node_limit, lazy=False, page_size=500, compact=False):
+        """Return a copy of the tree for root, scanning only when it is not tracked yet.
+
+        With ``compact`` the tree is sent in the columnar form of encode_compact
+        (lazy listings add ``child_counts`` for the folders of the first page).
+        """
+        with self._lock:
+            same_root = (self.root == root and self.tree is not None and self.lazy == lazy and
+                         (lazy or (self.depth_limit == depth_limit and self.node_limit == node_limit)))
+            if not (same_root and self.watching):
+                self._track(root, depth_limit, node_limit, lazy)
+            result = {
+                'truncated': self.budget.truncated,
+                'watching': self.watching,
+                'cached': self.from_snapshot
+            }
+            if lazy:
+                page, next_cursor = page_nodes(self.tree.children, None, page_size)
+                if compact:
+                    shallow = TreeNode(self.tree.name, self.tree.path, True,
+                                       [TreeNode(n.name, n.path, n.is_dir) for n in page])
+                    tree = encode_compact(shallow)
+                    tree['child_counts'] = {str(i + 1): lazy_node(n)['child_count']
+                                            for i, n in enumerate(page) if n.is_dir}
+                else:
+                    tree = lazy_node(self.tree)
+                    tree['children'] = [lazy_node(n) for n in page]
+                result.update({'tree': tree, 'next_cursor': next_cursor})
+            elif compact:
+                result['tree'] = encode_compact(self.tree)
+            else:
+                result['tree'] = nested_node(self.tree)
+            return result
+
+    def expand(self, dir_path, cursor=None, limit=200):
+        """Page through a folder of the lazily tracked tree; None when dir_path is not tracked."""
+        with self._lock:
+            node = self._index.get(dir_path) if self.lazy else None
+            if node is None or not node.is_dir:
+                return None
+            if node.children is None:
+                self._load_dir(dir_path, node)
+            page, next_cursor = page_nodes(node.children, cursor, limit)
+            return {
+                'items': [lazy_node(n) for n in page],
+                'next_cursor': next_cursor,
+                'total': len(node.children)
+            }
+
+    @contextmanager
+    def batch(self):
+        """Collect the deltas of many file operations and push them as one notification."""
+        with self._lock:
+            self._hold += 1
+        try:
+            yield
+        finally:
+            timer = threading.Timer(self.BATCH_SETTLE, self._release_held)
+            timer.daemon = True
+            timer.start()
+
+    def _release_held(self):
+        with self._lock:
+            self._hold -= 1
+            if self._hold or not self._held:
+                return
+            deltas, self._held = self._held, []
+            root = self.root
+        if any(d['op'] == 'reset' for d in deltas):
+            deltas = [{'op': 'reset'}]
+        if self._push and root:
+            self._push(root, deltas)
+
+    def stop(self):
+        with self._lock:
+            if self._save_timer:
+                self._save_timer.cancel()
+                self._save_snapshot(self._generation)
+            self._stop_watcher()
+            self._generation += 1
+            self._held = []
+            self.root = None
+            self.tree = None
+            self.budget = None
+            self._ignore = None
+            self._index = {}
+            self._dir_mtimes = {}
+
+    # ── Internal state ───────────────────────────────────────────────
+
+    def _stop_watcher(self):
+        if self._watcher:
+            self._watcher.stop()
+        self._watcher = None
+
+    def _track(self, root, depth_limit, node_limit, lazy=False, use_snapshot=True):
+        self._stop_watcher()
+        self._generation += 1
+        self._held = []
+        self.root = root
+        self.lazy = lazy
+        self.depth_limit = depth_limit
+        self.node_limit = node_limit
+        self._dir_mtimes = {}
+        self._ignore = IgnoreMatcher(root)
+        snapshot = None
+        if use_snapshot and self._snapshots:
+            snapshot = self._snapshots.load(root, depth_limit, node_limit, lazy)
+        self.from_snapshot = snapshot is not None
+        if snapshot:
+            self.tree = decode_compact(snapshot['tree'])
+            if lazy:
+                self.budget = _ScanBudget(float('inf'), float('inf'), snapshot.get('count', 0))
+            else:
+                self.budget = _ScanBudget(depth_limit, node_limit, snapshot.get('count', 0))
+                self.budget.truncated = bool(snapshot.get('truncated'))
+            self._dir_mtimes = snapshot['dir_mtimes']
+            self._snapshot_ignore_files = snapshot['ignore_files']
+            self._index = {root: self.tree}
+            self._index_children(root, self.tree)
+        elif lazy:
+            self.tree = TreeNode(os.path.basename(root), root, True)
+            self.budget = _ScanBudget(float('inf'), float('inf'))
+            self._index = {root: self.tree}
+            self._load_dir(root, self.tree, watch=False)
+        else:
+            self.tree, self.budget = scan_tree(root, depth_limit, node_limit, self._dir_mtimes, self._ignore)
+            self._index = {root: self.tree}
+            self._index_children(root, self.tree)
+        if InotifyWatcher.available():
+            watcher = InotifyWatcher(partial(self._on_events, self._generation))
+            if watcher.start():
+                self._watcher = watcher
+                self._watch_subtree(root, self.tree)
+                if watcher.exhausted:
+                    # A partially watched tree would silently go stale: fall back to full reloads.
+                    self._stop_watcher()
+        if snapshot:
+            threading.Thread(target=self._revalidate, args=(self._generation,),
+                             name='dex-tree-revalidate', daemon=True).start()
+        else:
+            self._schedule_save()
+
+    def _retrack(self):
+        self._track(self.root, self.depth_limit, self.node_limit, self.lazy, use_snapshot=False)
+
+    def _load_dir(self, key, node, watch=True):
+        self._dir_mtimes[key] = _mtime_ns(key)
+        node.children = list_entries(key, self._ignore) or []
+        self.budget.count += len(node.children)
+        for child in node.children:
+            self._index[os.path.join(key, child.name)] = child
+        if watch and self._watcher:
+            self._watcher.add_watch(key)
+            if self._watcher.exhausted:
+                self._stop_watcher()
+        self._schedule_save()
+
+    # ── Snapshots ────────────────────────────────────────────────────
+
+    def _schedule_save(self):
+        if not self._snapshots:
+            return
+        if self._save_timer:
+            self._save_timer.cancel()
+        self._save_timer = threading.Timer(self.SAVE_DELAY, self._save_snapshot, args=(self._generation,))
+        self._save_timer.daemon = True
+        self._save_timer.start()
+
+    def _save_snapshot(self, generation):
+        with self._lock:
+            self._save_timer = None
+            if self.tree is None or generation != self._generation:
+                return
+            args = (self.root, encode_compact(self.tree), dict(self._dir_mtimes), self.budget.count,
+                    self.budget.truncated, self.depth_limit, self.node_limit, self.lazy,
+                    dict(self._ignore.sources))
+        try:
+            self._snapshots.save(*args)
+        except Exception as e:
+            print(f'[ProjectTreeService] No se pudo guardar snapshot: {e}')
+
+    def _revalidate(self, generation):
+        """Re-list only the directories whose mtime differs from the snapshot."""
+        with self._lock:
+            if generation != self._generation:
+                return
+            root = self.root
+            dirs = list(self._dir_mtimes.items())
+            ignore_files = dict(self._snapshot_ignore_files)
+        stale = [key for key, mtime in dirs if _mtime_ns(key) != mtime]
+        if self._ignore_files_changed(ignore_files, stale):
+            with self._lock:
+                if generation != self._generation:
+                    return
+                self._retrack()
+            if self._push:
+                self._push(root, [{'op': 'reset'}])
+            return
+        deltas = []
+        for key in stale:
+            with self._lock:
+                if generation != self._generation:
+                    return
+                if key in self._index and self._is_listed(key):
+                    self._sync_dir(key, deltas)
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._schedule_save()
+        if deltas and self._push:
+            self._push(root, deltas)
+
+    def _ignore_files_changed(self, ignore_files, stale_dirs):
+        """True when an ignore file seen by the snapshot changed, or one appeared in a changed folder."""
+        for path, mtime in ignore_files.items():
+            if _mtime_ns(path) != mtime:
+                return True
+        for key in stale_dirs:
+            for name in self._ignore.filenames:
+                path = os.path.join(key, name)
+                if path not in ignore_files and os.path.exists(path):
+                    return True
+        return False
+
+    def _sync_dir(self, key, deltas):
+        mtime = _mtime_ns(key)
+        entries = list_entries(key, self._ignore)
+        if entries is None:
+            # Gone: the parent directory changed too and will drop it.
+            return
+        node = self._index[key]
+        current = {e.name: e.is_dir for e in entries}
+        cached = {c.name: c.is_dir for c in node.children or ()}
+        for name, is_dir in cached.items():
+            if current.get(name) != is_dir:
+                self._remove(os.path.join(key, name), deltas)
+        for name, is_dir in current.items():
+            if cached.get(name) != is_dir:
+                self._add(os.path.join(key, name), deltas)
+        self._dir_mtimes[key] = mtime
+
+    def _index_children(self, key, node):
+        for child in node.children or ():
+            child_key = os.path.join(key, child.name)
+            self._index[child_key] = child
+            if child.is_dir:
+                self._index_children(child_key, child)
+
+    def _unindex(self, key, node):
+        self._index.pop(key, None)
+        self._dir_mtimes.pop(key, None)
+        removed = 1
+        for child in node.children or ():
+            removed += self._unindex(os.path.join(key, child.name), child)
+        return removed
+
+    def _depth(self, key):
+        if key == self.root:
+            return -1
+        return os.path.relpath(key, self.root).count(os.sep)
+
+    def _is_listed(self, key):
+        """True when the children of directory key are part of the tree."""
+        node = self._index.get(key)
+        if not node or not node.is_dir:
+            return False
+        if self.lazy:
+            return node.children is not None
+        return self._depth(key) + 1 <= self.budget.depth_limit
+
+    def _watch_subtree(self, key, node):
+        if not self._watcher or not self._is_listed(key):
+            return
+        if not self._watcher.add_watch(key):
+            return
+        for child in node.children or ():
+            if child.is_dir:
+                self._watch_subtree(os.path.join(key, child.name), child)
+
+    def _insert_child(self, parent, node):
+        children = parent.children
+        keys = [_sort_key(c) for c in children]
+        children.insert(bisect.bisect_left(keys, _sort_key(node)), node)
+
+    def _detach_child(self, parent, node):
+        children = parent.children or []
+        for i, child in enumerate(children):
+            if child is node:
+                del children[i]
+                return
+
+    def _rebase_paths(self, node, old_prefix, new_prefix):
+        path = node.path
+        if path == old_prefix or path.startswith(old_prefix + os.sep):
+            node.path = new_prefix + path[len(old_prefix):]
+        for child in node.children or ():
+            self._rebase_paths(child, old_prefix, new_prefix)
+
+    # ── Event handling ───────────────────────────────────────────────
+
+    def _on_events(self, generation, events):
+        with self._lock:
+            if self.tree is None or generation != self._generation:
+                return
+            root = self.root
+            deltas = []
+            if any(mask & IN_Q_OVERFLOW for _, _, mask, _ in events):
+                self._retrack()
+                deltas.append({'op': 'reset'})
+            else:
+                self._apply_events(events, deltas)
+                for dir_path in {e[0] for e in events}:
+                    if dir_path in self._dir_mtimes:
+                        self._dir_mtimes[dir_path] = _mtime_ns(dir_path)
+                if any(d['op'] != 'write' for d in deltas):
+                    self._schedule_save()
+            if self._hold:
+                self._held.extend(deltas)
+                return
+        if deltas and self._push:
+            self._push(root, deltas)
+
+    def _apply_events(self, events, deltas):
+        moved_from = {}
+        for dir_path, name, mask, cookie in events:
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                if dir_path == self.root:
+                    self._retrack()
+                    deltas[:] = [{'op': 'reset'}]
+                    return
+                continue
+            if name in self._ignore.filenames and self._is_listed(dir_path):
+                if mask & (IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_CLOSE_WRITE):
+                    self._retrack()
+                    deltas[:] = [{'op': 'reset'}]
+                    return
+            if not name or _is_hidden(name):
+                continue
+            key = os.path.join(dir_path, name)
+            if mask & IN_MOVED_FROM:
+                moved_from[cookie] = key
+            elif mask & IN_MOVED_TO:
+                src = moved_from.pop(cookie, None)
+                if src:
+                    self._rename(src, key, deltas)
+                else:
+                    self._add(key, deltas)
+            elif mask & IN_CREATE:
+                self._add(key, deltas)
+            elif mask & IN_DELETE:
+                self._remove(key, deltas)
+            elif mask & IN_CLOSE_WRITE and key in self._index and not self._index[key].is_dir:
+                # Contents changed in place: nothing to redraw, but indexes must re-read it.
+                deltas.append({'op': 'write', 'path': key})
+        # Moved out of the project (or to a place we do not track).
+        for src in moved_from.values():
+            self._remove(src, deltas)
+
+    def _add(self, key, deltas):
+        parent_key = os.path.dirname(key)
+        parent = self._index.get(parent_key)
+        if key in self._index or not self._is_listed(parent_key):
+            return
+        try:
+            st = os.lstat(key)
+        except OSError:
+            return
+        if self.budget.count >= self.budget.node_limit:
+            self.budget.truncated = True
+            return
+        is_dir = stat.S_ISDIR(st.st_mode)
+        if self._ignore.is_ignored(key, is_dir):
+            return
+        self.budget.count += 1
+        node = TreeNode(os.path.basename(key), os.path.realpath(key), is_dir)
+        if is_dir and not self.lazy:
+            node.children = scan_children(key, self._depth(key) + 1, self.budget, self._dir_mtimes, self._ignore)
+        self._insert_child(parent, node)
+        self._index[key] = node
+        if is_dir and not self.lazy:
+            self._index_children(key, node)
+            self._watch_subtree(key, node)
+        wire = lazy_node(node) if self.lazy else nested_node(node)
+        deltas.append({'op': 'add', 'parent': parent.path, 'node': wire})
+
+    def _remove(self, key, deltas):
+        node = self._index.get(key)
+        if node is None or key == self.root:
+            return
+        parent = self._index.get(os.path.dirname(key))
+        if parent is not None:
+            self._detach_child(parent, node)
+        self.budget.count -= self._unindex(key, node)
+        if self._watcher and node.is_dir:
+            self._watcher.remove_tree(key)
+        deltas.append({'op': 'remove', 'path': node.path})
+
+    def _rename(self, src, dst, deltas):
+        node = self._index.get(src)
+        if node is None:
+            self._add(dst, deltas)
+            return
+        dst_parent_key = os.path.dirname(dst)
+        if not self._is_listed(dst_parent_key) or dst in self._index:
+            self._remove(src, deltas)
+            return
+        old_path = node.path
+        self._detach_child(self._index[os.path.dirname(src)], node)
+        moved_mtimes = {k: v for k, v in self._dir_mtimes.items()
+                        if k == src or k.startswith(src + os.sep)}
+        self._unindex(src, node)
+        for k, v in moved_mtimes.items():
+            self._dir_mtimes[dst + k[len(src):]] = v
+        node.name = os.path.basename(dst)
+        if os.path.islink(dst):
+            node.path = os.path.realpath(dst)
+        else:
+            self._rebase_paths(node, old_path, dst)
+        new_parent = self._index[dst_parent_key]
+        self._insert_child(new_parent, node)
+        self._index[dst] = node
+        self._index_children(dst, node)
+        if self._watcher and node.is_dir:
+            self._watcher.move_tree(src, dst)
+        deltas.append({
+            'op': 'rename',
+            'path': old_path,
+            'new_path': node.path,
+            'name': node.name,
+            'parent': new_parent.path
+        })
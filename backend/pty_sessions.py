@@ -0,0 +1,169 @@
+import os
+import pty
+import time
+import uuid
+import codecs
+import fcntl
+import signal
+import struct
+import termios
+import threading
+
+from backend.run_output import RunOutput, READ_SIZE
+
+
+def _default_shell():
+    shell = os.environ.get('SHELL') or ''
+    if os.path.basename(shell) in ('bash', 'zsh', 'sh', 'dash', 'fish') and os.access(shell, os.X_OK):
+        return shell
+    return '/bin/bash' if os.access('/bin/bash', os.X_OK) else '/bin/sh'
+
+
+class PtySession:
+    """An interactive shell on a pseudo-terminal; output is read as RunOutput chunks.
+
+    The terminal panel shows plain text, so the shell gets ``TERM=dumb``
+    and bash runs without readline (``--noediting``): the tty echoes what
+    is written and the prompt comes from the shell itself.
+    """
+
+    def __init__(self, cwd, cols=80, rows=24, shell=None):
+        self.id = uuid.uuid4().hex
+        self.cwd = cwd
+        self.shell = shell or _default_shell()
+        self.started = time.time()
+        self.output = RunOutput()
+        argv = [self.shell, '-i']
+        if os.path.basename(self.shell) == 'bash':
+            argv.insert(1, '--noediting')
+        env = dict(os.environ, TERM='dumb', PAGER='cat', GIT_PAGER='cat')
+        pid, fd = pty.fork()
+        if pid == 0:
+            try:
+                try:
+                    os.chdir(cwd)
+                except OSError:
+                    os.chdir(os.path.expanduser('~'))
+                os.execvpe(argv[0], argv, env)
+            finally:
+                os._exit(127)
+        self.pid = pid
+        self.fd = fd
+        self._closed = False
+        # Guards fd against reuse by another open() once the pump closed it.
+        self._fd_lock = threading.Lock()
+        self.resize(cols, rows)
+        threading.Thread(target=self._pump, name='dex-pty-read', daemon=True).start()
+
+    def _pump(self):
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        while True:
+            try:
+                data = os.read(self.fd, READ_SIZE)
+            except OSError:
+                # EIO: the shell exited and the slave side is gone.
+                break
+            if not data:
+                break
+            self.output.append('pty', decoder.decode(data))
+        self.output.append('pty', decoder.decode(b'', final=True))
+        try:
+            _, status = os.waitpid(self.pid, 0)
+            code = os.waitstatus_to_exitcode(status)
+        except ChildProcessError:
+            code = None
+        self._close_fd()
+        self.output.finish(code)
+
+    def _close_fd(self):
+        with self._fd_lock:
+            if not self._closed:
+                self._closed = True
+                try:
+                    os.close(self.fd)
+                except OSError:
+                    pass
+
+    @property
+    def alive(self):
+        return not self.output.done
+
+    def write(self, data):
+        raw = data.encode('utf-8')
+        with self._fd_lock:
+            if self._closed or not self.alive:
+                raise RuntimeError('La terminal ya terminó')
+            while raw:
+                written = os.write(self.fd, raw)
+                raw = raw[written:]
+
+    def resize(self, cols, rows):
+        cols = max(2, min(int(cols), 1000))
+        rows = max(2, min(int(rows), 1000))
+        with self._fd_lock:
+            if not self._closed:
+                # The kernel sends SIGWINCH to the foreground process group.
+                fcntl.ioctl(self.fd, termios.TIOCSWINSZ, struct.pack('HHHH', rows, cols, 0, 0))
+
+    def close(self):
+        """Hang up the shell and everything it started in its session."""
+        if not self.alive:
+            return
+        for sig in (signal.SIGHUP, signal.SIGKILL):
+            try:
+                os.killpg(self.pid, sig)
+            except ProcessLookupError:
+                return
+            deadline = time.monotonic() + 1.0
+            while self.alive and time.monotonic() < deadline:
+                time.sleep(0.05)
+            if not self.alive:
+                return
+
+
+class PtySessionManager:
+    """Concurrent PtySessions by id, for the terminal tabs."""
+
+    MAX_SESSIONS = 16
+
+    def __init__(self):
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def open(self, cwd, cols=80, rows=24):
+        with self._lock:
+            for session_id in [s.id for s in self._sessions.values() if not s.alive]:
+                self._sessions.pop(session_id)
+            if len(self._sessions) >= self.MAX_SESSIONS:
+                raise RuntimeError('Demasiadas terminales abiertas')
+        session = PtySession(cwd, cols, rows)
+        with self._lock:
+            self._sessions[session.id] = session
+        return session
+
+    def get(self, session_id):
+        with self._lock:
+            session = self._sessions.get(session_id)
+        if session is None:
+            raise ValueError('Terminal no encontrada')
+        return session
+
+    def close(self, session_id):
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+        if session is not None:
+            session.close()
+        return session is not None
+
+    def list(self):
+        with self._lock:
+            sessions = list(self._sessions.values())
+        return [{'id': s.id, 'pid': s.pid, 'cwd': s.cwd, 'shell': s.shell, 'started': s.started,
+                 'alive': s.alive} for s in sessions]
+
+    def close_all(self):
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for session in sessions:
+            session.close()
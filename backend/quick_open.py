@@ -0,0 +1,332 @@
+import os
+import re
+import heapq
+import threading
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+
+from backend.project_tree import scan_tree
+from backend.ignore_rules import IgnoreMatcher
+
+
+MAX_PATHS = 500000
+MAX_DEPTH = 64
+RECENT_FILES = 50
+
+_NONZERO = re.compile(rb'[^\x00]')
+_BYTE_BITS = [tuple(bit for bit in range(8) if byte >> bit & 1) for byte in range(256)]
+_BITS_TABLE = bytes.maketrans(b'\x00\x01', b'01')
+
+
+def _char_bits(lines):
+    """{char: int bitset of the lines containing it}, built with C-level string ops."""
+    bits = {}
+    for c in set(''.join(lines)):
+        flags = bytes([c in line for line in lines]).translate(_BITS_TABLE)
+        bits[c] = int(flags[::-1], 2)
+    return bits
+
+
+def _iter_bits(mask):
+    """Indexes of the set bits of mask, lowest first."""
+    data = mask.to_bytes((mask.bit_length() + 7) // 8, 'little')
+    for m in _NONZERO.finditer(data):
+        base = m.start() * 8
+        for bit in _BYTE_BITS[data[m.start()]]:
+            yield base + bit
+
+
+def _gaps(text, query):
+    """Greedy subsequence match of query in text: (first position, skipped chars) or None."""
+    first = pos = text.find(query[0])
+    if pos < 0:
+        return None
+    gaps = 0
+    for c in query[1:]:
+        nxt = text.find(c, pos + 1)
+        if nxt < 0:
+            return None
+        gaps += nxt - pos - 1
+        pos = nxt
+    return first, gaps
+
+
+def score_path(rel_lower, base, query):
+    """Higher is better; basename matches always rank above path-only matches."""
+    if query in base:
+        at = base.find(query)
+        score = 3000 - at * 10 - (len(base) - len(query))
+        if at == 0:
+            score += 500
+        elif base[at - 1] in '._-':
+            score += 250
+        return score - len(rel_lower) * 0.1
+    match = _gaps(base, query)
+    if match is not None:
+        return 2000 - match[1] * 5 - match[0] - len(rel_lower) * 0.1
+    if query in rel_lower:
+        return 1000 - (len(rel_lower) - len(query)) * 0.5
+    match = _gaps(rel_lower, query)
+    if match is None:
+        return None
+    return 500 - match[1] - len(rel_lower) * 0.1
+
+
+def _tree_files(root, top):
+    """Paths relative to root of the files below top, as the explorer's scanner lists them."""
+    rel = []
+    prefix = os.path.relpath(top, root).replace(os.sep, '/') + '/' if top != root else ''
+    tree, _budget = scan_tree(top, MAX_DEPTH, MAX_PATHS, ignore=IgnoreMatcher(root))
+    stack = [(child, prefix + child.name) for child in tree.children or []]
+    while stack:
+        node, path = stack.pop()
+        if node.is_dir:
+            stack.extend((child, path + '/' + child.name) for child in node.children or [])
+        else:
+            rel.append(path)
+    return rel
+
+
+def _pack(lines):
+    starts = array('I')
+    pos = 0
+    for line in lines:
+        starts.append(pos)
+        pos += len(line) + 1
+    return '\n'.join(lines) + '\n', starts
+
+
+class PathList:
+    """Project-relative file paths packed for fuzzy lookups.
+
+    Lowercased paths and basenames are kept as newline-joined strings, so a
+    substring lookup is a str.find scan in C, and as per-character bitsets:
+    for every character a Python int has bit i set when path i (or its
+    basename) contains it, so ANDing those of the query characters leaves
+    only the paths that can hold the query as a subsequence. Paths are
+    appended and tombstoned in place so watcher updates stay cheap; adds
+    come in batches (``add_many``) so the blobs and bitsets, each the size
+    of the index, are rebuilt once per batch rather than once per path.
+    """
+
+    def __init__(self, rel_paths):
+        self.paths = sorted(rel_paths, key=lambda p: (p.count('/'), p.lower()))
+        self.lower = [p.lower() for p in self.paths]
+        self.bases = [p.rsplit('/', 1)[-1] for p in self.lower]
+        self.index = {p: i for i, p in enumerate(self.paths)}
+        self.path_blob, self.path_starts = _pack(self.lower)
+        self.base_blob, self.base_starts = _pack(self.bases)
+        self.path_bits = _char_bits(self.lower)
+        self.base_bits = _char_bits(self.bases)
+        self.alive = (1 << len(self.paths)) - 1
+        self.live = bytearray(b'\x01') * len(self.paths)
+        self.dead = 0
+
+    def add_many(self, rels):
+        first = len(self.paths)
+        new = []
+        for rel in rels:
+            if rel not in self.index:
+                self.index[rel] = first + len(new)
+                new.append(rel)
+        if not new:
+            return
+        lower = [p.lower() for p in new]
+        bases = [p.rsplit('/', 1)[-1] for p in lower]
+        self.paths.extend(new)
+        self.lower.extend(lower)
+        self.bases.extend(bases)
+        for blob_attr, starts, lines in (('path_blob', self.path_starts, lower),
+                                         ('base_blob', self.base_starts, bases)):
+            text, offsets = _pack(lines)
+            pos = len(getattr(self, blob_attr))
+            starts.extend(pos + offset for offset in offsets)
+            setattr(self, blob_attr, getattr(self, blob_attr) + text)
+        for bits, lines in ((self.path_bits, lower), (self.base_bits, bases)):
+            for c, mask in _char_bits(lines).items():
+                bits[c] = bits.get(c, 0) | (mask << first)
+        self.live.extend(b'\x01' * len(new))
+        self.alive |= ((1 << len(new)) - 1) << first
+
+    def remove(self, rel):
+        """Drop rel, or every path below it when it is a folder."""
+        inner = rel + '/'
+        for path in [p for p in self.index if p == rel or p.startswith(inner)]:
+            i = self.index.pop(path)
+            self.alive &= ~(1 << i)
+            self.live[i] = 0
+            self.dead += 1
+
+    def find(self, blob, starts, query, cap):
+        """Indexes of the lines of blob containing query (first cap of them)."""
+        found = []
+        end = len(blob)
+        pos = blob.find(query)
+        while pos >= 0 and len(found) < cap:
+            i = bisect_right(starts, pos) - 1
+            found.append(i)
+            pos = blob.find(query, starts[i + 1] if i + 1 < len(starts) else end)
+        return found
+
+    def mask(self, bits, query):
+        mask = self.alive
+        for c in set(query):
+            mask &= bits.get(c, 0)
+            if not mask:
+                break
+        return mask
+
+
+class QuickOpenIndex:
+    """Fuzzy "open file by name" over the files of the current project.
+
+    The path list is built with the explorer's tree scanner (ignore rules and
+    hidden files as in the explorer) on a background thread and kept current
+    from the tree watcher deltas (a ``reset`` delta rebuilds it). A query
+    first looks for the characters in order within basenames, then across
+    the whole path when that gives too few hits; recently opened files get
+    a bonus. Queries never wait for a scan: they answer from the list they
+    have and say whether it is complete.
+    """
+
+    # Hits scored per query, and subsequence checks done per pass: short
+    # queries match most of a big project.
+    SCORE_CAP = 1500
+    CHECK_BUDGET = 2000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.root = None
+        self._paths = PathList(())
+        self._ready = threading.Event()
+        self._generation = 0
+        self._recent = OrderedDict()
+
+    def prepare(self, root):
+        """Start indexing root unless it is already the indexed project."""
+        root = os.path.realpath(root)
+        with self._lock:
+            if root == self.root:
+                return
+            self.root = root
+            self._paths = PathList(())
+            self._ready = threading.Event()
+        self._rebuild(root)
+
+    def _rebuild(self, root, rel=None):
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+            ready = self._ready
+        threading.Thread(target=self._build, args=(root, generation, ready, rel),
+                         name='dex-quick-open', daemon=True).start()
+
+    def _build(self, root, generation, ready, rel):
+        try:
+            paths = PathList(_tree_files(root, root) if rel is None else rel)
+        except Exception as e:
+            print(f'[QuickOpenIndex] Error indexando {root}: {e}')
+            paths = PathList(())
+        with self._lock:
+            if generation == self._generation:
+                self._paths = paths
+        ready.set()
+
+    def apply_changes(self, added=(), removed=()):
+        """Update from explorer deltas: absolute paths of added and removed files or folders."""
+        root = self.root
+        if not root or not self._ready.is_set():
+            return
+        prefix = root + os.sep
+        new_files = []
+        for path in added:
+            if not path.startswith(prefix):
+                continue
+            if os.path.isdir(path) and not os.path.islink(path):
+                try:
+                    new_files.extend(_tree_files(root, path))
+                except Exception:
+                    continue
+            else:
+                new_files.append(path[len(prefix):].replace(os.sep, '/'))
+        with self._lock:
+            if root != self.root:
+                return
+            paths = self._paths
+            for path in removed:
+                if path.startswith(prefix):
+                    paths.remove(path[len(prefix):].replace(os.sep, '/'))
+            paths.add_many(new_files)
+            repack = paths.dead > 1000 and paths.dead * 4 > len(paths.paths)
+            root = self.root
+            live = list(paths.index) if repack else None
+        if repack:
+            # Mostly tombstones: rebuild the bitsets (queries use the old list meanwhile).
+            self._rebuild(root, live)
+
+    def refresh(self):
+        """Rescan the project (after a tree reset); the current list answers queries meanwhile."""
+        if self.root:
+            self._rebuild(self.root)
+
+    def note_opened(self, path):
+        path = os.path.realpath(path)
+        with self._lock:
+            self._recent.pop(path, None)
+            self._recent[path] = True
+            while len(self._recent) > RECENT_FILES:
+                self._recent.popitem(last=False)
+
+    def query(self, query, limit=50, wait=0.0):
+        """([{path, file, name, score}] best first, ready); not ready while the first scan runs."""
+        ready = self._ready.wait(wait) if wait else self._ready.is_set()
+        query = query.strip().lower().replace(os.sep, '/').replace('\n', '')
+        with self._lock:
+            paths, root, recent = self._paths, self.root, list(self._recent)
+            if not query:
+                chosen = []
+                for path in reversed(recent):
+                    if root and path.startswith(root + os.sep):
+                        rel = path[len(root) + 1:].replace(os.sep, '/')
+                        chosen.append({'path': path, 'file': rel, 'name': rel.rsplit('/', 1)[-1], 'score': 0})
+                return chosen[:limit], ready
+            bonus = {}
+            for rank, path in enumerate(reversed(recent)):
+                bonus[path] = 150 * (1 - rank / RECENT_FILES)
+            scored = []
+            for i in self._candidates(paths, query, limit):
+                score = score_path(paths.lower[i], paths.bases[i], query)
+                if score is None:
+                    continue
+                full = os.path.join(root, paths.paths[i])
+                scored.append((score + bonus.get(full, 0), i, full))
+            best = heapq.nlargest(limit, scored)
+            return [{'path': full, 'file': paths.paths[i], 'name': paths.paths[i].rsplit('/', 1)[-1],
+                     'score': round(score, 1)} for score, i, full in best], ready
+
+    def _candidates(self, paths, query, limit):
+        """Basename hits (substring, then subsequence), then whole-path hits if still short."""
+        found = []
+        seen = set()
+        passes = ((paths.base_blob, paths.base_starts, paths.base_bits, paths.bases),
+                  (paths.path_blob, paths.path_starts, paths.path_bits, paths.lower))
+        for blob, starts, bits, texts in passes:
+            for i in paths.find(blob, starts, query, self.SCORE_CAP):
+                if paths.live[i] and i not in seen:
+                    seen.add(i)
+                    found.append(i)
+            checked = 0
+            for i in _iter_bits(paths.mask(bits, query)):
+                if len(found) >= self.SCORE_CAP or checked >= self.CHECK_BUDGET:
+                    break
+                if i in seen:
+                    continue
+                checked += 1
+                if _gaps(texts[i], query) is not None:
+                    seen.add(i)
+                    found.append(i)
+            if len(found) >= limit:
+                # Path-only matches would rank below these anyway.
+                break
+        return found
@@ -0,0 +1,353 @@
+import os
+import time
+import uuid
+import codecs
+import itertools
+import signal
+import threading
+import subprocess
+from collections import deque
+
+
+READ_SIZE = 65536
+# A chunk keeps growing while nobody has read it, up to this many characters.
+MAX_CHUNK_CHARS = 64 * 1024
+MAX_READ_CHUNKS = 32
+# New output is held this long before a read returns it, so fast printers coalesce.
+COALESCE_SECONDS = 0.05
+# Output kept in memory: the first HEAD_CHARS and the latest TAIL_CHARS characters.
+HEAD_CHARS = 64 * 1024
+TAIL_CHARS = 1024 * 1024
+# Spilled logs kept per log folder; older ones are removed when a new one starts.
+KEEP_LOGS = 20
+LOG_PAGE_BYTES = 256 * 1024
+
+
+def _prune_logs(log_dir):
+    try:
+        logs = [os.path.join(log_dir, name) for name in os.listdir(log_dir) if name.endswith('.log')]
+        logs.sort(key=os.path.getmtime)
+    except OSError:
+        return
+    for path in logs[:max(0, len(logs) - KEEP_LOGS + 1)]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class RunOutput:
+    """stdout/stderr of a process as numbered, timestamped chunks.
+
+    Reader threads append what the pipes deliver as soon as it arrives.
+    Output arriving on the same stream before the UI fetched the previous
+    chunk is merged into it, and ``read`` holds fresh output for
+    COALESCE_SECONDS, so a process printing thousands of lines per second
+    costs one chunk per poll instead of one per line.
+
+    Memory stays bounded: the first ``head_chars`` characters are kept,
+    then only the latest ``tail_chars`` (older tail chunks are dropped as
+    new ones arrive). When output first outgrows that and ``log_dir`` is
+    given, everything is spilled to ``<log_dir>/<name>.log`` and appended
+    there from then on, so the full log stays readable with ``read_log``.
+    """
+
+    def __init__(self, head_chars=HEAD_CHARS, tail_chars=TAIL_CHARS, log_dir=None, name=None):
+        self.head_chars = head_chars
+        self.tail_chars = tail_chars
+        self.log_dir = log_dir
+        self.name = name or uuid.uuid4().hex
+        self.log_path = None
+        self._log = None
+        self.head = []
+        self.tail = deque()
+        self._head_size = 0
+        self._tail_size = 0
+        self._head_full = False
+        # Characters dropped from the tail, per stream.
+        self.dropped = {}
+        self.next_seq = 0
+        self.delivered = 0
+        self.pending_since = None
+        self.done = False
+        self.code = None
+        self.timeout = False
+        self.changed = threading.Condition()
+
+    @property
+    def chunks(self):
+        return self.head + list(self.tail)
+
+    @property
+    def truncated(self):
+        return bool(self.dropped)
+
+    def append(self, stream, text):
+        if not text:
+            return
+        with self.changed:
+            if self.pending_since is None:
+                self.pending_since = time.monotonic()
+            if self._log is not None:
+                self._log.write(text)
+            last = self.tail or (self.head if not self._head_full else None)
+            if last:
+                seq, ts, last_stream, last_text = last[-1]
+                fits = last is self.tail or self._head_size + len(text) <= self.head_chars
+                if (fits and last_stream == stream and seq >= self.delivered
+                        and len(last_text) + len(text) <= MAX_CHUNK_CHARS):
+                    last[-1] = (seq, ts, stream, last_text + text)
+                    if last is self.tail:
+                        self._tail_size += len(text)
+                        self._evict()
+                    else:
+                        self._head_size += len(text)
+                    self.changed.notify_all()
+                    return
+            chunk = (self.next_seq, time.time(), stream, text)
+            self.next_seq += 1
+            if not self._head_full and self._head_size + len(text) <= self.head_chars:
+                self.head.append(chunk)
+                self._head_size += len(text)
+            else:
+                self._head_full = True
+                self.tail.append(chunk)
+                self._tail_size += len(text)
+                self._evict()
+            self.changed.notify_all()
+
+    def _evict(self):
+        while self._tail_size > self.tail_chars and len(self.tail) > 1:
+            if self._log is None and self.log_dir and not self.dropped:
+                self._spill()
+            _seq, _ts, stream, text = self.tail.popleft()
+            self._tail_size -= len(text)
+            self.dropped[stream] = self.dropped.get(stream, 0) + len(text)
+
+    def _spill(self):
+        """Write everything so far to the log file and keep appending to it."""
+        try:
+            os.makedirs(self.log_dir, exist_ok=True)
+            _prune_logs(self.log_dir)
+            path = os.path.join(self.log_dir, self.name + '.log')
+            self._log = open(path, 'w', encoding='utf-8', errors='replace')
+        except OSError:
+            self.log_dir = None
+            return
+        self.log_path = path
+        for _seq, _ts, _stream, text in self.chunks:
+            self._log.write(text)
+
+    def finish(self, code, timeout=False):
+        with self.changed:
+            self.done = True
+            self.code = code
+            self.timeout = timeout
+            if self._log is not None:
+                self._log.close()
+                self._log = None
+            self.changed.notify_all()
+
+    def wait(self, timeout=None):
+        """Block until the process finished (or timeout); returns done."""
+        with self.changed:
+            return self.changed.wait_for(lambda: self.done, timeout)
+
+    def text(self, stream):
+        """What a stream printed, as one string; a marker stands for dropped output."""
+        with self.changed:
+            head = ''.join(text for _seq, _ts, chunk_stream, text in self.head if chunk_stream == stream)
+            tail = ''.join(text for _seq, _ts, chunk_stream, text in self.tail if chunk_stream == stream)
+            if not self.dropped.get(stream):
+                return head + tail
+            note = '\n[... %d caracteres omitidos' % self.dropped[stream]
+            if self.log_path:
+                note += '; log completo en %s' % self.log_path
+            return head + note + ' ...]\n' + tail
+
+    def read(self, since_seq=0, wait=0.0):
+        """Chunks with seq >= since_seq; waits up to ``wait`` seconds for new output or the end.
+
+        When chunks from since_seq on were already dropped, reading resumes at
+        the oldest one kept and ``skipped`` tells how many were lost.
+        """
+        deadline = time.monotonic() + wait
+        with self.changed:
+            while not self.done and self.next_seq <= since_seq:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.changed.wait(remaining)
+            while not self.done and self.pending_since is not None:
+                remaining = self.pending_since + COALESCE_SECONDS - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.changed.wait(remaining)
+            items = [chunk for chunk in self.head if chunk[0] >= since_seq][:MAX_READ_CHUNKS]
+            skipped = 0
+            if not items and self.tail:
+                # Seqs between the head and the tail are the dropped ones.
+                first = self.tail[0][0]
+                skipped = max(0, first - max(since_seq, self.head[-1][0] + 1 if self.head else 0))
+                start = max(0, since_seq - first)
+                items = list(itertools.islice(self.tail, start, start + MAX_READ_CHUNKS))
+            next_seq = items[-1][0] + 1 if items else max(since_seq, 0)
+            self.delivered = max(self.delivered, next_seq)
+            if self.delivered >= self.next_seq:
+                self.pending_since = None
+            result = {
+                'chunks': [{'seq': seq, 'time': ts, 'stream': stream, 'text': text}
+                           for seq, ts, stream, text in items],
+                'next_seq': next_seq,
+                'done': self.done and next_seq >= self.next_seq,
+                'code': self.code,
+                'timeout': self.timeout
+            }
+            if skipped:
+                result['skipped'] = skipped
+                result['log_path'] = self.log_path
+            return result
+
+    def read_log(self, offset=0, limit=LOG_PAGE_BYTES):
+        """A page of the whole output from byte ``offset`` (UTF-8), from the log file once spilled.
+
+        Returns text, next_offset and size; pages never split a character.
+        Without a log file only what is still in memory can be paged.
+        """
+        offset = max(0, int(offset))
+        limit = max(1, int(limit))
+        with self.changed:
+            if self._log is not None:
+                self._log.flush()
+            path = self.log_path
+            if path is None:
+                data = ''.join(text for _seq, _ts, _stream, text in self.chunks).encode('utf-8')
+                size = len(data)
+                raw = data[offset:offset + limit]
+        if path is not None:
+            with open(path, 'rb') as f:
+                size = os.fstat(f.fileno()).st_size
+                f.seek(offset)
+                raw = f.read(limit)
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        text = decoder.decode(raw)
+        pending = len(decoder.getstate()[0])
+        if pending and offset + len(raw) >= size:
+            text += decoder.decode(b'', final=True)
+            pending = 0
+        next_offset = offset + len(raw) - pending
+        return {
+            'text': text,
+            'offset': offset,
+            'next_offset': next_offset,
+            'size': size,
+            'eof': next_offset >= size,
+            'log_path': path,
+            'truncated': path is None and self.truncated
+        }
+
+
+def _pump(pipe, stream, output):
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    fd = pipe.fileno()
+    try:
+        while True:
+            data = os.read(fd, READ_SIZE)
+            if not data:
+                break
+            output.append(stream, decoder.decode(data))
+        output.append(stream, decoder.decode(b'', final=True))
+    except OSError:
+        pass
+    finally:
+        pipe.close()
+
+
+class StreamingRun:
+    """A shell command whose output is read while it runs (see RunOutput).
+
+    ``capture`` holds RunOutput options (head_chars, tail_chars, log_dir).
+    With ``detach=False`` the command keeps the app's stdin and session, as
+    plain run_command calls always did; it can then not be signalled as a
+    group, so a timeout only reaches the shell itself.
+    """
+
+    def __init__(self, command, cwd, timeout=None, capture=None, detach=True):
+        self.id = uuid.uuid4().hex
+        self.command = command
+        self.cwd = cwd
+        self.detach = detach
+        self.started = time.time()
+        self.ended = None
+        self.killed = False
+        self.output = RunOutput(name=self.id, **(capture or {}))
+        self.process = subprocess.Popen(
+            command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            stdin=subprocess.DEVNULL if detach else None, cwd=cwd,
+            preexec_fn=os.setsid if detach else None
+        )
+        self._readers = [
+            threading.Thread(target=_pump, args=(self.process.stdout, 'stdout', self.output),
+                             name='dex-run-stdout', daemon=True),
+            threading.Thread(target=_pump, args=(self.process.stderr, 'stderr', self.output),
+                             name='dex-run-stderr', daemon=True)
+        ]
+        for reader in self._readers:
+            reader.start()
+        threading.Thread(target=self._wait, args=(timeout,), name='dex-run-wait', daemon=True).start()
+
+    def _wait(self, timeout):
+        timed_out = False
+        try:
+            self.process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            timed_out = True
+            self.terminate()
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.terminate(signal.SIGKILL)
+                self.process.wait()
+        for reader in self._readers:
+            # Children that inherited the pipes may keep them open; do not wait on them forever.
+            reader.join(timeout=2)
+        self.ended = time.time()
+        self.output.finish(124 if timed_out else self.process.returncode, timed_out)
+
+    @property
+    def pgid(self):
+        # Started with setsid: the process leads its own group.
+        return self.process.pid if self.detach else None
+
+    @property
+    def state(self):
+        if not self.output.done:
+            return 'running'
+        if self.output.timeout:
+            return 'timeout'
+        return 'killed' if self.killed else 'exited'
+
+    def terminate(self, sig=signal.SIGTERM):
+        """Signal the whole process group; False when it had already exited."""
+        try:
+            if self.detach:
+                os.killpg(self.pgid, sig)
+            else:
+                self.process.send_signal(sig)
+            return True
+        except ProcessLookupError:
+            return False
+
+    def info(self):
+        return {
+            'run_id': self.id,
+            'command': self.command,
+            'cwd': self.cwd,
+            'pid': self.process.pid,
+            'pgid': self.pgid,
+            'started': self.started,
+            'ended': self.ended,
+            'state': self.state,
+            'code': self.output.code,
+            'log_path': self.output.log_path
+        }
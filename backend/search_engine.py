@@ -0,0 +1,246 @@
+import os
+import re
+import time
+import uuid
+import fnmatch
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.ignore_rules import IgnoreMatcher
+from backend.file_reader import classify_sample
+
+
+# Never searched, whatever the ignore files say (same as the old grep call).
+SKIP_DIRS = {'.git', 'build', '__pycache__'}
+MAX_FILE_BYTES = 8 * 1024 * 1024
+PREVIEW_CHARS = 240
+SEARCH_WORKERS = min(16, (os.cpu_count() or 2) * 2)
+
+
+def compile_query(query, regex=False, case=False):
+    """re pattern for a search: a literal unless regex, case-insensitive unless case."""
+    if not query:
+        raise ValueError('La búsqueda está vacía')
+    flags = re.MULTILINE if case else re.MULTILINE | re.IGNORECASE
+    try:
+        return re.compile(query if regex else re.escape(query), flags)
+    except re.error as e:
+        raise ValueError(f'Expresión regular inválida: {e}')
+
+
+def glob_filter(globs):
+    """Predicate on project-relative paths: ``*.py`` includes, ``!build/**`` excludes.
+
+    A pattern without ``/`` is matched against the basename.
+    """
+    includes = []
+    excludes = []
+    for pattern in globs or []:
+        pattern = pattern.strip()
+        if not pattern:
+            continue
+        if pattern.startswith('!'):
+            excludes.append(pattern[1:])
+        else:
+            includes.append(pattern)
+
+    def matches(rel, pattern):
+        if '/' not in pattern:
+            return fnmatch.fnmatch(rel.rsplit('/', 1)[-1], pattern)
+        return fnmatch.fnmatch(rel, pattern)
+
+    def accept(rel):
+        if includes and not any(matches(rel, p) for p in includes):
+            return False
+        return not any(matches(rel, p) for p in excludes)
+    return accept
+
+
+def iter_project_files(root, accept=None, top=None):
+    """Project files to search: ignore files honoured, SKIP_DIRS pruned, symlinks not followed."""
+    matcher = IgnoreMatcher(root)
+    for dir_path, dirs, files in matcher.walk(top or root):
+        dirs[:] = [d for d in dirs if d not in SKIP_DIRS]
+        for name in files:
+            path = os.path.join(dir_path, name)
+            rel = os.path.relpath(path, root).replace(os.sep, '/')
+            if accept is None or accept(rel):
+                yield path, rel
+
+
+def read_text(path):
+    """Decoded contents of a text file, or None for binaries, huge files and unreadable ones."""
+    try:
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size > MAX_FILE_BYTES:
+                return None
+            data = f.read()
+    except OSError:
+        return None
+    return decode_text(data, size)
+
+
+def decode_text(data, size=None):
+    """data decoded as read_text would, or None for binaries."""
+    info = classify_sample(data[:8192], len(data) if size is None else size)
+    if info['binary']:
+        return None
+    return data.decode(info['encoding'], errors='replace')
+
+
+def search_text(text, pattern, limit=None):
+    """[(line, column, line_text, match_length)] for every match, 1-based line and column."""
+    hits = []
+    line_no = 1
+    line_start = 0
+    for m in pattern.finditer(text):
+        start = m.start()
+        if m.end() == start and start == len(text):
+            break
+        line_no += text.count('\n', line_start, start)
+        line_start = text.rfind('\n', 0, start) + 1
+        line_end = text.find('\n', start)
+        if line_end == -1:
+            line_end = len(text)
+        line_text = text[line_start:line_end].rstrip('\r')
+        hits.append((line_no, start - line_start + 1, line_text[:PREVIEW_CHARS], len(m.group(0))))
+        if limit is not None and len(hits) >= limit:
+            break
+    return hits
+
+
+class SearchJob:
+    def __init__(self, root, query):
+        self.id = uuid.uuid4().hex
+        self.root = root
+        self.query = query
+        self.results = []
+        self.files_searched = 0
+        self.files_matched = 0
+        self.done = False
+        self.indexed = False
+        self.truncated = False
+        self.error = None
+        self.started = time.time()
+        self.finished = None
+        self.cancelled = threading.Event()
+        self.changed = threading.Condition()
+
+
+class SearchService:
+    """Project-wide content search on a thread pool, with results fetched in pages.
+
+    ``start`` returns at once; files are read and matched by the pool while
+    the UI pulls results with ``page`` (which can wait briefly for the first
+    ones). Binaries, files over MAX_FILE_BYTES and ignored paths are skipped.
+
+    With a trigram ``index`` (see trigram_index) only the files that can
+    contain the query are read.
+    """
+
+    KEEP_FINISHED = 10
+
+    def __init__(self, workers=SEARCH_WORKERS, index=None):
+        self._index = index
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='dex-search')
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def start(self, root, query, regex=False, case=False, globs=None, limit=2000):
+        pattern = compile_query(query, regex, case)
+        root = os.path.abspath(root)
+        if not os.path.isdir(root):
+            raise ValueError('El proyecto no existe')
+        job = SearchJob(root, query)
+        with self._lock:
+            self._jobs[job.id] = job
+            finished = [j for j in self._jobs.values() if j.done]
+            for old in finished[:max(0, len(finished) - self.KEEP_FINISHED)]:
+                self._jobs.pop(old.id, None)
+        threading.Thread(target=self._run, args=(job, pattern, glob_filter(globs), limit, regex),
+                         name='dex-search-walk', daemon=True).start()
+        return job
+
+    def _files(self, job, accept, regex):
+        if self._index is not None:
+            try:
+                candidates = self._index.candidates(job.root, job.query, regex)
+            except Exception as e:
+                print(f'[SearchService] Índice no disponible: {e}')
+                candidates = None
+            if candidates is not None:
+                job.indexed = True
+                return [(path, rel) for path, rel in candidates if accept(rel)]
+        return iter_project_files(job.root, accept)
+
+    def _run(self, job, pattern, accept, limit, regex):
+        def search_file(path, rel):
+            if job.cancelled.is_set():
+                return
+            text = read_text(path)
+            hits = search_text(text, pattern) if text else []
+            with job.changed:
+                job.files_searched += 1
+                if not hits or job.truncated:
+                    return
+                room = limit - len(job.results)
+                if len(hits) >= room:
+                    hits = hits[:room]
+                    job.truncated = True
+                    job.cancelled.set()
+                job.files_matched += 1
+                job.results.extend({'path': path, 'file': rel, 'line': line, 'column': column,
+                                    'text': line_text, 'length': length}
+                                   for line, column, line_text, length in hits)
+                job.changed.notify_all()
+
+        futures = []
+        try:
+            for path, rel in self._files(job, accept, regex):
+                if job.cancelled.is_set():
+                    break
+                futures.append(self._pool.submit(search_file, path, rel))
+            for future in futures:
+                future.result()
+        except Exception as e:
+            job.error = str(e)
+        with job.changed:
+            job.done = True
+            job.finished = time.time()
+            job.changed.notify_all()
+
+    def get(self, search_id):
+        with self._lock:
+            return self._jobs.get(search_id)
+
+    def cancel(self, search_id):
+        job = self.get(search_id)
+        if job is None:
+            return False
+        job.cancelled.set()
+        return True
+
+    def page(self, job, cursor=0, page_size=200, wait=0.0):
+        """Results from cursor on; waits up to ``wait`` seconds for a full page or the end."""
+        deadline = time.monotonic() + wait
+        with job.changed:
+            while not job.done and len(job.results) - cursor < page_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                job.changed.wait(remaining)
+            items = job.results[cursor:cursor + page_size]
+            return {
+                'search_id': job.id,
+                'results': items,
+                'next_cursor': cursor + len(items),
+                'done': job.done and cursor + len(items) >= len(job.results),
+                'truncated': job.truncated,
+                'indexed': job.indexed,
+                'files_searched': job.files_searched,
+                'files_matched': job.files_matched,
+                'error': job.error,
+                'elapsed': round((job.finished or time.time()) - job.started, 3)
+            }
@@ -0,0 +1,390 @@
+import io
+import os
+import ast
+import json
+import time
+import sqlite3
+import threading
+import tokenize
+
+from backend.search_engine import iter_project_files
+from backend.file_writer import content_hash
+
+
+PYTHON_SUFFIXES = ('.py', '.pyw', '.pyi')
+MAX_SOURCE_BYTES = 4 * 1024 * 1024
+
+# Definitions rank above assignments, imports come last.
+_KIND_ORDER = {'class': 0, 'function': 1, 'method': 1, 'variable': 2, 'import': 3}
+_FIELDS = ('name', 'kind', 'line', 'column', 'end_line', 'container')
+
+
+def _char_column(lines, line, col_offset):
+    """ast gives UTF-8 byte offsets; the editor counts characters."""
+    text = lines[line - 1] if 0 < line <= len(lines) else ''
+    if text.isascii():
+        return col_offset + 1
+    return len(text.encode('utf-8')[:col_offset].decode('utf-8', 'ignore')) + 1
+
+
+def _target_names(target):
+    if isinstance(target, ast.Name):
+        yield target
+    elif isinstance(target, (ast.Tuple, ast.List)):
+        for elt in target.elts:
+            yield from _target_names(elt)
+    elif isinstance(target, ast.Starred):
+        yield from _target_names(target.value)
+
+
+def extract_symbols(raw):
+    """Symbols of a Python source (bytes): [(name, kind, line, column, end_line, container)].
+
+    Classes, functions and methods at any depth; assignments and imports at
+    module and class level only (those in function bodies are locals).
+    Statements under ``if``/``try``/``with``/loops are included. Raises
+    SyntaxError/ValueError for sources that do not parse.
+    """
+    encoding, _ = tokenize.detect_encoding(io.BytesIO(raw).readline)
+    text = raw.decode(encoding)
+    tree = ast.parse(text)
+    lines = text.splitlines()
+    symbols = []
+
+    def add(name, kind, node, container):
+        line = node.lineno
+        symbols.append((name, kind, line, _char_column(lines, line, node.col_offset),
+                        getattr(node, 'end_lineno', None) or line, container))
+
+    def visit(body, container, scope):
+        for node in body:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                add(node.name, 'method' if scope == 'class' else 'function', node, container)
+                visit(node.body, f'{container}.{node.name}' if container else node.name, 'function')
+            elif isinstance(node, ast.ClassDef):
+                add(node.name, 'class', node, container)
+                visit(node.body, f'{container}.{node.name}' if container else node.name, 'class')
+            elif scope == 'function':
+                # Only nested definitions matter inside a function body.
+                for field in ('body', 'orelse', 'finalbody'):
+                    visit(getattr(node, field, ()), container, scope)
+                for handler in getattr(node, 'handlers', ()):
+                    visit(handler.body, container, scope)
+                for case in getattr(node, 'cases', ()):
+                    visit(case.body, container, scope)
+            elif isinstance(node, (ast.Assign, ast.AnnAssign, ast.AugAssign)):
+                targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+                for target in targets:
+                    for name in _target_names(target):
+                        add(name.id, 'variable', name, container)
+            elif isinstance(node, (ast.Import, ast.ImportFrom)):
+                for alias in node.names:
+                    if alias.name == '*':
+                        continue
+                    name = alias.asname or alias.name.split('.')[0]
+                    add(name, 'import', node, container)
+            else:
+                for field in ('body', 'orelse', 'finalbody'):
+                    visit(getattr(node, field, ()), container, scope)
+                for handler in getattr(node, 'handlers', ()):
+                    visit(handler.body, container, scope)
+                for case in getattr(node, 'cases', ()):
+                    visit(case.body, container, scope)
+
+    visit(tree.body, '', 'module')
+    symbols.sort(key=lambda s: (s[2], s[3]))
+    return symbols
+
+
+def _as_dict(symbol):
+    return dict(zip(_FIELDS, symbol))
+
+
+class SymbolIndex:
+    """Classes, functions, assignments and imports of the Python files of a project.
+
+    Parsed symbols are cached on disk by content hash in
+    ``~/.dex-studio/symbols.sqlite``, so reopening a project or switching
+    branches only parses files whose contents were never seen. In memory,
+    files are judged by (mtime_ns, size): a background sweep when the project
+    is opened (and again at most every ``SWEEP_INTERVAL`` seconds when it is
+    queried) and the paths the API reports as changed re-read only what
+    differs. ``outline`` always checks the file on disk first.
+    """
+
+    SWEEP_INTERVAL = 30.0
+    # Cached parses not seen for this many days are dropped.
+    KEEP_DAYS = 30
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or os.path.join(os.path.expanduser("~"), '.dex-studio', 'symbols.sqlite')
+        self._db = None
+        self._db_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self.root = None
+        # path -> (mtime_ns, size, hash, symbols) and name -> set of paths.
+        self._files = {}
+        self._names = {}
+        self._ready = threading.Event()
+        self._generation = 0
+        self._sweeping = False
+        self._last_sweep = 0.0
+        self._dirty = set()
+        self._worker = None
+
+    # ── Parse cache ──────────────────────────────────────────────────
+
+    def _conn(self):
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db.executescript('''
+                PRAGMA journal_mode = WAL;
+                PRAGMA synchronous = NORMAL;
+                CREATE TABLE IF NOT EXISTS parsed (hash TEXT PRIMARY KEY, symbols TEXT, used INTEGER);
+            ''')
+        return self._db
+
+    def _cached(self, digest):
+        with self._db_lock:
+            row = self._conn().execute('SELECT symbols FROM parsed WHERE hash = ?', (digest,)).fetchone()
+        if row is None:
+            return None
+        return [tuple(s) for s in json.loads(row[0])]
+
+    def _store(self, rows):
+        if not rows:
+            return
+        today = int(time.time() // 86400)
+        with self._db_lock:
+            conn = self._conn()
+            conn.executemany('INSERT OR REPLACE INTO parsed (hash, symbols, used) VALUES (?, ?, ?)',
+                             ((digest, json.dumps(symbols), today) for digest, symbols in rows))
+            conn.commit()
+
+    def _touch(self, digests):
+        """Mark the hashes of the indexed files as used and drop stale cache rows."""
+        today = int(time.time() // 86400)
+        with self._db_lock:
+            conn = self._conn()
+            conn.executemany('UPDATE parsed SET used = ? WHERE hash = ? AND used < ?',
+                             ((today, digest, today) for digest in digests))
+            conn.execute('DELETE FROM parsed WHERE used < ?', (today - self.KEEP_DAYS,))
+            conn.commit()
+
+    def _load(self, path):
+        """(mtime_ns, size, hash, symbols) of path, parsing only unseen contents; None if unreadable."""
+        try:
+            with open(path, 'rb') as f:
+                st = os.fstat(f.fileno())
+                if st.st_size > MAX_SOURCE_BYTES:
+                    return (st.st_mtime_ns, st.st_size, None, []), None
+                raw = f.read()
+        except OSError:
+            return None, None
+        digest = content_hash(raw)
+        symbols = self._cached(digest)
+        fresh = None
+        if symbols is None:
+            try:
+                symbols = extract_symbols(raw)
+            except (SyntaxError, ValueError, UnicodeDecodeError, LookupError, RecursionError):
+                # Half-written files are common; they get no symbols until they parse.
+                symbols = []
+            fresh = (digest, symbols)
+        return (st.st_mtime_ns, st.st_size, digest, symbols), fresh
+
+    # ── In-memory index ──────────────────────────────────────────────
+
+    def _put(self, path, entry):
+        """Replace the entry of path (None removes it); caller holds the lock."""
+        old = self._files.pop(path, None)
+        if old is not None:
+            for name in {s[0] for s in old[3]}:
+                paths = self._names.get(name)
+                if paths is not None:
+                    paths.discard(path)
+                    if not paths:
+                        del self._names[name]
+        if entry is None:
+            return
+        self._files[path] = entry
+        for name in {s[0] for s in entry[3]}:
+            self._names.setdefault(name, set()).add(path)
+
+    def prepare(self, root):
+        """Start indexing root unless it is already the indexed project."""
+        root = os.path.realpath(root)
+        with self._lock:
+            if root == self.root:
+                return
+            self.root = root
+            self._files = {}
+            self._names = {}
+            self._dirty = set()
+            self._ready = threading.Event()
+            self._generation += 1
+            self._sweeping = False
+        self._start_sweep()
+
+    def _start_sweep(self):
+        with self._lock:
+            if self._sweeping or not self.root:
+                return
+            self._sweeping = True
+            args = (self.root, self._generation, self._ready)
+        threading.Thread(target=self._sweep, args=args, name='dex-symbol-sweep', daemon=True).start()
+
+    def _sweep(self, root, generation, ready):
+        try:
+            seen = set()
+            fresh = []
+            accept = lambda rel: rel.endswith(PYTHON_SUFFIXES)
+            for path, _rel in iter_project_files(root, accept):
+                if generation != self._generation:
+                    return
+                seen.add(path)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                known = self._files.get(path)
+                if known and known[0] == st.st_mtime_ns and known[1] == st.st_size:
+                    continue
+                entry, parsed = self._load(path)
+                if entry is None:
+                    continue
+                if parsed:
+                    fresh.append(parsed)
+                    if len(fresh) >= 500:
+                        self._store(fresh)
+                        fresh = []
+                with self._lock:
+                    if generation != self._generation:
+                        return
+                    self._put(path, entry)
+            self._store(fresh)
+            with self._lock:
+                if generation != self._generation:
+                    return
+                for path in [p for p in self._files if p not in seen]:
+                    self._put(path, None)
+                digests = [entry[2] for entry in self._files.values() if entry[2]]
+            self._touch(digests)
+        except Exception as e:
+            print(f'[SymbolIndex] Error indexando {root}: {e}')
+        finally:
+            with self._lock:
+                if generation == self._generation:
+                    self._sweeping = False
+                    self._last_sweep = time.time()
+            ready.set()
+
+    def note_changed(self, paths):
+        """Re-read files (or folders) written, moved or deleted through the app."""
+        with self._lock:
+            root = self.root
+            if not root:
+                return
+            for path in paths:
+                path = os.path.abspath(path)
+                if path.startswith(root + os.sep):
+                    self._dirty.add(path)
+            if self._worker is None and self._dirty:
+                self._worker = threading.Thread(target=self._drain, name='dex-symbol-update', daemon=True)
+                self._worker.start()
+
+    def _drain(self):
+        while True:
+            with self._lock:
+                if not self._dirty:
+                    self._worker = None
+                    return
+                path = self._dirty.pop()
+                generation = self._generation
+                root = self.root
+            try:
+                self._refresh(root, generation, path)
+            except Exception as e:
+                print(f'[SymbolIndex] Error indexando {path}: {e}')
+
+    def _refresh(self, root, generation, path):
+        if os.path.isdir(path) and not os.path.islink(path):
+            for child, _rel in iter_project_files(root, lambda rel: rel.endswith(PYTHON_SUFFIXES), top=path):
+                self._refresh(root, generation, child)
+            return
+        entry = parsed = None
+        if path.endswith(PYTHON_SUFFIXES) and os.path.isfile(path):
+            entry, parsed = self._load(path)
+        if parsed:
+            self._store([parsed])
+        with self._lock:
+            if generation != self._generation:
+                return
+            if entry is not None:
+                self._put(path, entry)
+                return
+            # Gone: drop the file, or everything below a removed folder.
+            inner = path + os.sep
+            for known in [p for p in self._files if p == path or p.startswith(inner)]:
+                self._put(known, None)
+
+    # ── Queries ──────────────────────────────────────────────────────
+
+    def outline(self, path):
+        """Symbols of one file in source order, re-parsed only if it changed."""
+        path = os.path.realpath(path)
+        st = os.stat(path)
+        with self._lock:
+            known = self._files.get(path)
+        if known and known[0] == st.st_mtime_ns and known[1] == st.st_size:
+            return [_as_dict(s) for s in known[3]]
+        entry, parsed = self._load(path)
+        if entry is None:
+            raise FileNotFoundError(f'No encontrado: {path}')
+        if parsed:
+            self._store([parsed])
+        with self._lock:
+            if self.root and path.startswith(self.root + os.sep) and path.endswith(PYTHON_SUFFIXES):
+                self._put(path, entry)
+        return [_as_dict(s) for s in entry[3]]
+
+    def find(self, name, limit=100, wait=2.0):
+        """([{path, file, name, kind, line, column, end_line, container}], ready) for a symbol name.
+
+        ``name`` may be qualified (``Class.method``). Exact matches come first;
+        without any, names starting with it (case-insensitive) are returned.
+        """
+        ready = self._ready.wait(wait)
+        if time.time() - self._last_sweep > self.SWEEP_INTERVAL:
+            self._start_sweep()
+        name = name.strip()
+        if not name:
+            return [], ready
+        container, _, short = name.rpartition('.')
+        with self._lock:
+            root = self.root
+            paths = self._names.get(short)
+            if paths:
+                keys = [short]
+            else:
+                lower = short.lower()
+                keys = [key for key in self._names if key.lower().startswith(lower)]
+            hits = []
+            for key in keys:
+                for path in self._names[key]:
+                    for symbol in self._files[path][3]:
+                        if symbol[0] != key:
+                            continue
+                        if container and not (symbol[5] == container or symbol[5].endswith('.' + container)):
+                            continue
+                        hits.append((path, symbol))
+        hits.sort(key=lambda hit: (hit[1][0] != short, _KIND_ORDER.get(hit[1][1], 9), hit[1][0].lower(),
+                                   hit[0], hit[1][2]))
+        results = []
+        for path, symbol in hits[:limit]:
+            item = _as_dict(symbol)
+            item['path'] = path
+            item['file'] = os.path.relpath(path, root).replace(os.sep, '/') if root else path
+            results.append(item)
+        return results, ready
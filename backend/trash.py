@@ -0,0 +1,217 @@
+import os
+import json
+import time
+import uuid
+import shutil
+import threading
+
+
+class TrashBin:
+    """Instant deletes: items are renamed into ~/.dex-studio/trash/ and purged later.
+
+    Each deleted item gets ``<trash>/<id>/`` holding the item itself and an
+    ``info.json`` with its original path. Items can be restored during
+    ``restore_window`` seconds; after that a background thread removes them
+    at no more than ``max_unlinks_per_sec`` unlinks per second so a huge
+    folder (node_modules, venv) does not saturate the disk.
+
+    The rename only works within one filesystem. Items on another filesystem
+    than the trash are deleted right away, as before.
+    """
+
+    INFO = 'info.json'
+    ITEM = 'item'
+    # Entries are assembled under this prefix and renamed into place when complete.
+    TMP_PREFIX = '.tmp-'
+    # Unfinished entries older than this are leftovers of a crash and get purged.
+    TMP_GRACE = 300
+
+    def __init__(self, base_dir=None, restore_window=600, max_unlinks_per_sec=2000):
+        self.base_dir = base_dir or os.path.join(os.path.expanduser("~"), '.dex-studio', 'trash')
+        self.restore_window = restore_window
+        self.max_unlinks_per_sec = max_unlinks_per_sec
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._thread = None
+        self._expire_all = False
+
+    # ── Public API ───────────────────────────────────────────────────
+
+    def delete(self, path):
+        """Move path into the trash; returns the entry id, or None when it was deleted directly."""
+        path = os.path.abspath(path)
+        if not os.path.lexists(path):
+            raise FileNotFoundError(f'No encontrado: {path}')
+        os.makedirs(self.base_dir, exist_ok=True)
+        if os.lstat(path).st_dev != os.stat(self.base_dir).st_dev:
+            _remove_now(path)
+            return None
+        entry_id = uuid.uuid4().hex
+        # Built under a name the purger leaves alone, so it never sees a half-made entry.
+        tmp_dir = os.path.join(self.base_dir, self.TMP_PREFIX + entry_id)
+        os.mkdir(tmp_dir)
+        info = {'path': path, 'deleted_at': time.time(), 'is_dir': os.path.isdir(path) and not os.path.islink(path)}
+        try:
+            with open(os.path.join(tmp_dir, self.INFO), 'w', encoding='utf-8') as f:
+                json.dump(info, f)
+            os.rename(path, os.path.join(tmp_dir, self.ITEM))
+        except OSError:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        os.rename(tmp_dir, os.path.join(self.base_dir, entry_id))
+        self._start_purger()
+        return entry_id
+
+    def restore(self, entry_id):
+        """Put an entry back at its original path; returns that path."""
+        entry_dir = self._entry_dir(entry_id)
+        with self._lock:
+            info = self._read_info(entry_dir)
+            item = os.path.join(entry_dir, self.ITEM)
+            if info is None or not os.path.lexists(item):
+                raise FileNotFoundError('El elemento ya no está en la papelera')
+            path = info['path']
+            if os.path.lexists(path):
+                raise FileExistsError(f'Ya existe: {os.path.basename(path)}')
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.rename(item, path)
+            shutil.rmtree(entry_dir, ignore_errors=True)
+        return path
+
+    def list(self):
+        entries = []
+        try:
+            names = os.listdir(self.base_dir)
+        except FileNotFoundError:
+            return entries
+        for entry_id in names:
+            if entry_id.startswith(self.TMP_PREFIX):
+                continue
+            info = self._read_info(os.path.join(self.base_dir, entry_id))
+            if info is None:
+                continue
+            entries.append({
+                'id': entry_id,
+                'path': info['path'],
+                'name': os.path.basename(info['path']),
+                'is_dir': info.get('is_dir', False),
+                'deleted_at': info['deleted_at'],
+                'expires_at': info['deleted_at'] + self.restore_window
+            })
+        entries.sort(key=lambda e: e['deleted_at'], reverse=True)
+        return entries
+
+    def resume(self):
+        """Purge what a previous session left in the trash (called at startup)."""
+        if os.path.isdir(self.base_dir):
+            self._start_purger()
+
+    def empty(self):
+        """Let the purger remove every entry now, restore window or not."""
+        self._start_purger(expire_all=True)
+
+    def _entry_dir(self, entry_id):
+        if not entry_id or os.sep in entry_id or entry_id.startswith('.'):
+            raise ValueError('Identificador de papelera inválido')
+        return os.path.join(self.base_dir, entry_id)
+
+    def _read_info(self, entry_dir):
+        try:
+            with open(os.path.join(entry_dir, self.INFO), 'r', encoding='utf-8') as f:
+                info = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(info, dict) or 'path' not in info or 'deleted_at' not in info:
+            return None
+        return info
+
+    # ── Purger ───────────────────────────────────────────────────────
+
+    def _start_purger(self, expire_all=False):
+        with self._lock:
+            if expire_all:
+                self._expire_all = True
+            if self._thread and self._thread.is_alive():
+                self._wake.notify()
+                return
+            self._thread = threading.Thread(target=self._purge_loop, name='dex-trash-purge', daemon=True)
+            self._thread.start()
+
+    def _purge_loop(self):
+        while True:
+            with self._lock:
+                expire_all, self._expire_all = self._expire_all, False
+            now = time.time()
+            due = []
+            next_due = None
+            try:
+                names = os.listdir(self.base_dir)
+            except FileNotFoundError:
+                names = []
+            for entry_id in names:
+                entry_dir = os.path.join(self.base_dir, entry_id)
+                if entry_id.startswith(self.TMP_PREFIX):
+                    # A delete in progress, or one a crash interrupted long ago.
+                    try:
+                        expires = os.stat(entry_dir).st_mtime + self.TMP_GRACE
+                    except OSError:
+                        continue
+                    if expires <= now:
+                        due.append(entry_dir)
+                    elif next_due is None or expires < next_due:
+                        next_due = expires
+                    continue
+                info = self._read_info(entry_dir)
+                # Entries without info are leftovers of an interrupted purge.
+                expires = info['deleted_at'] + self.restore_window if info else now
+                if expire_all or expires <= now:
+                    due.append(entry_dir)
+                elif next_due is None or expires < next_due:
+                    next_due = expires
+            for entry_dir in due:
+                self._purge_entry(entry_dir)
+            with self._lock:
+                if self._expire_all:
+                    continue
+                if next_due is None and not due:
+                    self._thread = None
+                    return
+                if next_due is not None:
+                    self._wake.wait(max(0.0, next_due - time.time()))
+
+    def _purge_entry(self, entry_dir):
+        """Remove one entry bottom-up, throttled; info.json goes first so a restore can no longer pick it up."""
+        with self._lock:
+            try:
+                os.remove(os.path.join(entry_dir, self.INFO))
+            except FileNotFoundError:
+                pass
+        budget = max(1, self.max_unlinks_per_sec // 10)
+        done = 0
+        window_start = time.monotonic()
+        for root, dirs, names in os.walk(entry_dir, topdown=False):
+            for name in names + dirs:
+                path = os.path.join(root, name)
+                try:
+                    if os.path.isdir(path) and not os.path.islink(path):
+                        os.rmdir(path)
+                    else:
+                        os.remove(path)
+                except OSError:
+                    pass
+                done += 1
+                if done >= budget:
+                    # At most max_unlinks_per_sec / 10 unlinks per 100 ms slice.
+                    elapsed = time.monotonic() - window_start
+                    if elapsed < 0.1:
+                        time.sleep(0.1 - elapsed)
+                    done = 0
+                    window_start = time.monotonic()
+        shutil.rmtree(entry_dir, ignore_errors=True)
+
+
+def _remove_now(path):
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path)
+    else:
+        os.remove(path)
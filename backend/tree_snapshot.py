@@ -0,0 +1,74 @@
+import os
+import json
+import hashlib
+import tempfile
+
+
+class TreeSnapshotStore:
+    """Persist the last project tree per root under ~/.dex-studio/tree-cache/.
+
+    The tree is stored in the columnar form of ``encode_compact``. Each
+    snapshot also stores the mtime of every listed directory so that a
+    reopen only needs to re-list the directories that changed since, and the
+    mtimes of the ignore files the tree was filtered with.
+    """
+
+    VERSION = 3
+
+    def __init__(self, base_dir=None):
+        self.base_dir = base_dir or os.path.join(os.path.expanduser("~"), '.dex-studio', 'tree-cache')
+
+    def _path(self, root):
+        digest = hashlib.sha1(root.encode('utf-8', 'surrogateescape')).hexdigest()
+        return os.path.join(self.base_dir, f'{digest}.json')
+
+    def load(self, root, depth_limit, node_limit, lazy):
+        try:
+            with open(self._path(root), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(data, dict) or data.get('version') != self.VERSION:
+            return None
+        if data.get('root') != root or bool(data.get('lazy')) != bool(lazy):
+            return None
+        if not lazy and (data.get('depth_limit') != depth_limit or data.get('node_limit') != node_limit):
+            return None
+        tree = data.get('tree')
+        if not isinstance(tree, dict) or tree.get('format') != 'compact' or tree.get('root') != root:
+            return None
+        if not isinstance(data.get('dir_mtimes'), dict) or not isinstance(data.get('ignore_files'), dict):
+            return None
+        return data
+
+    def save(self, root, tree, dir_mtimes, count, truncated, depth_limit, node_limit, lazy, ignore_files=None):
+        data = {
+            'version': self.VERSION,
+            'root': root,
+            'lazy': bool(lazy),
+            'depth_limit': depth_limit,
+            'node_limit': node_limit,
+            'count': count,
+            'truncated': truncated,
+            'dir_mtimes': dir_mtimes,
+            'ignore_files': ignore_files or {},
+            'tree': tree
+        }
+        os.makedirs(self.base_dir, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(prefix='.snapshot-', dir=self.base_dir)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f, separators=(',', ':'))
+            os.replace(tmp, self._path(root))
+        except Exception:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+
+    def clear(self, root):
+        try:
+            os.remove(self._path(root))
+        except OSError:
+            pass
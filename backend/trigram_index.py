@@ -0,0 +1,416 @@
+import os
+import time
+import queue
+import sqlite3
+import hashlib
+import threading
+from array import array
+
+try:
+    from re import _parser as sre_parse
+    from re import _constants as sre_constants
+except ImportError:  # Python < 3.11
+    import sre_parse
+    import sre_constants
+
+from backend.search_engine import iter_project_files, decode_text, MAX_FILE_BYTES
+from backend.fingerprints import digest_bytes
+
+
+def trigrams(text):
+    """Set of byte trigrams (as 24-bit ints) of the lowercased UTF-8 text."""
+    data = text.lower().encode('utf-8', 'surrogatepass')
+    return {(a << 16) | (b << 8) | c for a, b, c in set(zip(data, data[1:], data[2:]))}
+
+
+def _literal_runs(items, runs, current):
+    for op, arg in items:
+        if op is sre_constants.LITERAL:
+            current.append(chr(arg))
+            continue
+        if op is sre_constants.SUBPATTERN and arg[-1] is not None:
+            # A plain group: its sequence is part of the concatenation.
+            _literal_runs(arg[-1], runs, current)
+            continue
+        if op is sre_constants.AT:
+            continue
+        if current:
+            runs.append(''.join(current))
+            current.clear()
+
+
+def required_literals(query, regex):
+    """Substrings that any match of the query must contain (lowercase not applied)."""
+    if not regex:
+        return [query]
+    try:
+        parsed = sre_parse.parse(query)
+    except Exception:
+        return []
+    runs = []
+    current = []
+    _literal_runs(list(parsed), runs, current)
+    if current:
+        runs.append(''.join(current))
+    return runs
+
+
+class TrigramIndex:
+    """Persistent trigram index of one project, in SQLite under ~/.dex-studio/index/.
+
+    ``files`` holds every indexed file with its (mtime_ns, size); ``postings``
+    maps a trigram to a packed array of file ids. Changed files get a new id
+    and are written to the small ``recent`` table instead of rewriting large
+    posting blobs; ids of old versions just become unknown and are dropped
+    from the results. ``compact`` folds ``recent`` into ``postings`` and
+    rebuilds the whole index once it holds too many dead ids.
+
+    With a FingerprintStore, a file whose stat changed but whose contents
+    did not (a touch, a branch switch back and forth) is not re-indexed.
+
+    The index only narrows the search: candidates are confirmed with the
+    real pattern by the search engine.
+    """
+
+    COMPACT_RECENT_ROWS = 300000
+    BATCH_FILES = 2000
+
+    def __init__(self, root, db_path, fingerprints=None):
+        self.root = root
+        self.db_path = db_path
+        self.fingerprints = fingerprints
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.executescript('''
+            PRAGMA journal_mode = WAL;
+            PRAGMA synchronous = NORMAL;
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS files (
+                id INTEGER PRIMARY KEY,
+                path TEXT UNIQUE,
+                mtime_ns INTEGER,
+                size INTEGER,
+                indexed INTEGER
+            );
+            CREATE TABLE IF NOT EXISTS postings (tri INTEGER PRIMARY KEY, ids BLOB);
+            CREATE TABLE IF NOT EXISTS recent (
+                tri INTEGER,
+                file_id INTEGER,
+                PRIMARY KEY (tri, file_id)
+            ) WITHOUT ROWID;
+        ''')
+        if 'digest' not in {row[1] for row in self._conn.execute('PRAGMA table_info(files)')}:
+            self._conn.execute('ALTER TABLE files ADD COLUMN digest TEXT')
+        # rel path -> (id, mtime_ns, size, indexed, digest) and id -> rel path, kept in memory.
+        self._files = {}
+        self._paths = {}
+        for file_id, rel, mtime_ns, size, indexed, digest in self._conn.execute(
+                'SELECT id, path, mtime_ns, size, indexed, digest FROM files'):
+            self._files[rel] = (file_id, mtime_ns, size, indexed, digest)
+            self._paths[file_id] = rel
+        self.built = self._meta('built') == '1'
+        self.dead_ids = int(self._meta('dead_ids') or 0)
+        self.last_sweep = 0.0
+
+    def _meta(self, key):
+        row = self._conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key, value):
+        self._conn.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (key, str(value)))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # ── Updating ─────────────────────────────────────────────────────
+
+    def _forget(self, rel):
+        old = self._files.pop(rel, None)
+        if old is None:
+            return
+        self._paths.pop(old[0], None)
+        self._conn.execute('DELETE FROM files WHERE id = ?', (old[0],))
+        if old[3]:
+            self.dead_ids += 1
+
+    def _add(self, rel, st, tris, bulk, digest=None):
+        """Store a new version of rel; returns its id. bulk: postings are appended by the caller."""
+        self._forget(rel)
+        indexed = 1 if tris is not None else 0
+        cur = self._conn.execute('INSERT INTO files (path, mtime_ns, size, indexed, digest) VALUES (?, ?, ?, ?, ?)',
+                                 (rel, st.st_mtime_ns, st.st_size, indexed, digest))
+        file_id = cur.lastrowid
+        self._files[rel] = (file_id, st.st_mtime_ns, st.st_size, indexed, digest)
+        self._paths[file_id] = rel
+        if tris and not bulk:
+            self._conn.executemany('INSERT OR IGNORE INTO recent (tri, file_id) VALUES (?, ?)',
+                                   ((tri, file_id) for tri in tris))
+        return file_id
+
+    def _append_postings(self, pending):
+        for tri, ids in pending.items():
+            row = self._conn.execute('SELECT ids FROM postings WHERE tri = ?', (tri,)).fetchone()
+            blob = (row[0] if row else b'') + ids.tobytes()
+            self._conn.execute('INSERT OR REPLACE INTO postings (tri, ids) VALUES (?, ?)', (tri, blob))
+
+    def _load(self, path):
+        """(stat, digest, text) from a single read of path; stat is None when it is gone.
+
+        The digest (with a FingerprintStore) and the text for trigrams come
+        from the same bytes. Files too big to index are not read at all.
+        """
+        try:
+            with open(path, 'rb') as f:
+                st = os.fstat(f.fileno())
+                if st.st_size > MAX_FILE_BYTES:
+                    return st, None, None
+                data = f.read()
+        except OSError:
+            return None, None, None
+        digest = None
+        if self.fingerprints is not None:
+            digest = digest_bytes(data)
+            self.fingerprints.remember(path, st, digest)
+        return st, digest, decode_text(data, st.st_size)
+
+    def _same_contents(self, rel, known, st, digest):
+        """Only the stat changed (touch, checkout of identical contents): record the new stat."""
+        if digest is None or known is None or known[4] != digest:
+            return False
+        self._files[rel] = (known[0], st.st_mtime_ns, st.st_size, known[3], digest)
+        self._conn.execute('UPDATE files SET mtime_ns = ?, size = ? WHERE id = ?',
+                           (st.st_mtime_ns, st.st_size, known[0]))
+        return True
+
+    def sweep(self, check=None):
+        """Bring the index in line with the disk, judging files by (mtime_ns, size)."""
+        seen = set()
+        pending = {}
+        batch = 0
+        for path, rel in iter_project_files(self.root):
+            if check:
+                check()
+            seen.add(rel)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            known = self._files.get(rel)
+            if known and known[1] == st.st_mtime_ns and known[2] == st.st_size:
+                continue
+            st, digest, text = self._load(path)
+            if st is None:
+                continue
+            if known:
+                with self._lock:
+                    if self._same_contents(rel, known, st, digest):
+                        continue
+            tris = trigrams(text) if text is not None else None
+            with self._lock:
+                file_id = self._add(rel, st, tris, bulk=True, digest=digest)
+            for tri in tris or ():
+                ids = pending.get(tri)
+                if ids is None:
+                    ids = pending[tri] = array('I')
+                ids.append(file_id)
+            batch += 1
+            if batch >= self.BATCH_FILES:
+                with self._lock:
+                    self._append_postings(pending)
+                    self._conn.commit()
+                pending = {}
+                batch = 0
+        with self._lock:
+            self._append_postings(pending)
+            for rel in [r for r in self._files if r not in seen]:
+                self._forget(rel)
+            self.built = True
+            self._set_meta('built', 1)
+            self._set_meta('dead_ids', self.dead_ids)
+            self._conn.commit()
+        self.last_sweep = time.time()
+
+    def update_path(self, path):
+        """Re-index one file, or drop it (and everything below it) when it is gone."""
+        rel = os.path.relpath(path, self.root).replace(os.sep, '/')
+        if rel.startswith('../'):
+            return
+        if os.path.isdir(path):
+            # A folder moved or copied in: index what it contains.
+            for file_path, _rel in iter_project_files(self.root, top=path):
+                self.update_path(file_path)
+            return
+        st, digest, text = self._load(path)
+        with self._lock:
+            if st is not None and self._same_contents(rel, self._files.get(rel), st, digest):
+                self._conn.commit()
+                return
+        tris = trigrams(text) if text is not None else None
+        with self._lock:
+            if st is None:
+                prefix = rel + '/'
+                for known in [r for r in self._files if r == rel or r.startswith(prefix)]:
+                    self._forget(known)
+            else:
+                self._add(rel, st, tris, bulk=False, digest=digest)
+            self._set_meta('dead_ids', self.dead_ids)
+            self._conn.commit()
+
+    def needs_compaction(self):
+        with self._lock:
+            recent = self._conn.execute('SELECT COUNT(*) FROM recent').fetchone()[0]
+            return recent > self.COMPACT_RECENT_ROWS or self.dead_ids > max(1000, len(self._files) // 2)
+
+    def compact(self):
+        """Fold ``recent`` into ``postings``; start over when dead ids dominate."""
+        with self._lock:
+            if self.dead_ids > max(1000, len(self._files) // 2):
+                self._conn.executescript('DELETE FROM postings; DELETE FROM recent; DELETE FROM files;'
+                                         "DELETE FROM meta WHERE key = 'built';")
+                self._files.clear()
+                self._paths.clear()
+                self.dead_ids = 0
+                self.built = False
+                self._set_meta('dead_ids', 0)
+                self._conn.commit()
+                rebuild = True
+            else:
+                pending = {}
+                for tri, file_id in self._conn.execute('SELECT tri, file_id FROM recent'):
+                    if file_id in self._paths:
+                        pending.setdefault(tri, array('I')).append(file_id)
+                self._append_postings(pending)
+                self._conn.execute('DELETE FROM recent')
+                self._conn.commit()
+                rebuild = False
+        if rebuild:
+            self.sweep()
+
+    # ── Querying ─────────────────────────────────────────────────────
+
+    def _ids(self, tri):
+        ids = set()
+        row = self._conn.execute('SELECT ids FROM postings WHERE tri = ?', (tri,)).fetchone()
+        if row:
+            ids.update(array('I', row[0]))
+        ids.update(r[0] for r in self._conn.execute('SELECT file_id FROM recent WHERE tri = ?', (tri,)))
+        return ids
+
+    def candidates(self, query, regex):
+        """Relative paths that may match, or None when the index cannot narrow this query."""
+        literals = [lit for lit in required_literals(query, regex) if len(lit.lower().encode('utf-8', 'surrogatepass')) >= 3]
+        if not literals or not self.built:
+            return None
+        wanted = set()
+        for lit in literals:
+            wanted |= trigrams(lit)
+        with self._lock:
+            postings = sorted((self._ids(tri) for tri in wanted), key=len)
+            result = postings[0]
+            for ids in postings[1:]:
+                if not result:
+                    break
+                result &= ids
+            return sorted(self._paths[i] for i in result if i in self._paths)
+
+
+class TrigramIndexStore:
+    """Opens the trigram index of each project and keeps it fresh in the background.
+
+    A full sweep runs when an index is first used and again at most every
+    ``SWEEP_INTERVAL`` seconds when it is queried; files saved through the
+    API or reported by the tree watcher are re-indexed right away by a
+    worker thread. Paths still waiting in that queue are always searched.
+    """
+
+    SWEEP_INTERVAL = 60.0
+
+    def __init__(self, base_dir=None, fingerprints=None):
+        self.base_dir = base_dir or os.path.join(os.path.expanduser("~"), '.dex-studio', 'index')
+        self.fingerprints = fingerprints
+        self._indexes = {}
+        self._lock = threading.Lock()
+        self._sweeping = set()
+        self._queue = queue.Queue()
+        self._dirty = set()
+        self._worker = None
+
+    def _db_path(self, root):
+        digest = hashlib.sha1(root.encode('utf-8', 'surrogateescape')).hexdigest()
+        return os.path.join(self.base_dir, f'{digest}.sqlite')
+
+    def get(self, root):
+        root = os.path.abspath(root)
+        with self._lock:
+            index = self._indexes.get(root)
+            if index is None:
+                os.makedirs(self.base_dir, exist_ok=True)
+                index = self._indexes[root] = TrigramIndex(root, self._db_path(root), self.fingerprints)
+        if time.time() - index.last_sweep > self.SWEEP_INTERVAL:
+            self._start_sweep(index)
+        return index
+
+    def _start_sweep(self, index):
+        with self._lock:
+            if index.root in self._sweeping:
+                return
+            self._sweeping.add(index.root)
+        threading.Thread(target=self._sweep, args=(index,), name='dex-index-sweep', daemon=True).start()
+
+    def _sweep(self, index):
+        try:
+            index.sweep()
+            if index.needs_compaction():
+                index.compact()
+        except Exception as e:
+            print(f'[TrigramIndexStore] Error indexando {index.root}: {e}')
+        finally:
+            with self._lock:
+                self._sweeping.discard(index.root)
+
+    def note_changed(self, paths):
+        """Queue files written or moved by the app for re-indexing."""
+        with self._lock:
+            roots = list(self._indexes)
+            for path in paths:
+                path = os.path.abspath(path)
+                if any(path.startswith(root + os.sep) for root in roots):
+                    self._dirty.add(path)
+                    self._queue.put(path)
+            if self._worker is None and not self._queue.empty():
+                self._worker = threading.Thread(target=self._drain, name='dex-index-update', daemon=True)
+                self._worker.start()
+
+    def _drain(self):
+        while True:
+            try:
+                path = self._queue.get(timeout=1.0)
+            except queue.Empty:
+                with self._lock:
+                    if self._queue.empty():
+                        self._worker = None
+                        return
+                continue
+            with self._lock:
+                indexes = [ix for root, ix in self._indexes.items() if path.startswith(root + os.sep)]
+            for index in indexes:
+                try:
+                    index.update_path(path)
+                except Exception as e:
+                    print(f'[TrigramIndexStore] Error indexando {path}: {e}')
+            with self._lock:
+                self._dirty.discard(path)
+
+    def candidates(self, root, query, regex):
+        """[(path, rel)] to search for query in root, or None to scan the whole project."""
+        index = self.get(root)
+        rels = index.candidates(query, regex)
+        if rels is None:
+            return None
+        paths = {os.path.join(index.root, rel): rel for rel in rels}
+        with self._lock:
+            for path in self._dirty:
+                if path.startswith(index.root + os.sep) and os.path.isfile(path):
+                    paths[path] = os.path.relpath(path, index.root).replace(os.sep, '/')
+        return sorted(paths.items(), key=lambda item: item[1])
@@ -520,18 +520,36 @@ const DEX = {
     // ─── Filesystem API ───
     fs: {
         readFile: function(path) { return window.pywebview.api.read_file(path); },
+        readRange: function(path, offset, length) { return window.pywebview.api.read_file_range(path, offset, length); },
+        readLines: function(path, startLine, count) { return window.pywebview.api.read_lines(path, startLine, count); },
         writeFile: function(path, content) { return window.pywebview.api.write_file(path, content); },
         listDir: function(path) { return window.pywebview.api.list_directory(path); },
         createFile: function(path) { return window.pywebview.api.create_file(path); },
         createDir: function(path) { return window.pywebview.api.create_directory(path); },
         delete: function(path) { return window.pywebview.api.delete_item(path); },
         rename: function(oldPath, newPath) { return window.pywebview.api.rename_item(oldPath, newPath); },
+        applyOps: function(ops) { return window.pywebview.api.apply_file_ops(ops); },
+        replaceInProject: function(query, replacement, opts) {
+            opts = opts || {};
+            return window.pywebview.api.replace_in_project(query, replacement, !!opts.regex, opts.globs || null,
+                opts.dryRun !== false, !!opts.caseSensitive, null, opts.expected || null);
+        },
+        undoReplace: function(undoId) { return window.pywebview.api.undo_replace(undoId); },
         exists: function(path) { return window.pywebview.api.file_exists(path); }
     },
 
     // ─── Shell API ───
     shell: {
-        exec: function(cmd) { return window.pywebview.api.run_command(cmd); }
+        exec: function(cmd) { return window.pywebview.api.run_command(cmd); },
+        execAsync: function(cmd, timeout, attached) { return window.pywebview.api.run_command_async(cmd, timeout || 0, null, !attached); },
+        commandResult: function(jobId, wait) { return window.pywebview.api.command_result(jobId, wait); },
+        cancelCommand: function(jobId) { return window.pywebview.api.cancel_command(jobId); },
+        listCommands: function() { return window.pywebview.api.list_commands(); },
+        listRuns: function() { return window.pywebview.api.list_runs(); },
+        killRun: function(runId) { return window.pywebview.api.kill_run(runId); },
+        waitRun: function(runId, timeout) { return window.pywebview.api.wait_run(runId, timeout); },
+        readRunLog: function(runId, offset, limit) { return window.pywebview.api.read_run_log(runId, offset || 0, limit || 262144); },
+        readCommandLog: function(jobId, offset, limit) { return window.pywebview.api.read_command_log(jobId, offset || 0, limit || 262144); }
     },
 
     // ─── Storage API ───
@@ -721,6 +739,18 @@ const DEX = {
             return window.pywebview.api.list_directory(dir).then(function(res) {
                 return res.success ? res.items : [];
             });
+        },
+        getOutline: function(path) {
+            var file = path || app.currentFilePath;
+            if (!file) return Promise.resolve([]);
+            return window.pywebview.api.get_outline(file).then(function(res) {
+                return res.success ? res.symbols : [];
+            });
+        },
+        findSymbol: function(name) {
+            return window.pywebview.api.find_symbol(name).then(function(res) {
+                return res.success ? res.results : [];
+            });
         }
     },
 
@@ -833,6 +863,9 @@ const app = {
     contextPath: null,
     openTabs: [],
     tabContents: {},
+    // path -> {encoding, hash, base, paged, nextLine, lineCount}; paged tabs are read-only windows of
+    // big files, hash/base are the on-disk state the next save_file_patch is computed against.
+    tabFileInfo: {},
     lastLogMessage: '',
     cmdHistory: [],
     cmdHistoryIndex: -1,
@@ -1686,6 +1719,58 @@ const app = {
                 }
             }, duration);
         }
+        return toast;
+    },
+
+    _formatBytes: function(bytes) {
+        if (bytes < 1024) return bytes + ' B';
+        if (bytes < 1048576) return (bytes / 1024).toFixed(1) + ' KB';
+        if (bytes < 1073741824) return (bytes / 1048576).toFixed(1) + ' MB';
+        return (bytes / 1073741824).toFixed(2) + ' GB';
+    },
+
+    // Follow a background file job (duplicate/move/import) with a progress toast that can cancel it.
+    // Resolves with the final job ({state: 'done' | 'cancelled' | 'error', ...}).
+    waitForFileJob: async function(res, title) {
+        if (!res || !res.success || !res.job_id) return { state: res && res.success ? 'done' : 'error', error: res && res.error };
+        const jobId = res.job_id;
+        let toast = null;
+        const started = Date.now();
+        let job = null;
+        while (true) {
+            const poll = await window.pywebview.api.get_file_job(jobId);
+            if (!poll.success) return { state: 'error', error: poll.error };
+            job = poll.job;
+            if (job.state !== 'running') break;
+            // Quick jobs finish without ever showing a toast.
+            if (!toast && Date.now() - started > 400) {
+                toast = this.showNotification(title, '', 'info', 0);
+                if (toast) {
+                    const cancel = document.createElement('button');
+                    cancel.className = 'notification-close';
+                    cancel.textContent = 'Cancelar';
+                    cancel.style.width = 'auto';
+                    cancel.onclick = () => window.pywebview.api.cancel_file_job(jobId);
+                    toast.insertBefore(cancel, toast.querySelector('.notification-close'));
+                }
+            }
+            if (toast) {
+                const pct = job.bytes_total ? Math.floor(job.bytes_done * 100 / job.bytes_total) : 0;
+                const text = job.label + ': ' + pct + '% · ' + job.files_done + '/' + job.files_total + ' archivos · ' +
+                    this._formatBytes(job.bytes_done) + ' / ' + this._formatBytes(job.bytes_total);
+                let line = toast.querySelector('.notification-message');
+                if (!line) {
+                    line = document.createElement('div');
+                    line.className = 'notification-message';
+                    toast.querySelector('.notification-body').appendChild(line);
+                }
+                line.textContent = text;
+            }
+            await new Promise(r => setTimeout(r, 300));
+        }
+        if (toast && toast.parentElement) toast.remove();
+        if (job.state === 'cancelled') this.log(title + ': cancelado (' + job.label + ')');
+        return job;
     },
 
     _setTerminalStatus: function(text) {
@@ -1701,6 +1786,9 @@ const app = {
                 if (e.key === 'Enter') {
                     e.preventDefault();
                     this.execTerminalFromInput();
+                } else if (e.key === 'c' && e.ctrlKey && !termInput.value) {
+                    e.preventDefault();
+                    this.interruptTerminal();
                 } else if (e.key === 'ArrowUp') {
                     e.preventDefault();
                     if (this.cmdHistory.length > 0) {
@@ -1752,6 +1840,10 @@ const app = {
         if (this.cmdHistory.length > (this.cmdHistoryLimit || 50)) this.cmdHistory.pop();
         this.cmdHistoryIndex = -1;
 
+        // The shell session echoes the command and prints its own prompt.
+        var builtins = ['clear', 'cls', 'help', 'run', 'build'];
+        if (builtins.indexOf(cmd) === -1 && await this._writeToTerminalSession(cmd + '\n')) return;
+
         const out = document.getElementById('terminal-out');
         const promptText = document.getElementById('terminal-prompt').textContent;
         out.textContent += '\n' + promptText + ' ' + cmd;
@@ -1799,6 +1891,67 @@ const app = {
         out.scrollTop = out.scrollHeight;
     },
 
+    // Shell sessions on a pseudo-terminal: state (cd, env, venvs) persists between
+    // commands and output arrives while the command runs.
+    _writeToTerminalSession: async function(data) {
+        var term = this._terminals.find(function(t) { return t.id === app._activeTerminal; });
+        if (!term) return false;
+        try {
+            if (!term.session) {
+                var out = document.getElementById('terminal-out');
+                var cols = out ? Math.max(40, Math.floor(out.clientWidth / 8)) : 80;
+                var res = await window.pywebview.api.open_terminal(this.currentProjectPath || null, cols, 24);
+                if (!res.success) return false;
+                term.session = res.session_id;
+                this._pumpTerminalSession(term);
+            }
+            var wres = await window.pywebview.api.terminal_write(term.session, data);
+            return wres.success;
+        } catch(e) {
+            return false;
+        }
+    },
+
+    _pumpTerminalSession: async function(term) {
+        var session = term.session;
+        var seq = 0;
+        var started = false;
+        while (term.session === session) {
+            var res;
+            try {
+                res = await window.pywebview.api.read_terminal(session, seq, 0.5);
+            } catch(e) {
+                break;
+            }
+            if (!res.success) break;
+            var text = res.skipped ? this._skippedOutputNote(res) : '';
+            res.chunks.forEach(function(chunk) { text += chunk.text; });
+            // Plain-text panel: drop escape sequences and carriage returns.
+            text = text.replace(/\x1b\[[0-9;?]*[ -\/]*[@-~]|\x1b\][^\x07]*(\x07|\x1b\\)|\x1b[()][0-9A-Za-z]/g, '')
+                .replace(/\r\n/g, '\n').replace(/\r/g, '');
+            if (text) {
+                if (!started) text = '\n' + text;
+                started = true;
+                if (term.id === this._activeTerminal) {
+                    var out = document.getElementById('terminal-out');
+                    var all = out.textContent + text;
+                    if (all.length > this._maxTerminalChars) all = all.slice(all.length - this._maxTerminalChars);
+                    out.textContent = all;
+                    out.scrollTop = out.scrollHeight;
+                } else {
+                    term.output = (term.output + text).slice(-this._maxTerminalChars);
+                }
+            }
+            seq = res.next_seq;
+            if (res.done) break;
+        }
+        if (term.session === session) term.session = null;
+    },
+
+    interruptTerminal: function() {
+        this._writeToTerminalSession('\x03');
+    },
+
     showView: function(viewId) {
         // Remover clases active de todas las vistas
         document.querySelectorAll('.view-section').forEach(v => v.classList.remove('active'));
@@ -2608,6 +2761,9 @@ const app = {
     expandedFolders: {},
     _explorerTreeCache: null,
     _explorerTreePath: null,
+    _explorerTreeWatched: false,
+    _explorerTreeLoading: false,
+    _pendingTreeDeltas: [],
 
     refreshExplorer: async function(forceReload) {
         try {
@@ -2615,6 +2771,7 @@ const app = {
                 document.getElementById('file-list').innerHTML = '<p style="color: var(--text-dim); font-size: 0.8rem;">Abre un proyecto para ver archivos</p>';
                 this._explorerTreeCache = null;
                 this._explorerTreePath = null;
+                this._explorerTreeWatched = false;
                 return;
             }
 
@@ -2623,22 +2780,35 @@ const app = {
                 return;
             }
 
-            var shouldReload = forceReload !== false ||
-                !this._explorerTreeCache ||
-                this._explorerTreePath !== this.currentProjectPath;
+            var sameTree = !!this._explorerTreeCache && this._explorerTreePath === this.currentProjectPath;
+            // A watched tree is kept current by backend deltas (applyTreeDeltas), no reload needed.
+            var shouldReload = !sameTree || (forceReload !== false && !this._explorerTreeWatched);
 
             if (shouldReload) {
-                const treeRes = await window.pywebview.api.get_project_tree(this.currentProjectPath, 10, 30000);
+                // Lazy mode: only the top level is listed, folders load on expand (expand_directory).
+                this._explorerTreeLoading = true;
+                let treeRes;
+                try {
+                    treeRes = await window.pywebview.api.get_project_tree(this.currentProjectPath, 10, 30000, true, 500, 'compact');
+                } finally {
+                    this._explorerTreeLoading = false;
+                }
                 if (!treeRes.success || !treeRes.tree) {
                     this.log(treeRes.error || 'No se pudo cargar el árbol del proyecto. Usando modo compatibilidad.', true);
                     await this.refreshExplorerLegacy();
                     return;
                 }
-                this._explorerTreeCache = treeRes.tree;
+                this._explorerTreeCache = treeRes.format === 'compact' ? this._decodeCompactTree(treeRes.tree) : treeRes.tree;
+                this._explorerTreeCache.next_cursor = treeRes.next_cursor || null;
                 this._explorerTreePath = this.currentProjectPath;
+                this._explorerTreeWatched = !!treeRes.watching;
                 if (treeRes.truncated) {
                     this.log('Explorador: árbol recortado por límite de rendimiento. Ajusta estructura si hay demasiados archivos.');
                 }
+                // Deltas that raced the response (snapshot revalidation) apply on top of it.
+                const pending = this._pendingTreeDeltas;
+                this._pendingTreeDeltas = [];
+                for (const payload of pending) this.applyTreeDeltas(payload, true);
             }
 
             this.renderExplorerTree();
@@ -2655,6 +2825,7 @@ const app = {
             list.innerHTML = '';
             this._explorerTreeCache = null;
             this._explorerTreePath = null;
+            this._explorerTreeWatched = false;
             await this.buildTreeLegacy(this.currentProjectPath, list, 0);
             this._refreshIcons(list);
         } catch(e) {
@@ -2744,11 +2915,12 @@ const app = {
             const destDir = isDir ? itemPath : itemPath.substring(0, itemPath.lastIndexOf('/'));
             try {
                 const moveRes = await window.pywebview.api.move_item(sourcePath, destDir);
-                if (moveRes.success) {
+                const job = await this.waitForFileJob(moveRes, 'Moviendo');
+                if (job.state === 'done') {
                     if (isDir) this.expandedFolders[itemPath] = true;
                     await this.refreshExplorer(true);
-                } else {
-                    this.log(moveRes.error, true);
+                } else if (job.state === 'error') {
+                    this.log(job.error || moveRes.error, true);
                 }
             } catch(err) {
                 this.log('Error al mover: ' + err.message, true);
@@ -2774,6 +2946,102 @@ const app = {
         }
     },
 
+    // Columnar tree (names/parents/flags in pre-order) -> nested nodes; paths are parent path + name.
+    _decodeCompactTree: function(data) {
+        var sep = data.root.indexOf('/') === -1 && data.root.indexOf('\\') !== -1 ? '\\' : '/';
+        var links = data.links || {};
+        var counts = data.child_counts || {};
+        var nodes = new Array(data.names.length);
+        for (var i = 0; i < data.names.length; i++) {
+            var flags = data.flags[i];
+            var parent = data.parents[i] >= 0 ? nodes[data.parents[i]] : null;
+            var node = {
+                name: data.names[i],
+                path: parent ? (links[i] || (parent.path.replace(/[\\/]$/, '') + sep + data.names[i])) : data.root,
+                is_dir: !!(flags & 1)
+            };
+            if (flags & 2) node.children = [];
+            else if (counts[i] !== undefined) node.child_count = counts[i];
+            if (parent) parent.children.push(node);
+            nodes[i] = node;
+        }
+        return nodes[0] || null;
+    },
+
+    _sortTreeChildren: function(children) {
+        children.sort((a, b) => {
+            if (!!a.is_dir !== !!b.is_dir) return a.is_dir ? -1 : 1;
+            var an = a.name.toLowerCase(), bn = b.name.toLowerCase();
+            if (an !== bn) return an < bn ? -1 : 1;
+            return a.name < b.name ? -1 : (a.name > b.name ? 1 : 0);
+        });
+    },
+
+    _findTreeNode: function(path, wantParent) {
+        var node = this._explorerTreeCache;
+        var parent = null;
+        while (node && node.path !== path) {
+            var next = null;
+            for (const child of (node.children || [])) {
+                if (child.path === path || (child.is_dir && path.startsWith(child.path + '/'))) {
+                    next = child;
+                    break;
+                }
+            }
+            parent = node;
+            node = next;
+        }
+        return wantParent ? { node: node, parent: parent } : node;
+    },
+
+    _rebaseTreePaths: function(node, oldPrefix, newPrefix) {
+        if (node.path === oldPrefix || node.path.startsWith(oldPrefix + '/')) {
+            var oldPath = node.path;
+            node.path = newPrefix + oldPath.slice(oldPrefix.length);
+            if (this.expandedFolders[oldPath]) {
+                delete this.expandedFolders[oldPath];
+                this.expandedFolders[node.path] = true;
+            }
+        }
+        for (const child of (node.children || [])) this._rebaseTreePaths(child, oldPrefix, newPrefix);
+    },
+
+    applyTreeDeltas: function(payload, skipRender) {
+        if (this._explorerTreeLoading) {
+            this._pendingTreeDeltas.push(payload);
+            return;
+        }
+        var tree = this._explorerTreeCache;
+        // Deltas also arrive without a watcher, when a cached snapshot gets revalidated.
+        if (!payload || !tree || payload.root !== tree.path) return;
+        for (const d of (payload.deltas || [])) {
+            if (d.op === 'reset') {
+                this._explorerTreeWatched = false;
+                this.refreshExplorer(true);
+                return;
+            }
+            if (d.op === 'add') {
+                var parent = this._findTreeNode(d.parent);
+                if (!parent || !parent.children) continue;
+                parent.children = parent.children.filter(c => c.path !== d.node.path);
+                parent.children.push(d.node);
+                this._sortTreeChildren(parent.children);
+            } else if (d.op === 'remove' || d.op === 'rename') {
+                var found = this._findTreeNode(d.path, true);
+                if (!found.node || !found.parent) continue;
+                found.parent.children = found.parent.children.filter(c => c !== found.node);
+                if (d.op === 'remove') continue;
+                var target = this._findTreeNode(d.parent);
+                if (!target || !target.children) continue;
+                found.node.name = d.name;
+                this._rebaseTreePaths(found.node, d.path, d.new_path);
+                target.children.push(found.node);
+                this._sortTreeChildren(target.children);
+            }
+        }
+        if (!skipRender) this.renderExplorerTree();
+    },
+
     renderExplorerTree: function() {
         const list = document.getElementById('file-list');
         if (!list) return;
@@ -2786,6 +3054,9 @@ const app = {
         for (const item of children) {
             this._appendExplorerNode(item, frag, 0);
         }
+        if (this._explorerTreeCache.next_cursor) {
+            this._appendExplorerMoreItem(this._explorerTreeCache, frag, 0);
+        }
         list.innerHTML = '';
         list.appendChild(frag);
         this._refreshIcons(list);
@@ -2867,12 +3138,13 @@ const app = {
 
                 try {
                     const res = await window.pywebview.api.move_item(sourcePath, destDir);
-                    if (res.success) {
+                    const job = await app.waitForFileJob(res, 'Moviendo');
+                    if (job.state === 'done') {
                         app.log('✓ Movido: ' + sourcePath.split('/').pop() + ' → ' + destDir.split('/').pop());
                         if (isDir) app.expandedFolders[itemPath] = true;
                         app.refreshExplorer(true);
-                    } else {
-                        app.log(res.error, true);
+                    } else if (job.state === 'error') {
+                        app.log(job.error || res.error, true);
                     }
                 } catch(err) {
                     app.log('Error al mover: ' + err.message, true);
@@ -2894,14 +3166,62 @@ const app = {
                 childUl.style.padding = '0';
                 childUl.style.margin = '0';
                 parentEl.appendChild(childUl);
+                if (!item.children) {
+                    this._appendExplorerMoreItem(item, childUl, depth + 1, true);
+                    this.loadExplorerDirectory(item, false);
+                    return;
+                }
                 const children = item.children || [];
                 for (const child of children) {
                     this._appendExplorerNode(child, childUl, depth + 1);
                 }
+                if (item.next_cursor) {
+                    this._appendExplorerMoreItem(item, childUl, depth + 1);
+                }
             }
         }
     },
 
+    _appendExplorerMoreItem: function(node, parentEl, depth, loading) {
+        const li = document.createElement('li');
+        li.className = 'file-item';
+        li.style.paddingLeft = (16 + depth * 16) + 'px';
+        li.style.opacity = '0.6';
+        li.innerHTML = '<span style="width:12px;flex-shrink:0"></span><span class="file-item-name">' + (loading ? 'Cargando…' : 'Mostrar más…') + '</span>';
+        if (!loading) {
+            li.onclick = (e) => {
+                e.stopPropagation();
+                this.loadExplorerDirectory(node, true);
+            };
+        }
+        parentEl.appendChild(li);
+    },
+
+    loadExplorerDirectory: async function(node, more) {
+        if (!node || node._loading) return;
+        node._loading = true;
+        try {
+            const res = await window.pywebview.api.expand_directory(node.path, more ? node.next_cursor : null, 500);
+            if (!res || !res.success) {
+                this.log((res && res.error) || 'No se pudo abrir la carpeta', true);
+                return;
+            }
+            const items = res.items || [];
+            if (more && node.children) {
+                const known = new Set(node.children.map(c => c.path));
+                node.children = node.children.concat(items.filter(c => !known.has(c.path)));
+            } else {
+                node.children = items;
+            }
+            node.next_cursor = res.next_cursor || null;
+            this.renderExplorerTree();
+        } catch(e) {
+            this.log('Error al abrir carpeta: ' + e.message, true);
+        } finally {
+            node._loading = false;
+        }
+    },
+
     toggleFolder: function(folderPath) {
         this.expandedFolders[folderPath] = !this.expandedFolders[folderPath];
         this.refreshExplorer(false);
@@ -2942,9 +3262,12 @@ const app = {
                 return;
             }
             const res = await window.pywebview.api.import_file_to_directory(picked.path, targetDir);
-            if (!res || !res.success) {
-                this.log((res && res.error) || "No se pudo importar el archivo", true);
-                this.showNotification('Importar archivo', (res && res.error) || 'No se pudo importar el archivo', 'error', 3200);
+            const job = await this.waitForFileJob(res, 'Importando');
+            if (job.state === 'cancelled') return;
+            if (job.state !== 'done') {
+                const error = job.error || (res && res.error) || 'No se pudo importar el archivo';
+                this.log(error, true);
+                this.showNotification('Importar archivo', error, 'error', 3200);
                 return;
             }
             this.log('Archivo importado: ' + (res.file_name || 'archivo'));
@@ -3038,6 +3361,7 @@ const app = {
             if (this.openTabs.includes(path)) {
                 this.currentFilePath = path;
                 document.getElementById('code-editor').value = this.tabContents[path] || '';
+                this._applyTabMode(path);
                 document.getElementById('current-file').textContent = path.split('/').pop();
                 this.updateHighlight();
                 this.updateMinimap();
@@ -3047,12 +3371,27 @@ const app = {
                 return;
             }
 
-            const res = await window.pywebview.api.read_file(path);
+            let res = await window.pywebview.api.read_file(path);
+            if (res.binary) {
+                this.log('Archivo binario, no se abre en el editor: ' + path.split('/').pop(), true);
+                return;
+            }
+            let info = { encoding: res.encoding || null, hash: res.hash || null, base: res.content, paged: false };
+            if (res.too_large && typeof window.pywebview.api.read_lines === 'function') {
+                // Big files open read-only and load more lines while scrolling.
+                res = await window.pywebview.api.read_lines(path, 0, this.PAGED_FILE_LINES);
+                if (res.success) {
+                    info = { encoding: res.encoding, paged: true, nextLine: res.start_line + res.count, lineCount: res.line_count };
+                    this.log('Archivo grande (' + Math.round(res.size / 1048576) + ' MB, ' + res.line_count + ' líneas): abierto en modo solo lectura');
+                }
+            }
             if (res.success) {
                 this.currentFilePath = path;
                 this.openTabs.push(path);
                 this.tabContents[path] = res.content;
+                this.tabFileInfo[path] = info;
                 document.getElementById('code-editor').value = res.content;
+                this._applyTabMode(path);
                 document.getElementById('current-file').textContent = path.split('/').pop();
                 this.updateHighlight();
                 this.updateMinimap();
@@ -3070,6 +3409,47 @@ const app = {
         }
     },
 
+    PAGED_FILE_LINES: 5000,
+
+    _applyTabMode: function(path) {
+        const editor = document.getElementById('code-editor');
+        const info = path ? this.tabFileInfo[path] : null;
+        editor.readOnly = !!(info && info.paged);
+        if (info && info.paged && !this._pagedScrollBound) {
+            this._pagedScrollBound = true;
+            editor.addEventListener('scroll', () => {
+                if (editor.scrollTop + editor.clientHeight >= editor.scrollHeight - 200) this.loadMoreFileLines();
+            });
+        }
+    },
+
+    loadMoreFileLines: async function() {
+        const path = this.currentFilePath;
+        const info = path ? this.tabFileInfo[path] : null;
+        if (!info || !info.paged || info.loading || info.nextLine >= info.lineCount) return;
+        info.loading = true;
+        try {
+            const res = await window.pywebview.api.read_lines(path, info.nextLine, this.PAGED_FILE_LINES);
+            if (!res.success) {
+                this.log(res.error || 'Error al leer archivo', true);
+                return;
+            }
+            info.nextLine = res.start_line + res.count;
+            info.lineCount = res.line_count;
+            this.tabContents[path] += res.content;
+            if (this.currentFilePath === path) {
+                const editor = document.getElementById('code-editor');
+                const top = editor.scrollTop;
+                editor.value = this.tabContents[path];
+                editor.scrollTop = top;
+                this.updateHighlight();
+                this.updateMinimap();
+            }
+        } finally {
+            info.loading = false;
+        }
+    },
+
     renderTabs: function() {
         const container = document.getElementById('editor-tabs');
         if (!container) return;
@@ -3136,17 +3516,20 @@ const app = {
 
         this.openTabs.splice(idx, 1);
         delete this.tabContents[path];
+        delete this.tabFileInfo[path];
 
         if (this.openTabs.length === 0) {
             this.currentFilePath = null;
             document.getElementById('code-editor').value = '';
             document.getElementById('current-file').textContent = 'Ningún archivo abierto';
+            this._applyTabMode(null);
         } else if (path === this.currentFilePath) {
             const newIdx = Math.min(idx, this.openTabs.length - 1);
             const newPath = this.openTabs[newIdx];
             this.currentFilePath = newPath;
             document.getElementById('code-editor').value = this.tabContents[newPath] || '';
             document.getElementById('current-file').textContent = newPath.split('/').pop();
+            this._applyTabMode(newPath);
         }
 
         DEX.events.emit('fileClose', path);
@@ -3358,10 +3741,31 @@ const app = {
             this.log("No hay archivo abierto", true);
             return;
         }
+        const info = this.tabFileInfo[this.currentFilePath];
+        if (info && info.paged) {
+            this.log('Archivo grande abierto en solo lectura: no se puede guardar', true);
+            return;
+        }
         try {
+            const path = this.currentFilePath;
             const content = document.getElementById('code-editor').value;
-            this.tabContents[this.currentFilePath] = content;
-            const res = await window.pywebview.api.write_file(this.currentFilePath, content);
+            this.tabContents[path] = content;
+            let res = null;
+            if (info && info.hash && typeof info.base === 'string' && typeof window.pywebview.api.save_file_patch === 'function') {
+                // Only the changed range crosses the bridge.
+                const edit = this._computeTextEdit(info.base, content);
+                res = await window.pywebview.api.save_file_patch(path, info.hash, edit ? [edit] : [], info.encoding);
+                if (res.conflict && !confirm('El archivo cambió en disco desde que se abrió. ¿Sobrescribirlo?')) {
+                    this.log(res.error, true);
+                    return;
+                }
+                if (res.conflict) res = null;
+            }
+            if (!res) res = await window.pywebview.api.write_file(path, content, info ? info.encoding : null);
+            if (res.success && info) {
+                info.hash = res.hash || null;
+                info.base = content;
+            }
             if (res.success) {
                 this.log('Archivo guardado: ' + this.currentFilePath.split('/').pop());
                 this.showNotification('Guardado', this.currentFilePath.split('/').pop(), 'success', 2000);
@@ -3375,6 +3779,27 @@ const app = {
         }
     },
 
+    // Single replacement turning oldText into newText (common prefix/suffix), or null if equal.
+    _computeTextEdit: function(oldText, newText) {
+        if (oldText === newText) return null;
+        const max = Math.min(oldText.length, newText.length);
+        let start = 0;
+        while (start < max && oldText.charCodeAt(start) === newText.charCodeAt(start)) start++;
+        let oldEnd = oldText.length, newEnd = newText.length;
+        while (oldEnd > start && newEnd > start && oldText.charCodeAt(oldEnd - 1) === newText.charCodeAt(newEnd - 1)) {
+            oldEnd--;
+            newEnd--;
+        }
+        // Never split a surrogate pair.
+        const isLow = (text, i) => { const c = text.charCodeAt(i); return c >= 0xDC00 && c <= 0xDFFF; };
+        if (start > 0 && isLow(oldText, start) && isLow(newText, start)) start--;
+        if (oldEnd < oldText.length && isLow(oldText, oldEnd)) {
+            oldEnd++;
+            newEnd++;
+        }
+        return { start: start, end: oldEnd, text: newText.slice(start, newEnd) };
+    },
+
     renameFile: async function(oldPath) {
         const newName = prompt("Nuevo nombre:", oldPath.split('/').pop());
         if (newName && newName !== oldPath.split('/').pop()) {
@@ -3391,12 +3816,34 @@ const app = {
         if (confirm("¿Está seguro de que desea eliminar este archivo/carpeta?")) {
             const res = await window.pywebview.api.delete_item(path);
             if (res.success) {
-                this.log(`Eliminado: ${path.split('/').pop()}`);
+                const name = path.split('/').pop();
+                this.log(`Eliminado: ${name}`);
                 this.refreshExplorer();
+                if (res.trash_id) this._offerRestore(res.trash_id, name);
             }
         }
     },
 
+    _offerRestore: function(trashId, name) {
+        const toast = this.showNotification('Eliminado', name, 'info', 8000);
+        if (!toast) return;
+        const undo = document.createElement('button');
+        undo.className = 'notification-close';
+        undo.textContent = 'Deshacer';
+        undo.style.width = 'auto';
+        undo.onclick = async () => {
+            toast.remove();
+            const res = await window.pywebview.api.restore_deleted_item(trashId);
+            if (res.success) {
+                this.log(`Restaurado: ${name}`);
+                this.refreshExplorer();
+            } else {
+                this.log(res.error, true);
+            }
+        };
+        toast.insertBefore(undo, toast.querySelector('.notification-close'));
+    },
+
     runProject: function() {
         if (!this.currentProjectPath) {
             this.log("Abre un proyecto primero", true);
@@ -3490,10 +3937,12 @@ const app = {
         this.log('▶ Ejecutando: ' + interp + ' ' + mf + extraArgs);
         try {
             var cmd = 'cd "' + this.currentProjectPath + '" && ' + interp + ' ' + mf + extraArgs + ' 2>&1';
-            var res = await window.pywebview.api.start_project_run(cmd, timeout);
+            var res = await window.pywebview.api.start_project_run(cmd, timeout, true);
+            if (res.success) {
+                this._currentRunId = res.run_id;
+                res = await this._followRunOutput(res.run_id);
+            }
             if (res.success) {
-                if (res.stdout) this.log(res.stdout);
-                if (res.stderr) this.log(res.stderr, true);
                 if (res.timeout) {
                     this.log('⚠ Timeout: el proceso superó el límite de ' + timeout + 's', true);
                 } else if (res.code === 0) {
@@ -3512,13 +3961,59 @@ const app = {
         this._setTerminalStatus('Lista');
 
         // Restore button
+        this._currentRunId = null;
         this._isRunning = false;
         this.updateRunButton();
     },
 
+    // Terminal text kept while a run streams output (older text is dropped).
+    _maxTerminalChars: 500000,
+
+    // Output the backend dropped from memory before it was shown (see read_run_output).
+    _skippedOutputNote: function(res) {
+        return '\n[... salida omitida' + (res.log_path ? '; log completo en ' + res.log_path : '') + ' ...]\n';
+    },
+
+    _followRunOutput: async function(runId) {
+        var seq = 0;
+        var started = false;
+        var out = document.getElementById('terminal-out');
+        while (true) {
+            var res = await window.pywebview.api.read_run_output(runId, seq, 0.5);
+            if (!res.success) return res;
+            var text = res.skipped ? this._skippedOutputNote(res) : '';
+            res.chunks.forEach(function(chunk) { text += chunk.text; });
+            if (text && out) {
+                // Output starts on its own line; log() lines carry no trailing newline.
+                if (!started) text = '\n' + text;
+                started = true;
+                var all = out.textContent + text;
+                if (all.length > this._maxTerminalChars) all = all.slice(all.length - this._maxTerminalChars);
+                out.textContent = all;
+                out.scrollTop = out.scrollHeight;
+            }
+            seq = res.next_seq;
+            if (res.done) return res;
+        }
+    },
+
+    // run_command on the backend command pool: the bridge call returns at once
+    // and the result is polled, so slow commands (apt, pip, curl) do not hold it.
+    // attached: keep the app's session and stdin, for commands that may prompt (sudo).
+    _runCommandAsync: async function(cmd, timeout, attached) {
+        var job = await window.pywebview.api.run_command_async(cmd, timeout || 0, null, !attached);
+        if (!job.success) return window.pywebview.api.run_command(cmd);
+        while (true) {
+            var res = await window.pywebview.api.command_result(job.job_id, 2);
+            if (!res.success || res.done) return res;
+        }
+    },
+
     cancelRun: async function() {
         try {
-            var res = await window.pywebview.api.kill_running_process();
+            var res = this._currentRunId
+                ? await window.pywebview.api.kill_run(this._currentRunId)
+                : await window.pywebview.api.kill_running_process();
             if (res.success) {
                 this.log('⏹ ' + res.message);
             }
@@ -3598,7 +4093,7 @@ const app = {
                 "print('DEX_JSON:' + json.dumps(resp))\\n" +
                 "PY";
 
-            var res = await window.pywebview.api.run_command(cmd);
+            var res = await this._runCommandAsync(cmd);
             var out = ((res && res.stdout) || '') + '\\n' + ((res && res.stderr) || '');
             var line = out.split('\\n').find(function(l) { return l.indexOf('DEX_JSON:') === 0; });
             if (!line) return { success: False, error: 'No se pudo parsear respuesta fallback' };
@@ -3740,7 +4235,7 @@ const app = {
         if (aptPkgs.length) {
             var aptQuoted = aptPkgs.map(function(p) { return "'" + p.replace(/'/g, "'\"'\"'") + "'"; }).join(' ');
             var aptCmd = "sudo apt-get install -y " + aptQuoted + " 2>&1 || apt-get install -y " + aptQuoted + " 2>&1";
-            var aptRes = await window.pywebview.api.run_command(aptCmd);
+            var aptRes = await this._runCommandAsync(aptCmd, 0, true);
             combinedOut += (aptRes && aptRes.stdout) ? aptRes.stdout : '';
             combinedErr += (aptRes && aptRes.stderr) ? aptRes.stderr : '';
             finalCode = (aptRes && typeof aptRes.code !== 'undefined') ? aptRes.code : 1;
@@ -3759,7 +4254,7 @@ const app = {
         if (pipPkgs.length) {
             var pipQuoted = pipPkgs.map(function(p) { return "'" + p.replace(/'/g, "'\"'\"'") + "'"; }).join(' ');
             cmd = interp + " -m pip install --user " + pipQuoted + " 2>&1";
-            var res = await window.pywebview.api.run_command(cmd);
+            var res = await this._runCommandAsync(cmd, 0, true);
             combinedOut += (res && res.stdout) ? ('\n' + res.stdout) : '';
             combinedErr += (res && res.stderr) ? ('\n' + res.stderr) : '';
             finalCode = (res && typeof res.code !== 'undefined') ? res.code : 1;
@@ -5381,7 +5876,7 @@ const app = {
     checkForUpdates: async function() {
         this.log('Buscando actualizaciones...');
         try {
-            const res = await window.pywebview.api.run_command('curl -s https://raw.githubusercontent.com/farllirs/DEX-STUDIO/main/VERSION.txt 2>/dev/null');
+            const res = await this._runCommandAsync('curl -s --max-time 20 https://raw.githubusercontent.com/farllirs/DEX-STUDIO/main/VERSION.txt 2>/dev/null');
             if (!res.success || !res.stdout) {
                 this.log('No se pudo conectar con GitHub', true);
                 this.showNotification('Error', 'No se pudo verificar actualizaciones', 'error');
@@ -5397,7 +5892,7 @@ const app = {
                 this.log('⬆ Nueva versión disponible: v' + remoteVersion + ' (actual: v' + localVersion + ')');
                 if (confirm('Nueva versión disponible: v' + remoteVersion + '\n\n¿Deseas actualizar ahora?\n\nSe descargará desde GitHub y se reiniciará el editor.')) {
                     this.log('Descargando actualización...');
-                    const updateRes = await window.pywebview.api.run_command(
+                    const updateRes = await this._runCommandAsync(
                         'cd ~/dex-studio && git stash 2>/dev/null; git pull origin main 2>&1'
                     );
                     if (updateRes.success) {
@@ -5775,11 +6270,13 @@ const app = {
         if (!path) return;
         try {
             const res = await window.pywebview.api.duplicate_item(path);
-            if (res.success) {
-                this.log('Duplicado: ' + res.new_path.split('/').pop());
+            const job = await this.waitForFileJob(res, 'Duplicando');
+            if (job.state === 'done') {
+                const how = Object.keys(job.strategies || {}).join(', ');
+                this.log('Duplicado: ' + res.new_path.split('/').pop() + (how ? ' (' + how + ')' : ''));
                 this.refreshExplorer();
-            } else {
-                this.log(res.error, true);
+            } else if (job.state === 'error') {
+                this.log(job.error || res.error, true);
             }
         } catch(e) {
             this.log('Error: ' + e.message, true);
@@ -5793,11 +6290,12 @@ const app = {
         const destFull = this.currentProjectPath + '/' + dest;
         try {
             const res = await window.pywebview.api.move_item(path, destFull);
-            if (res.success) {
+            const job = await this.waitForFileJob(res, 'Moviendo');
+            if (job.state === 'done') {
                 this.log('Movido a: ' + dest);
                 this.refreshExplorer();
-            } else {
-                this.log(res.error, true);
+            } else if (job.state === 'error') {
+                this.log(job.error || res.error, true);
             }
         } catch(e) {
             this.log('Error: ' + e.message, true);
@@ -6747,6 +7245,11 @@ const app = {
 
     closeTerminal: function(id) {
         if (this._terminals.length <= 1) return;
+        var closing = this._terminals.find(function(t) { return t.id === id; });
+        if (closing && closing.session) {
+            window.pywebview.api.close_terminal(closing.session);
+            closing.session = null;
+        }
         this._terminals = this._terminals.filter(function(t) { return t.id !== id; });
         if (this._activeTerminal === id) {
             this._activeTerminal = this._terminals[0].id;
@@ -6893,7 +7396,7 @@ const app = {
         this.log('🐛 Debug: ejecutando ' + mf + '...');
         try {
             var cmd = 'cd "' + this.currentProjectPath + '" && python3 -u ' + mf + ' 2>&1';
-            var res = await window.pywebview.api.run_command(cmd);
+            var res = await this._runCommandAsync(cmd);
             if (res.success) {
                 if (res.stdout) this.log(res.stdout);
                 if (res.stderr) this.log(res.stderr, true);
@@ -6972,38 +7475,38 @@ const app = {
 
         this.showView('editor');
         this.log('🔎 Buscando: "' + query + '"...');
-        const safeQuery = query.replace(/'/g, "'\"'\"'");
-        const safeProject = this.currentProjectPath.replace(/"/g, '\\"');
         try {
             // 1) Buscar coincidencias por contenido y abrir el primer match
-            let cmd = 'cd "' + safeProject + '" && grep -RIn --exclude-dir=.git --exclude-dir=build --exclude-dir=__pycache__ --binary-files=without-match -e \'' + safeQuery + '\' . 2>/dev/null | head -n 40';
-            let res = await window.pywebview.api.run_command(cmd);
-            let lines = (res && res.stdout ? res.stdout : '').trim().split('\n').filter(Boolean);
-            if (lines.length > 0) {
-                const first = lines[0];
-                // format: ./path:line:content
-                const m = first.match(/^\.\/([^:]+):(\d+):(.*)$/);
-                if (m) {
-                    const rel = m[1];
-                    const ln = parseInt(m[2], 10) || 1;
-                    const path = this.currentProjectPath + '/' + rel;
-                    await this.openFile(path);
-                    this.moveCursorToLine(ln);
-                    this.showNotification('Buscar', 'Abierto: ' + rel + ' (línea ' + ln + ')', 'success', 2200);
-                    this.log('Coincidencias: ' + lines.length + '. Abierto: ' + rel + ':' + ln);
-                    return;
-                }
+            // Case-sensitive, like the grep this search replaced.
+            let found = await window.pywebview.api.search_in_project(query, false, true, null, 2000);
+            // Big projects may need more than the first wait to produce a hit.
+            while (found && found.success && found.results.length === 0 && !found.done) {
+                found = await window.pywebview.api.get_search_results(found.search_id, 0);
+            }
+            if (found && found.success && found.results.length > 0) {
+                if (!found.done) window.pywebview.api.cancel_search(found.search_id);
+                const first = found.results[0];
+                await this.openFile(first.path);
+                this.moveCursorToLine(first.line);
+                this.showNotification('Buscar', 'Abierto: ' + first.file + ' (línea ' + first.line + ')', 'success', 2200);
+                const count = found.results.length + (found.done ? '' : '+');
+                this.log('Coincidencias: ' + count + '. Abierto: ' + first.file + ':' + first.line);
+                found.results.slice(0, 40).forEach(hit => this.log('  ' + hit.file + ':' + hit.line + ':' + hit.column + '  ' + hit.text.trim()));
+                return;
             }
 
             // 2) Buscar por nombre de archivo
-            cmd = 'cd "' + safeProject + '" && find . -type f -iname \'*' + safeQuery + '*\' 2>/dev/null | head -n 40';
-            res = await window.pywebview.api.run_command(cmd);
-            lines = (res && res.stdout ? res.stdout : '').trim().split('\n').filter(Boolean);
-            if (lines.length > 0) {
-                const rel = lines[0].replace(/^\.\//, '');
-                await this.openFile(this.currentProjectPath + '/' + rel);
-                this.showNotification('Buscar', 'Archivo encontrado: ' + rel, 'success', 2200);
-                this.log('Resultado por nombre: ' + rel);
+            let named = await window.pywebview.api.quick_open(query, 40);
+            // quick_open answers at once; while the first scan runs, ask again.
+            for (let i = 0; i < 20 && named && named.success && !named.ready && named.results.length === 0; i++) {
+                await new Promise(resolve => setTimeout(resolve, 150));
+                named = await window.pywebview.api.quick_open(query, 40);
+            }
+            if (named && named.success && named.results.length > 0) {
+                const hit = named.results[0];
+                await this.openFile(hit.path);
+                this.showNotification('Buscar', 'Archivo encontrado: ' + hit.file, 'success', 2200);
+                this.log('Resultado por nombre: ' + hit.file);
                 return;
             }
 
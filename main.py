@@ -63,6 +63,7 @@ def main():
             pass
     
     window.events.shown += on_shown
+    window.events.closed += api.shutdown
     
     # Start
     if sys.platform.startswith('linux'):